@@ -5,6 +5,8 @@ from flask_wtf.csrf import CSRFProtect
 from config import Config
 import datetime
 import json
+import os
+from jinja2 import FileSystemBytecodeCache
 from werkzeug.middleware.proxy_fix import ProxyFix
 import sqlite3
 from sqlalchemy import event
@@ -36,12 +38,43 @@ def create_app(config_class=Config):
         app.wsgi_app, x_for=1, x_proto=1, x_host=1, x_port=1
     )
 
+    # 模板字节码缓存：多个 worker 和重启之间共享已编译的模板
+    cache_dir = app.config.get('JINJA_BYTECODE_CACHE_DIR')
+    if cache_dir:
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            app.jinja_env.bytecode_cache = FileSystemBytecodeCache(cache_dir)
+        except OSError as e:
+            print(f"模板字节码缓存目录不可用: {str(e)}")
+
+    # 搜索/向量缓存容量
+    from app.utils.cache import configure_caches
+    configure_caches(app.config)
+    from app.utils.embedding_store import configure_embedding_store
+    configure_embedding_store(app.config)
+    from app.utils.http_client import configure_http_client
+    configure_http_client(app.config)
+    from app.utils.vector_queue import configure_vector_queue
+    configure_vector_queue(app.config)
+
     db.init_app(app)
     login_manager.init_app(app)
     csrf.init_app(app)
     
     from app.models import User, InvitationCode, Category, Website, SiteSettings, WebDAVConfig, DeadlinkCheck, AIProviderConfig
-    
+
+    # 写入网站/分类/设置时递增数据版本号，驱动导航快照等缓存失效
+    from app.utils.data_version import register_data_version_hooks
+    register_data_version_hooks()
+
+    # 网站/分类提交后增量更新搜索联想索引
+    from app.utils.suggest_index import register_suggest_hooks
+    register_suggest_hooks()
+
+    # 保存网站时同步可见用户关联表
+    from app.utils.visibility import register_visibility_hooks
+    register_visibility_hooks()
+
     from app.auth import bp as auth_bp
     app.register_blueprint(auth_bp, url_prefix='/auth')
     
@@ -62,8 +95,8 @@ def create_app(config_class=Config):
     @app.context_processor
     def inject_site_settings():
         try:
-            settings = SiteSettings.get_settings()
-            return {'settings': settings}
+            from app.utils.settings_cache import get_site_settings
+            return {'settings': get_site_settings()}
         except Exception as e:
             # 记录错误，但返回一个空的设置对象，避免模板渲染失败
             print(f"无法获取站点设置: {str(e)}")
@@ -106,15 +139,17 @@ def create_app(config_class=Config):
         db.create_all()
         # 数据库字段迁移（确保新字段自动添加）
         try:
-            from app.utils.db_migration import migrate_ai_provider_config_table, migrate_site_settings_fields, migrate_webdav_config_table
-            from app.utils.icon_db_migration import migrate_icon_management_tables
-            import os
+            from app.utils.db_migration import run_schema_migrations
             db_path = app.config.get('SQLALCHEMY_DATABASE_URI', '').replace('sqlite:///', '')
             if db_path and os.path.exists(db_path):
-                migrate_site_settings_fields(db_path)
-                migrated = migrate_webdav_config_table(db_path)
-                migrate_ai_provider_config_table(db_path)
-                migrate_icon_management_tables(db_path)
+                # schema_version 已是最新时只读取一个整数（另检查一次全文索引），不再逐表检查结构
+                applied = run_schema_migrations(db_path)
+                if applied.get('migrate_website_fts_table') == 0:
+                    print("当前 SQLite 不支持 FTS5 trigram 分词，网站搜索将使用 LIKE 匹配")
+                elif applied.get('migrate_website_fts_table') == 1:
+                    from app.utils.fts_search import reset_fts_state
+                    reset_fts_state()
+                migrated = applied.get('migrate_webdav_config_table', 0)
                 if migrated > 0:
                     print(f"已将旧 WebDAV 配置迁移到 webdav_config 表（{migrated} 条）")
         except Exception as e:
@@ -140,6 +175,18 @@ def create_app(config_class=Config):
             admin.is_superadmin = True
             db.session.commit()
             print("已将现有管理员升级为超级管理员")
+        # 确保站点设置存在并迁移旧版 AI 配置（只在启动时写入，读请求从不写设置）
+        try:
+            SiteSettings.prepare_settings()
+        except Exception as e:
+            db.session.rollback()
+            print(f"站点设置初始化警告: {str(e)}")
+        # 构建搜索联想索引
+        try:
+            from app.utils.suggest_index import build_suggest_index
+            build_suggest_index()
+        except Exception as e:
+            print(f"搜索联想索引构建警告: {str(e)}")
         # 你原本 before_first_request 里的其他初始化逻辑可以放在这里
     
     # 启动 WebDAV 自动备份线程（仅在主进程中启动，避免 debug reloader 重复启动）
@@ -152,6 +199,10 @@ def create_app(config_class=Config):
     except Exception as e:
         print(f"自动备份线程启动警告: {str(e)}")
     
+    # 注册命令行工具（flask perf ...）
+    from app.cli import register_cli
+    register_cli(app)
+    
     # 注册模板过滤器
     @app.template_filter('from_json')
     def from_json(value):
@@ -17,7 +17,7 @@ from flask_login import login_required
 from app import db
 from app.admin import bp
 from app.admin.decorators import superadmin_required
-from app.models import WebDAVConfig
+from app.models import SiteSettings, WebDAVConfig
 
 
 # ==================== 自动备份线程管理 ====================
@@ -512,6 +512,21 @@ def restore_backup(filename):
         shutil.copy2(db_path, temp_backup)
         shutil.copy2(backup_path, db_path)
         
+        # 数据库文件已被替换：按 schema_version 补齐旧备份缺少的迁移，并重建搜索联想索引
+        from app.utils.db_migration import run_schema_migrations
+        from app.utils.fts_search import reset_fts_state
+        from app.utils.settings_cache import clear_settings_cache
+        from app.utils.suggest_index import get_suggest_index
+        run_schema_migrations(db_path)
+        reset_fts_state()
+        get_suggest_index().mark_dirty()
+        clear_settings_cache()
+        try:
+            SiteSettings.prepare_settings()
+        except Exception as e:
+            db.session.rollback()
+            print(f"站点设置初始化警告: {str(e)}")
+        
         flash('数据库恢复成功，请重新登录', 'success')
         return redirect(url_for('auth.logout'))
     except Exception as e:
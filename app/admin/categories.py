@@ -9,6 +9,7 @@ from app.admin import bp
 from app.admin.forms import CategoryForm
 from app.admin.decorators import admin_required
 from app.models import Category, Website
+from app.utils.vector_queue import enqueue_vector_indexing
 
 
 @bp.route('/categories')
@@ -64,8 +65,14 @@ def edit_category(id):
             flash('分类不能设置为其后代分类的子分类', 'danger')
             return render_template('admin/category_form.html', title='编辑分类', form=form)
             
+        old_name = category.name
         form.populate_obj(category)
         db.session.commit()
+        # 分类名称是网站向量输入的一部分，重命名后更新该分类下网站的向量
+        if category.name != old_name:
+            enqueue_vector_indexing(
+                [row[0] for row in Website.query.with_entities(Website.id).filter_by(category_id=category.id)]
+            )
         flash('分类更新成功', 'success')
         return redirect(url_for('admin.categories'))
     return render_template('admin/category_form.html', title='编辑分类', form=form)
@@ -14,7 +14,7 @@ from app import db
 from app.admin import bp
 from app.admin.forms import DataImportForm
 from app.admin.decorators import superadmin_required
-from app.models import Category, Website
+from app.models import Category, SiteSettings, Website
 
 
 @bp.route('/data-management')
@@ -645,6 +645,21 @@ def import_project_db(db_path, import_type, admin_id):
             db.session.remove()
             db.engine.dispose()
             
+            # 数据库文件已被替换：按 schema_version 补齐导入数据库缺少的迁移，并重建搜索联想索引
+            from app.utils.db_migration import run_schema_migrations
+            from app.utils.fts_search import reset_fts_state
+            from app.utils.settings_cache import clear_settings_cache
+            from app.utils.suggest_index import get_suggest_index
+            run_schema_migrations(db_path_current)
+            reset_fts_state()
+            get_suggest_index().mark_dirty()
+            clear_settings_cache()
+            try:
+                SiteSettings.prepare_settings()
+            except Exception as e:
+                db.session.rollback()
+                current_app.logger.warning(f"站点设置初始化警告: {str(e)}")
+            
             # 获取数据库统计信息
             conn = sqlite3.connect(db_path_current)
             cursor = conn.cursor()
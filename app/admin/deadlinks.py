@@ -18,6 +18,7 @@ from app import db
 from app.admin import bp
 from app.admin.decorators import superadmin_required
 from app.models import Website, DeadlinkCheck, OperationLog
+from app.utils.http_client import http_get, http_head
 from app.utils.icon_service import delete_website_icon_assets
 
 
@@ -582,7 +583,7 @@ def check_single_link_thread_safe(website):
         
         # 尝试HEAD请求，更轻量和快速
         try:
-            response = requests.head(url, timeout=15, headers=headers, allow_redirects=True, verify=False)
+            response = http_head(url, timeout=15, headers=headers, allow_redirects=True, verify=False)
             status_code = response.status_code
             
             # 有些网站可能不支持HEAD请求，如果得到4xx或5xx状态码，尝试GET请求
@@ -591,7 +592,7 @@ def check_single_link_thread_safe(website):
                 
         except requests.exceptions.RequestException:
             # 尝试GET请求，但只获取头部内容以节省带宽
-            response = requests.get(url, timeout=15, headers=headers, allow_redirects=True, stream=True, verify=False)
+            response = http_get(url, timeout=15, headers=headers, allow_redirects=True, stream=True, verify=False)
             # 只读取少量内容
             for chunk in response.iter_content(chunk_size=1024):
                 if chunk:  # 过滤掉保持活动的新行
@@ -2,7 +2,8 @@ from flask_wtf import FlaskForm
 from flask_wtf.file import FileField, FileAllowed
 from wtforms import StringField, TextAreaField, BooleanField, SubmitField, SelectField, HiddenField, IntegerField, PasswordField, DateTimeField
 from wtforms.validators import DataRequired, Length, URL, Optional, ValidationError, Email, EqualTo, NumberRange
-from app.models import Category, SiteSettings, User
+from app.models import Category, User
+from app.utils.settings_cache import get_site_settings
 import re
 
 class CategoryForm(FlaskForm):
@@ -63,7 +64,7 @@ class WebsiteForm(FlaskForm):
         super(WebsiteForm, self).__init__(*args, **kwargs)
         self.category_id.choices = [(c.id, c.name) for c in Category.query.order_by(Category.order.asc()).all()]
         try:
-            providers = SiteSettings.get_settings().get_icon_source_providers()
+            providers = get_site_settings().get_icon_source_providers()
         except Exception:
             providers = []
         self.source_provider_override.choices = [
@@ -205,6 +206,15 @@ class SiteSettingsForm(FlaskForm):
     ], validators=[Optional()], default='auto', description='自动兜底会优先尝试 Chat 非流式，再回退到 Chat 流式和 Responses')
     ai_temperature = StringField('温度参数', validators=[Optional()], default='0.7', description='0-1之间，控制随机性，默认0.7')
     ai_max_tokens = IntegerField('最大Token数', validators=[Optional(), NumberRange(min=100, max=2000)], default=500)
+    ai_rank_mode = SelectField('AI搜索排序方式', choices=[
+        ('llm', '大模型推荐'),
+        ('hybrid', '本地混合排序（不调用大模型）'),
+        ('hybrid_llm', '本地混合排序 + 大模型精排')
+    ], validators=[Optional()], default='llm', description='本地混合排序融合关键词、向量相似度、访问量和排序权重，几十毫秒内完成')
+    ai_hybrid_method = SelectField('混合排序算法', choices=[
+        ('weighted', '归一化加权'),
+        ('rrf', '倒数排名融合（RRF）')
+    ], validators=[Optional()], default='weighted')
     
     # 向量搜索设置（基于 Qdrant）
     vector_search_enabled = BooleanField('启用向量搜索', description='启用后使用 Qdrant 向量数据库进行高性能语义搜索')
@@ -214,6 +224,16 @@ class SiteSettingsForm(FlaskForm):
     embedding_model = StringField('Embedding 模型', validators=[Optional(), Length(max=128)], default='text-embedding-3-small', description='用于生成向量的模型名称。常见模型：text-embedding-3-small, text-embedding-ada-002, bge-large-zh-v1.5 等。请根据你的 API 服务支持的模型填写。')
     vector_similarity_threshold = StringField('相似度阈值', validators=[Optional()], default='0.3', description='0-1之间，值越小结果越多，默认0.3')
     vector_max_results = IntegerField('最大结果数', validators=[Optional(), NumberRange(min=10, max=200)], default=50, description='向量搜索返回的最大结果数')
+    qdrant_hnsw_m = IntegerField('HNSW m', validators=[Optional(), NumberRange(min=4, max=128)], default=16, description='每个节点的邻居数，越大召回率越高、内存越多，默认16')
+    qdrant_hnsw_ef_construct = IntegerField('HNSW ef_construct', validators=[Optional(), NumberRange(min=4, max=2000)], default=100, description='建索引时的候选数，越大索引质量越好、建索引越慢，默认100')
+    qdrant_hnsw_ef = IntegerField('检索 hnsw_ef', validators=[Optional(), NumberRange(min=1, max=4096)], description='检索时的候选数，越大召回率越高、延迟越高，留空使用 Qdrant 默认值')
+    qdrant_quantization = SelectField('向量量化', choices=[
+        ('none', '不量化（float32）'),
+        ('int8', 'int8 标量量化')
+    ], validators=[Optional()], default='none', description='int8 量化使内存中的向量占用降为约四分之一')
+    qdrant_quantization_rescore = BooleanField('量化检索后用原始向量重打分', default=True)
+    qdrant_vectors_on_disk = BooleanField('原始向量存放在磁盘上')
+    qdrant_payload_on_disk = BooleanField('元数据存放在磁盘上')
     
     submit_btn = SubmitField('保存设置')
 
@@ -315,6 +315,8 @@ def site_settings():
             except (TypeError, ValueError):
                 settings.ai_temperature = 0.7
             settings.ai_max_tokens = form.ai_max_tokens.data if form.ai_max_tokens.data else 500
+            settings.ai_rank_mode = form.ai_rank_mode.data if form.ai_rank_mode.data in ('llm', 'hybrid', 'hybrid_llm') else 'llm'
+            settings.ai_hybrid_method = form.ai_hybrid_method.data if form.ai_hybrid_method.data in ('weighted', 'rrf') else 'weighted'
             settings.set_ai_task_bindings(_json_or_default(request.form.get('ai_task_bindings_json'), settings.get_ai_task_bindings()))
             settings.set_ai_task_test_results(_json_or_default(request.form.get('ai_task_test_results_json'), settings.get_ai_task_test_results()))
             _sync_provider_backfill(settings)
@@ -335,6 +337,13 @@ def site_settings():
             except (TypeError, ValueError):
                 settings.vector_similarity_threshold = 0.3
             settings.vector_max_results = form.vector_max_results.data if form.vector_max_results.data else 50
+            settings.qdrant_hnsw_m = form.qdrant_hnsw_m.data if form.qdrant_hnsw_m.data else 16
+            settings.qdrant_hnsw_ef_construct = form.qdrant_hnsw_ef_construct.data if form.qdrant_hnsw_ef_construct.data else 100
+            settings.qdrant_hnsw_ef = form.qdrant_hnsw_ef.data if form.qdrant_hnsw_ef.data else None
+            settings.qdrant_quantization = form.qdrant_quantization.data if form.qdrant_quantization.data == 'int8' else 'none'
+            settings.qdrant_quantization_rescore = form.qdrant_quantization_rescore.data
+            settings.qdrant_vectors_on_disk = form.qdrant_vectors_on_disk.data
+            settings.qdrant_payload_on_disk = form.qdrant_payload_on_disk.data
 
             ai_configured = bool(get_ai_model_for_task(settings) and (settings.get_primary_ai_provider(enabled_only=True) or settings.ai_api_base_url))
             embedding_api_url, embedding_api_key = settings.get_embedding_api_config()
@@ -2,90 +2,10 @@
 # -*- coding: utf-8 -*-
 """管理员工具函数"""
 
-import threading
 from datetime import datetime
 import os
 from flask import current_app, flash, url_for
 from werkzeug.utils import secure_filename
-from app.models import Category, Website, SiteSettings
-
-
-def trigger_vector_indexing(website_id: int, category_name: str = None):
-    """
-    异步触发向量生成（后台线程执行，不阻塞主流程）
-    
-    Args:
-        website_id: 网站ID
-        category_name: 分类名称（如果为None，会从数据库查询）
-    """
-    # 在主线程中获取应用实例（必须在应用上下文中调用）
-    try:
-        app = current_app._get_current_object()
-    except RuntimeError:
-        # 如果不在应用上下文中，无法启动后台任务
-        return
-    
-    def _generate_vector_in_background():
-        try:
-            # 在后台线程中创建新的应用上下文
-            with app.app_context():
-                settings = SiteSettings.get_settings()
-                
-                # 检查向量搜索是否启用
-                embedding_api_url, embedding_api_key = settings.get_embedding_api_config()
-                if not (settings and settings.vector_search_enabled and 
-                        all([settings.qdrant_url, settings.embedding_model, 
-                             embedding_api_url, embedding_api_key])):
-                    return
-                
-                # 获取网站信息
-                website = Website.query.get(website_id)
-                if not website:
-                    return
-                
-                # 如果没有提供分类名称，从数据库查询
-                if category_name is None and website.category_id:
-                    category = Category.query.get(website.category_id)
-                    cat_name = category.name if category else ""
-                else:
-                    cat_name = category_name or ""
-                
-                # 初始化向量服务
-                from app.utils.vector_service import EmbeddingClient, QdrantVectorStore, VectorSearchService
-                
-                embedding_client = EmbeddingClient(
-                    api_base_url=embedding_api_url,
-                    api_key=embedding_api_key,
-                    model_name=settings.embedding_model or 'text-embedding-3-small'
-                )
-                vector_store = QdrantVectorStore(
-                    qdrant_url=settings.qdrant_url,
-                    vector_dimension=embedding_client.dimension
-                )
-                vector_service = VectorSearchService(embedding_client, vector_store)
-                
-                # 生成向量
-                vector_service.index_website(
-                    website_id=website.id,
-                    title=website.title or "",
-                    description=website.description or "",
-                    category_name=cat_name,
-                    url=website.url or ""
-                )
-                
-                app.logger.info(f"网站 {website_id} 向量生成成功")
-        except Exception as e:
-            # 异常处理也需要在应用上下文中，如果上下文创建失败，使用 print 作为后备
-            try:
-                with app.app_context():
-                    app.logger.error(f"后台向量生成失败 (website_id={website_id}): {str(e)}")
-            except Exception:
-                # 如果连应用上下文都无法创建，使用 print 作为最后的后备
-                print(f"后台向量生成失败 (website_id={website_id}): {str(e)}")
-    
-    # 在后台线程中执行，不阻塞主流程
-    thread = threading.Thread(target=_generate_vector_in_background, daemon=True)
-    thread.start()
 
 
 def save_image(file_data, subfolder):
@@ -2,6 +2,7 @@
 # -*- coding: utf-8 -*-
 """向量批量生成路由"""
 
+import bisect
 import time
 import threading
 from flask import jsonify, current_app, request
@@ -9,9 +10,11 @@ from flask_login import login_required
 from app import db
 from app.admin import bp
 from app.admin.decorators import superadmin_required
-from app.models import Website, Category, SiteSettings
-from app.utils.vector_service import EmbeddingClient, QdrantVectorStore, VectorSearchService
-from qdrant_client import QdrantClient
+from app.models import Website
+from app.utils.settings_cache import get_site_settings
+from app.utils.vector_indexer import BulkVectorIndexer, iter_index_items, plan_incremental_index
+from app.utils.vector_queue import get_vector_queue_stats
+from app.utils.vector_service import get_vector_service, is_vector_search_configured
 
 
 # 用于存储批量处理的状态
@@ -27,50 +30,6 @@ vector_indexing_status = {
 }
 
 
-def check_existing_vectors(qdrant_url: str, website_ids: list) -> set:
-    """
-    检查 Qdrant 中已存在的向量（用于跳过已生成的网站）
-    
-    Args:
-        qdrant_url: Qdrant 服务地址
-        website_ids: 网站ID列表
-        
-    Returns:
-        已存在向量的网站ID集合
-    """
-    try:
-        client = QdrantClient(url=qdrant_url)
-        collections = client.get_collections().collections
-        collection_names = [c.name for c in collections]
-        
-        if 'websites' not in collection_names:
-            return set()
-        
-        # 批量查询已存在的向量
-        existing_ids = set()
-        batch_size = 100
-        
-        for i in range(0, len(website_ids), batch_size):
-            batch_ids = website_ids[i:i+batch_size]
-            try:
-                # 使用 retrieve 方法批量获取这些ID的向量
-                result = client.retrieve(
-                    collection_name='websites',
-                    ids=batch_ids
-                )
-                # 从返回结果中提取ID（成功返回的说明已存在）
-                for point in result:
-                    existing_ids.add(point.id)
-            except Exception:
-                # 如果查询失败，继续处理
-                pass
-        
-        return existing_ids
-    except Exception as e:
-        current_app.logger.warning(f"检查已存在向量时出错: {str(e)}")
-        return set()
-
-
 def process_vector_indexing(app, skip_existing: bool = True):
     """后台处理所有网站的向量生成"""
     global vector_indexing_status
@@ -78,7 +37,7 @@ def process_vector_indexing(app, skip_existing: bool = True):
     with app.app_context():
         try:
             # 获取配置
-            settings = SiteSettings.get_settings()
+            settings = get_site_settings()
             
             if not settings:
                 vector_indexing_status['is_running'] = False
@@ -92,93 +51,61 @@ def process_vector_indexing(app, skip_existing: bool = True):
                 current_app.logger.error("Embedding API 配置不完整")
                 return
             
-            if not settings.qdrant_url:
+            if not is_vector_search_configured(settings):
                 vector_indexing_status['is_running'] = False
-                current_app.logger.error("Qdrant URL 未配置")
+                current_app.logger.error("向量存储未配置（Qdrant URL 为空）")
                 return
             
-            # 初始化向量服务
-            embedding_client = EmbeddingClient(
-                api_base_url=embedding_api_url,
-                api_key=embedding_api_key,
-                model_name=settings.embedding_model or 'text-embedding-3-small'
-            )
-            vector_store = QdrantVectorStore(
-                qdrant_url=settings.qdrant_url,
-                vector_dimension=embedding_client.dimension
-            )
-            vector_service = VectorSearchService(embedding_client, vector_store)
+            # 复用进程内已就绪的向量服务
+            vector_service = get_vector_service(settings)
             
-            # 获取所有网站
-            websites = Website.query.all()
-            total_count = len(websites)
+            # 获取所有网站ID（升序）
+            website_ids = [row[0] for row in db.session.query(Website.id).order_by(Website.id)]
+            total_count = len(website_ids)
             vector_indexing_status['total'] = total_count
             
             current_app.logger.info(f"开始批量生成向量，共 {total_count} 个网站")
             
-            # 检查已存在的向量
-            existing_ids = set()
+            # 增量模式只处理新增、内容有变化或向量缺失的网站；完整模式重新写入全部向量
             if skip_existing:
-                current_app.logger.info("检查已存在的向量...")
-                website_ids = [w.id for w in websites]
-                existing_ids = check_existing_vectors(settings.qdrant_url, website_ids)
-                if existing_ids:
-                    current_app.logger.info(f"发现 {len(existing_ids)} 个网站已有向量，将跳过")
+                current_app.logger.info("检查内容有变化的网站...")
+                pending_ids, unchanged = plan_incremental_index(vector_service)
+                if unchanged:
+                    current_app.logger.info(f"{unchanged} 个网站内容未变化，将跳过")
+                items = iter_index_items(website_ids=pending_ids)
+            else:
+                pending_ids, unchanged = website_ids, 0
+                items = iter_index_items()
             
-            # 处理每个网站
-            for website in websites:
-                # 检查是否应该停止
-                if vector_indexing_status['should_stop']:
-                    current_app.logger.info("收到停止信号，中断批量生成")
-                    break
-                
-                # 检查是否已存在
-                if skip_existing and website.id in existing_ids:
-                    vector_indexing_status['skipped'] += 1
-                    vector_indexing_status['processed'] += 1
-                    continue
-                
-                try:
-                    # 获取分类名称
-                    category_name = ""
-                    if website.category_id:
-                        category = Category.query.get(website.category_id)
-                        if category:
-                            category_name = category.name
-                    
-                    # 生成向量
-                    success = vector_service.index_website(
-                        website_id=website.id,
-                        title=website.title or "",
-                        description=website.description or "",
-                        category_name=category_name,
-                        url=website.url or ""
+            def on_progress(stats):
+                vector_indexing_status['success'] = stats['success']
+                vector_indexing_status['failed'] = stats['failed']
+                vector_indexing_status['skipped'] = stats['skipped'] + unchanged
+                # 从检查点继续时，检查点之前的网站计入已处理
+                resumed = bisect.bisect_right(pending_ids, stats['resumed_after'])
+                vector_indexing_status['processed'] = min(total_count, unchanged + resumed + stats['processed'])
+                if stats['batches'] % 10 == 0:
+                    current_app.logger.info(
+                        f"进度: {vector_indexing_status['processed']}/{total_count} "
+                        f"(成功: {stats['success']}, 失败: {stats['failed']}, "
+                        f"跳过: {vector_indexing_status['skipped']}, 速率: {stats['rate']} 次/秒)"
                     )
-                    
-                    if success:
-                        vector_indexing_status['success'] += 1
-                    else:
-                        vector_indexing_status['failed'] += 1
-                    
-                    vector_indexing_status['processed'] += 1
-                    
-                    # 每10个网站记录一次进度
-                    if vector_indexing_status['processed'] % 10 == 0:
-                        current_app.logger.info(
-                            f"进度: {vector_indexing_status['processed']}/{total_count} "
-                            f"(成功: {vector_indexing_status['success']}, "
-                            f"失败: {vector_indexing_status['failed']}, "
-                            f"跳过: {vector_indexing_status['skipped']})"
-                        )
-                    
-                    # 适当延迟，避免API限流（503错误通常是限流导致的）
-                    # 如果遇到503错误，建议增加延迟时间到0.5-1秒
-                    time.sleep(0.3)  # 增加到0.3秒，减少API限流
-                    
-                except Exception as e:
-                    vector_indexing_status['failed'] += 1
-                    vector_indexing_status['processed'] += 1
-                    current_app.logger.error(f"网站 {website.id} 向量生成失败: {str(e)}")
+            
+            vector_indexing_status['skipped'] = unchanged
+            vector_indexing_status['processed'] = unchanged
+            
+            # 分批生成 embedding、批量写入，多个工作线程并发，遇到限流自动降速
+            # 增量模式每次按索引状态重新计算待处理网站，不需要检查点
+            indexer = BulkVectorIndexer.from_config(vector_service, current_app.config)
+            stats = indexer.run(
+                items,
+                should_stop=lambda: vector_indexing_status['should_stop'],
+                on_progress=on_progress,
+                resume=not skip_existing,
+                mode='changed' if skip_existing else 'all',
+            )
+            if stats['stopped']:
+                current_app.logger.info("收到停止信号，中断批量生成（下次运行将从中断处继续）")
             
             current_app.logger.info(
                 f"批量生成向量完成！"
@@ -208,7 +135,7 @@ def batch_generate_vectors():
         })
     
     # 检查配置
-    settings = SiteSettings.get_settings()
+    settings = get_site_settings()
     if not settings:
         return jsonify({
             'success': False,
@@ -223,7 +150,7 @@ def batch_generate_vectors():
             'message': 'Embedding API 配置不完整，请先配置API地址、密钥和模型'
         })
     
-    if not settings.qdrant_url:
+    if not is_vector_search_configured(settings):
         return jsonify({
             'success': False,
             'message': 'Qdrant URL 未配置'
@@ -287,7 +214,9 @@ def batch_generate_vectors_status():
         'failed': vector_indexing_status['failed'],
         'skipped': vector_indexing_status['skipped'],
         'elapsed_time': elapsed_time,
-        'percent': percent
+        'percent': percent,
+        # 保存网站后的后台索引队列
+        'queue': get_vector_queue_stats()
     })
     
     # 添加禁用缓冲的头部
@@ -315,6 +244,6 @@ def batch_generate_vectors_stop():
     
     return jsonify({
         'success': True,
-        'message': '已发送停止信号，任务将在当前网站处理完成后停止'
+        'message': '已发送停止信号，任务将在当前批次处理完成后停止'
     })
 
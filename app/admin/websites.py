@@ -9,8 +9,7 @@ from app import db, csrf
 from app.admin import bp
 from app.admin.forms import WebsiteForm
 from app.admin.decorators import admin_required
-from app.admin.utils import trigger_vector_indexing
-from app.models import Category, Website, OperationLog, SiteSettings
+from app.models import Category, Website, OperationLog
 from app.utils.icon_service import (
     delete_website_icon_assets,
     download_icon_to_local,
@@ -19,6 +18,8 @@ from app.utils.icon_service import (
     sync_icon_after_save,
     upload_icon_to_imagebed,
 )
+from app.utils.settings_cache import get_site_settings
+from app.utils.vector_queue import enqueue_vector_indexing
 
 
 def _apply_icon_form_defaults(form, website=None):
@@ -182,7 +183,7 @@ def batch_update_websites():
 def add_website():
     form = WebsiteForm()
     if form.validate_on_submit():
-        settings = SiteSettings.get_settings()
+        settings = get_site_settings()
         website = Website(
             title=form.title.data,
             url=form.url.data,
@@ -232,7 +233,7 @@ def add_website():
         
         # 异步生成向量（如果向量搜索已启用）
         try:
-            trigger_vector_indexing(website.id, category_name)
+            enqueue_vector_indexing(website.id)
         except Exception as e:
             current_app.logger.warning(f"触发向量生成失败: {str(e)}")
         
@@ -327,19 +328,11 @@ def edit_website(id):
             except Exception as e:
                 current_app.logger.error(f"记录修改操作日志失败: {str(e)}")
         
-        # 检查是否需要更新向量（标题、描述或分类变化时）
-        needs_vector_update = (
-            old_title != website.title or
-            old_description != website.description or
-            old_category_id != website.category_id
-        )
-        
-        if needs_vector_update:
-            try:
-                new_category_name = website.category.name if website.category else None
-                trigger_vector_indexing(website.id, new_category_name)
-            except Exception as e:
-                current_app.logger.warning(f"触发向量更新失败: {str(e)}")
+        # 更新向量索引（标题、描述、分类、URL、权限都未变化时按内容哈希跳过）
+        try:
+            enqueue_vector_indexing(website.id)
+        except Exception as e:
+            current_app.logger.warning(f"触发向量更新失败: {str(e)}")
         
         flash('网站更新成功', 'success')
         return redirect(url_for('admin.websites'))
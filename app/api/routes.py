@@ -146,20 +146,12 @@ def update_website(id):
         if 'icon' in data or 'url' in data:
             sync_icon_after_save(website, icon_url=data.get('icon') if 'icon' in data else None, auto_fetch=True)
         
-        # 检查是否需要更新向量（标题、描述或分类变化时）
-        needs_vector_update = (
-            old_title != website.title or
-            old_description != website.description or
-            old_category_id != website.category_id
-        )
-        
-        if needs_vector_update:
-            try:
-                from app.main.api_website import _trigger_vector_indexing
-                new_category_name = website.category.name if website.category else None
-                _trigger_vector_indexing(website.id, new_category_name)
-            except Exception as e:
-                current_app.logger.warning(f"触发向量更新失败: {str(e)}")
+        # 更新向量索引（标题、描述、分类、URL、权限都未变化时按内容哈希跳过）
+        try:
+            from app.utils.vector_queue import enqueue_vector_indexing
+            enqueue_vector_indexing(website.id)
+        except Exception as e:
+            current_app.logger.warning(f"触发向量更新失败: {str(e)}")
         
         return jsonify({
             'success': True,
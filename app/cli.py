@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""命令行工具 - flask perf 性能检查命令"""
+
+import click
+from flask.cli import AppGroup
+
+
+perf_cli = AppGroup('perf', help='性能检查工具')
+
+
+@perf_cli.command('explain')
+@click.option('--websites', default=5000, show_default=True, help='合成目录的网站数量')
+@click.option('--verbose', '-v', is_flag=True, help='输出每条查询的完整执行计划')
+def explain_command(websites, verbose):
+    """检查热点查询的执行计划，出现全表扫描时以非零状态退出"""
+    from app.utils.query_plan import run_plan_checks
+
+    results = run_plan_checks(website_count=websites)
+    failed = [result for result in results if not result.ok]
+
+    for result in results:
+        status = 'OK  ' if result.ok else 'FAIL'
+        click.echo(f'[{status}] {result.name:<18} {result.role}')
+        if verbose or not result.ok:
+            for detail in result.plan:
+                marker = '  !!' if detail in result.violations else '    '
+                click.echo(f'{marker} {detail}')
+
+    click.echo(f'\n共 {len(results)} 项，失败 {len(failed)} 项')
+    if failed:
+        raise SystemExit(1)
+
+
+@perf_cli.command('startup')
+@click.option('--top', default=20, show_default=True, help='列出的模块/依赖包数量')
+@click.option('--budget-ms', type=float, default=None, help='启动总耗时预算（毫秒），超出时以非零状态退出')
+def startup_command(top, budget_ms):
+    """统计各模块导入耗时和 create_app() 总耗时（在独立子进程中测量）"""
+    from app.utils.startup_profile import profile_startup
+
+    report = profile_startup()
+
+    click.echo('项目模块（累计导入耗时，含其导入的依赖）:')
+    for record in report.app_modules(top):
+        click.echo(f'  {record.cumulative_us / 1000:>9.1f} ms  {"  " * record.depth}{record.name}')
+
+    click.echo('\n依赖包（自身导入耗时汇总）:')
+    for package, ms in report.packages(top):
+        click.echo(f'  {ms:>9.1f} ms  {package}')
+
+    click.echo(f'\n导入 app 包: {report.import_ms:.1f} ms')
+    click.echo(f'create_app(): {report.create_app_ms:.1f} ms')
+    click.echo(f'启动总耗时: {report.total_ms:.1f} ms')
+
+    if budget_ms is not None and report.total_ms > budget_ms:
+        click.echo(f'超出启动预算 {budget_ms:.0f} ms')
+        raise SystemExit(1)
+
+
+@perf_cli.command('vectors')
+@click.option('--qdrant-url', default=':memory:', show_default=True,
+              help='Qdrant 服务地址；:memory: 使用进程内本地模式（不建索引、不量化，只验证参数）')
+@click.option('--config', 'config_names', multiple=True,
+              help='要测试的配置（可多次指定）：current 或内置配置名，默认测试全部内置配置')
+@click.option('--count', default=20000, show_default=True, help='合成向量数量')
+@click.option('--dim', 'dimension', default=768, show_default=True, help='向量维度')
+@click.option('--queries', default=200, show_default=True, help='查询次数')
+@click.option('--top-k', 'k', default=10, show_default=True, help='每次检索返回的数量（recall@k）')
+@click.option('--seed', default=42, show_default=True, help='随机种子')
+def vectors_command(qdrant_url, config_names, count, dimension, queries, k, seed):
+    """比较 Qdrant 集合参数（HNSW、int8 量化、磁盘存储）的 recall@k 和检索延迟"""
+    from app.utils.settings_cache import get_site_settings
+    from app.utils.vector_benchmark import resolve_configs, run_vector_benchmark
+
+    try:
+        configs = resolve_configs(list(config_names), get_site_settings() if 'current' in config_names else None)
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint='--config')
+
+    if qdrant_url == ':memory:':
+        click.echo('注意: 本地模式不建 HNSW 索引也不量化，各配置均为精确检索，用 --qdrant-url 指向 Qdrant 服务比较真实差异\n')
+    click.echo(f'{count} 个 {dimension} 维向量，{queries} 次查询，k={k}')
+    results = run_vector_benchmark(configs, qdrant_url=qdrant_url, count=count, dimension=dimension,
+                                   queries=queries, k=k, seed=seed, progress=click.echo)
+
+    click.echo(f'\n{"配置":<16}{"建索引 s":>10}{"recall@" + str(k):>12}{"p50 ms":>10}{"p95 ms":>10}{"估算内存 MB":>14}')
+    for result in results:
+        click.echo(
+            f'{result.name:<16}{result.build_seconds:>10.1f}{result.recall:>12.4f}'
+            f'{result.p50_ms:>10.2f}{result.p95_ms:>10.2f}{result.estimated_ram_mb:>14.1f}'
+        )
+
+
+def register_cli(app) -> None:
+    """注册命令行工具"""
+    app.cli.add_command(perf_cli)
@@ -2,18 +2,81 @@
 # -*- coding: utf-8 -*-
 """搜索相关API路由"""
 
-from flask import request, jsonify, Response, stream_with_context, current_app
+from flask import request, jsonify, Response, stream_with_context, current_app, copy_current_request_context
 from flask_login import current_user, login_required
+from sqlalchemy.orm import joinedload, load_only
 from app.main import bp
-from app.models import Website, SiteSettings, Category
-from sqlalchemy import or_
+from app import db
+from app.models import Website, Category, WebsiteIcon
+from app.utils.fts_search import apply_keyword_search
+from app.utils.settings_cache import get_site_settings
+from app.utils.visibility import apply_visibility, visibility_key, visibility_scope
 from concurrent.futures import ThreadPoolExecutor
-from typing import Optional
+from typing import Dict, List, Optional
 import time
 import json as json_module
 import sys
 
 
+# 本地混合排序返回的结果数，以及先本地排序再交给大模型精排的候选数
+HYBRID_MAX_RESULTS = 20
+HYBRID_LLM_CANDIDATES = 60
+
+
+def _rank_mode(settings) -> str:
+    """AI 搜索的排序方式：llm / hybrid / hybrid_llm"""
+    mode = getattr(settings, 'ai_rank_mode', None) or 'llm'
+    return mode if mode in ('llm', 'hybrid', 'hybrid_llm') else 'llm'
+
+
+def _recommend_websites(rerank_ai_service, settings, query: str, intent: Dict, websites_for_ai: List[Dict],
+                        vector_scores: Optional[Dict[int, float]] = None, max_recommendations: int = 20) -> Dict:
+    """
+    大模型精排（按查询、意图、候选集指纹和模型缓存归一化后的结果，候选内容变化后自动失效）
+
+    Args:
+        rerank_ai_service: 精排 AI 服务
+        settings: 站点设置
+        query: 搜索查询
+        intent: 意图理解结果
+        websites_for_ai: 候选网站
+        vector_scores: 网站ID -> 向量相似度
+        max_recommendations: 最多推荐数量
+
+    Returns:
+        recommend_websites 的返回值（recommendations / summary）
+    """
+    cache_key = None
+    try:
+        from app.utils.ai_search import get_ai_model_for_task
+        from app.utils.cache import get_rerank_cache_key, get_cached_rerank_result
+        cache_key = get_rerank_cache_key(query, intent, websites_for_ai,
+                                         get_ai_model_for_task(settings, task='rerank'), max_recommendations,
+                                         vector_scores)
+        cached = get_cached_rerank_result(cache_key)
+        if cached is not None:
+            return cached
+    except Exception as e:
+        current_app.logger.warning(f"读取精排缓存失败: {str(e)}")
+
+    recommendations = rerank_ai_service.recommend_websites(
+        query,
+        intent,
+        websites_for_ai,
+        vector_scores=vector_scores,
+        max_recommendations=max_recommendations
+    )
+
+    # 模型没有给出推荐时不缓存，下次重新请求
+    if cache_key and recommendations and recommendations.get('recommendations'):
+        try:
+            from app.utils.cache import cache_rerank_result
+            cache_rerank_result(cache_key, recommendations)
+        except Exception as e:
+            current_app.logger.warning(f"缓存精排结果失败: {str(e)}")
+    return recommendations
+
+
 @bp.route('/api/search')
 def api_search():
     """搜索API（支持AI搜索和传统搜索）"""
@@ -25,19 +88,29 @@ def api_search():
         return jsonify({"websites": []})
     
     user_id = current_user.id if current_user.is_authenticated else None
+    # 搜索缓存按可见性范围区分，可见数据相同的用户共享缓存条目
+    scope = ('user', user_id) if user_id is not None else ('anonymous',)
+    try:
+        # 在检索之前读取目录版本号：若检索期间有写入，结果会记在旧版本下，不会被当作新数据复用
+        from app.utils.cache import get_search_generation
+        get_search_generation()
+        scope = visibility_scope(current_user)
+    except Exception as e:
+        current_app.logger.warning(f"读取目录版本号失败: {str(e)}")
+    settings = get_site_settings()
+    rank_mode = _rank_mode(settings)
+    
     if not progressive:
         try:
             from app.utils.cache import get_cached_search_result, cache_search_result
             cache_enabled = not use_ai or len(query) <= 5
             if cache_enabled:
-                cached_result = get_cached_search_result(query, use_ai, user_id)
+                cached_result = get_cached_search_result(query, use_ai, scope, rank_mode if use_ai else None)
                 if cached_result:
                     return jsonify(cached_result)
         except Exception as e:
             current_app.logger.warning(f"缓存检查失败: {str(e)}")
     
-    settings = SiteSettings.get_settings()
-    
     # 检查是否允许非登录用户使用AI搜索
     if use_ai and settings.ai_search_enabled:
         if not current_user.is_authenticated and not settings.ai_search_allow_anonymous:
@@ -46,36 +119,33 @@ def api_search():
             progressive = False
     
     base_query = Website.query
-    if not current_user.is_authenticated:
-        base_query = base_query.filter_by(is_private=False)
-    elif not current_user.is_admin:
-        base_query = base_query.filter(
-            (Website.is_private == False) |
-            (Website.created_by_id == current_user.id) |
-            (Website.visible_to.contains(str(current_user.id)))
-        )
+    base_query = apply_visibility(base_query, current_user)
     
     if progressive and use_ai and settings.ai_search_enabled:
         return _progressive_search(query, user_id)
     
     if use_ai and settings.ai_search_enabled:
         try:
-            from app.utils.ai_search import create_ai_service_from_settings
-
-            rerank_ai_service = create_ai_service_from_settings(
-                settings,
-                require_enabled=True,
-                task='rerank'
-            )
-            intent_ai_service = create_ai_service_from_settings(
-                settings,
-                require_enabled=True,
-                task='intent'
-            )
+            rerank_ai_service = None
+            intent_ai_service = None
+            # 纯本地混合排序不调用大模型（意图理解也跳过）
+            if rank_mode != 'hybrid':
+                from app.utils.ai_search import create_ai_service_from_settings
 
-            if rerank_ai_service:
+                rerank_ai_service = create_ai_service_from_settings(
+                    settings,
+                    require_enabled=True,
+                    task='rerank'
+                )
+                intent_ai_service = create_ai_service_from_settings(
+                    settings,
+                    require_enabled=True,
+                    task='intent'
+                )
+
+            if rerank_ai_service or rank_mode != 'llm':
                 
-                needs_ai_intent = (
+                needs_ai_intent = intent_ai_service is not None and (
                     len(query) > 5 or
                     any(word in query for word in ['怎么', '如何', '哪里', '为什么', '什么', '哪个']) or
                     ' ' in query
@@ -85,31 +155,26 @@ def api_search():
                 vector_scores = {}
                 intent = None
                 keyword_results = []
+                # 向量库内按可见性分类过滤
+                vector_visibility = visibility_key(current_user)
                 
+                @copy_current_request_context
                 def do_vector_search():
                     """向量搜索任务"""
-                    embedding_api_url, embedding_api_key = settings.get_embedding_api_config()
-                    if not (settings.vector_search_enabled and all([settings.qdrant_url, settings.embedding_model, embedding_api_url, embedding_api_key])):
+                    from app.utils.vector_service import get_vector_service, is_vector_search_configured
+                    if not (settings.vector_search_enabled and is_vector_search_configured(settings)):
                         return [], {}
                     
                     try:
-                        from app.utils.vector_service import EmbeddingClient, QdrantVectorStore, VectorSearchService
                         
-                        embedding_client = EmbeddingClient(
-                            api_base_url=embedding_api_url,
-                            api_key=embedding_api_key,
-                            model_name=settings.embedding_model or 'text-embedding-3-small'
-                        )
-                        vector_store = QdrantVectorStore(
-                            qdrant_url=settings.qdrant_url,
-                            vector_dimension=embedding_client.dimension
-                        )
-                        vector_service = VectorSearchService(embedding_client, vector_store)
+                        vector_service = get_vector_service(settings)
+                        if vector_service is None:
+                            return [], {}
                         
                         vector_search_results = vector_service.search(
                             query=query,
                             limit=settings.vector_max_results or 50,
-                            user_id=current_user.id if current_user.is_authenticated else None,
+                            visibility=vector_visibility,
                             threshold=settings.vector_similarity_threshold or 0.3
                         )
                         
@@ -118,20 +183,19 @@ def api_search():
                         return site_ids, scores
                     except Exception as e:
                         current_app.logger.warning(f"向量搜索失败: {str(e)}")
+                        # Qdrant 可能已重启或集合被删除，下次搜索时重新创建客户端并检查集合
+                        from app.utils.vector_service import reset_vector_services
+                        reset_vector_services()
                         return [], {}
                 
+                @copy_current_request_context
                 def do_keyword_search():
                     """关键词搜索任务"""
-                    keyword_query = base_query.filter(
-                        or_(
-                            Website.title.ilike(f'%{query}%'),
-                            Website.description.ilike(f'%{query}%'),
-                            Website.url.ilike(f'%{query}%')
-                        )
-                    )
+                    keyword_query = apply_keyword_search(base_query, query)
                     results = keyword_query.limit(200).all()
                     return results
                 
+                @copy_current_request_context
                 def do_ai_intent():
                     """AI意图理解任务（仅在需要时执行）"""
                     if not needs_ai_intent or not intent_ai_service:
@@ -161,23 +225,13 @@ def api_search():
                     if intent.get('keywords'):
                         expanded_keywords = intent['keywords']
                         for keyword in expanded_keywords[:5]:
-                            expanded_query = base_query.filter(
-                                or_(
-                                    Website.title.ilike(f'%{keyword}%'),
-                                    Website.description.ilike(f'%{keyword}%')
-                                )
-                            )
+                            expanded_query = apply_keyword_search(base_query, keyword, columns=('title', 'description'))
                             for site in expanded_query.limit(100).all():
                                 candidate_sites.add(site.id)
                     
                     if intent.get('related_terms'):
                         for term in intent['related_terms'][:3]:
-                            related_query = base_query.filter(
-                                or_(
-                                    Website.title.ilike(f'%{term}%'),
-                                    Website.description.ilike(f'%{term}%')
-                                )
-                            )
+                            related_query = apply_keyword_search(base_query, term, columns=('title', 'description'))
                             for site in related_query.limit(50).all():
                                 candidate_sites.add(site.id)
                 
@@ -197,27 +251,61 @@ def api_search():
                         'url': site.url
                     })
                 
-                if not intent:
-                    intent = {
-                        'intent': f"用户想要查找与'{query}'相关的网站",
-                        'keywords': [query],
-                        'related_terms': [],
-                        'category_hints': []
-                    }
+                hybrid_ids = None
+                if rank_mode != 'llm':
+                    from app.utils.hybrid_ranker import hybrid_rank
+                    ranked = hybrid_rank(
+                        [dict(w, views=website_id_map[w['id']].views, sort_order=website_id_map[w['id']].sort_order)
+                         for w in websites_for_ai],
+                        query,
+                        vector_scores=vector_scores,
+                        keyword_ids=[site.id for site in keyword_results],
+                        extra_terms=(intent or {}).get('keywords') or [],
+                        method=settings.ai_hybrid_method or 'weighted'
+                    )
+                    hybrid_ids = [website_id for website_id, _ in ranked]
                 
-                recommendations = rerank_ai_service.recommend_websites(
-                    query, 
-                    intent, 
-                    websites_for_ai,
-                    vector_scores=vector_scores if vector_scores else None,
-                    max_recommendations=20
-                )
-                ai_summary = recommendations.get('summary')
+                ai_summary = None
+                recommended_ids = hybrid_ids[:HYBRID_MAX_RESULTS] if hybrid_ids is not None else []
+                if rerank_ai_service:
+                    if not intent:
+                        intent = {
+                            'intent': f"用户想要查找与'{query}'相关的网站",
+                            'keywords': [query],
+                            'related_terms': [],
+                            'category_hints': []
+                        }
+                    
+                    # 先经本地混合排序时，只把靠前的候选交给大模型精排
+                    if hybrid_ids is not None:
+                        llm_candidates = {w['id']: w for w in websites_for_ai}
+                        websites_for_ai = [llm_candidates[wid] for wid in hybrid_ids[:HYBRID_LLM_CANDIDATES]]
+                    
+                    try:
+                        recommendations = _recommend_websites(
+                            rerank_ai_service,
+                            settings,
+                            query,
+                            intent,
+                            websites_for_ai,
+                            vector_scores=vector_scores if vector_scores else None,
+                            max_recommendations=20
+                        )
+                    except Exception as e:
+                        # 已有本地排序结果时大模型失败不影响返回，否则按原逻辑降级为传统搜索
+                        if hybrid_ids is None:
+                            raise
+                        current_app.logger.warning(f"AI精排失败，使用本地混合排序: {str(e)}")
+                        recommendations = None
+                    
+                    if recommendations and recommendations.get('recommendations'):
+                        recommended_ids = [rec['website_id'] for rec in recommendations['recommendations']]
+                        ai_summary = recommendations.get('summary')
+                    elif hybrid_ids is None:
+                        recommended_ids = []
+                        ai_summary = recommendations.get('summary') if recommendations else None
                 
-                ai_results = []
-                if recommendations and recommendations.get('recommendations'):
-                    recommended_ids = [rec['website_id'] for rec in recommendations['recommendations']]
-                    ai_results = [website_id_map[wid] for wid in recommended_ids if wid in website_id_map]
+                ai_results = [website_id_map[wid] for wid in recommended_ids if wid in website_id_map]
                 
                 websites_data = []
                 for site in ai_results:
@@ -244,13 +332,14 @@ def api_search():
                     "websites": websites_data,
                     "ai_enabled": True,
                     "ai_summary": ai_summary,
+                    "rank_mode": rank_mode,
                     "total": len(websites_data)
                 }
                 
                 if len(query) <= 5:
                     try:
                         from app.utils.cache import cache_search_result
-                        cache_search_result(query, use_ai, result, user_id, ttl=3600)
+                        cache_search_result(query, use_ai, result, scope, rank_mode=rank_mode)
                     except Exception as e:
                         current_app.logger.warning(f"缓存搜索结果失败: {str(e)}")
                 
@@ -259,13 +348,7 @@ def api_search():
         except Exception as e:
             current_app.logger.error(f"AI 搜索失败: {str(e)}")
     
-    websites_query = base_query.filter(
-        or_(
-            Website.title.ilike(f'%{query}%'),
-            Website.description.ilike(f'%{query}%'),
-            Website.url.ilike(f'%{query}%')
-        )
-    )
+    websites_query = apply_keyword_search(base_query, query)
     
     traditional_results = websites_query.all()
     
@@ -298,16 +381,67 @@ def api_search():
     
     try:
         from app.utils.cache import cache_search_result
-        cache_search_result(query, use_ai, result, user_id, ttl=3600)
+        cache_search_result(query, use_ai, result, scope, rank_mode=rank_mode if use_ai else None)
     except Exception as e:
         current_app.logger.warning(f"缓存搜索结果失败: {str(e)}")
     
     return jsonify(result)
 
 
+def _render_vector_hits(base_query, vector_hits: List[Dict]) -> List[Dict]:
+    """
+    把向量搜索结果转换为前端需要的网站数据
+
+    向量元数据只用于召回和排序，展示的字段一律取自数据库（元数据要等后台队列重新索引后
+    才会更新），按ID只查询需要的列（同时作为权限校验），分类另查一次。
+
+    Args:
+        base_query: 已应用可见性过滤的网站查询
+        vector_hits: vector_service.search 的结果（已按相似度降序）
+
+    Returns:
+        网站数据列表（按相似度降序）
+    """
+    hit_ids = [r['website_id'] for r in vector_hits]
+    icon_load = joinedload(Website.icon_meta).joinedload(WebsiteIcon.icon_asset)
+    sites = {
+        site.id: site
+        for site in base_query.options(
+            load_only(Website.id, Website.title, Website.description, Website.url, Website.icon, Website.views,
+                      Website.is_private, Website.category_id),
+            icon_load,
+        ).filter(Website.id.in_(hit_ids))
+    }
+    category_ids = {site.category_id for site in sites.values() if site.category_id}
+    categories = {}
+    if category_ids:
+        categories = {
+            row.id: {'id': row.id, 'name': row.name, 'icon': row.icon}
+            for row in db.session.query(Category.id, Category.name, Category.icon).filter(Category.id.in_(category_ids))
+        }
+
+    vector_websites = []
+    for hit in vector_hits:
+        site = sites.get(hit['website_id'])
+        if site is None:
+            continue
+        vector_websites.append({
+            'id': site.id,
+            'title': site.title,
+            'description': site.description,
+            'url': site.url,
+            'icon': site.display_icon_url,
+            'category': categories.get(site.category_id),
+            'views': site.views,
+            'is_private': site.is_private,
+            'vector_score': hit['score']
+        })
+    return vector_websites
+
+
 def _progressive_search(query: str, user_id: Optional[int]):
     """渐进式搜索：分阶段返回结果"""
-    settings = SiteSettings.get_settings()
+    settings = get_site_settings()
     
     # 再次检查是否允许非登录用户使用AI搜索（双重保护）
     if not current_user.is_authenticated and not settings.ai_search_allow_anonymous:
@@ -331,25 +465,12 @@ def _progressive_search(query: str, user_id: Optional[int]):
         )
     
     base_query = Website.query
-    if not current_user.is_authenticated:
-        base_query = base_query.filter_by(is_private=False)
-    elif not current_user.is_admin:
-        base_query = base_query.filter(
-            (Website.is_private == False) |
-            (Website.created_by_id == current_user.id) |
-            (Website.visible_to.contains(str(current_user.id)))
-        )
+    base_query = apply_visibility(base_query, current_user)
     
     def generate():
         try:
             # 阶段1: 立即返回关键词搜索结果（最快，不等待其他任务）
-            keyword_query = base_query.filter(
-                or_(
-                    Website.title.ilike(f'%{query}%'),
-                    Website.description.ilike(f'%{query}%'),
-                    Website.url.ilike(f'%{query}%')
-                )
-            )
+            keyword_query = apply_keyword_search(base_query, query)
             keyword_results = keyword_query.limit(20).all()
             
             websites_data = []
@@ -385,59 +506,24 @@ def _progressive_search(query: str, user_id: Optional[int]):
             # 刷新输出缓冲区，确保数据立即发送到客户端
             sys.stdout.flush()
             
-            embedding_api_url, embedding_api_key = settings.get_embedding_api_config()
-            if settings.ai_search_enabled and settings.vector_search_enabled and all([settings.qdrant_url, settings.embedding_model, embedding_api_url, embedding_api_key]):
+            from app.utils.vector_service import get_vector_service, is_vector_search_configured
+            if settings.ai_search_enabled and settings.vector_search_enabled and is_vector_search_configured(settings):
                 try:
-                    from app.utils.vector_service import EmbeddingClient, QdrantVectorStore, VectorSearchService
                     
-                    embedding_client = EmbeddingClient(
-                        api_base_url=embedding_api_url,
-                        api_key=embedding_api_key,
-                        model_name=settings.embedding_model or 'text-embedding-3-small'
-                    )
-                    vector_store = QdrantVectorStore(
-                        qdrant_url=settings.qdrant_url,
-                        vector_dimension=embedding_client.dimension
-                    )
-                    vector_service = VectorSearchService(embedding_client, vector_store)
+                    vector_service = get_vector_service(settings)
                     
                     vector_search_results = vector_service.search(
                         query=query,
                         limit=settings.vector_max_results or 30,
-                        user_id=user_id,
+                        visibility=visibility_key(current_user),
                         threshold=settings.vector_similarity_threshold or 0.3
                     )
                     
                     existing_ids = {site['id'] for site in websites_data}
-                    vector_ids = [r['website_id'] for r in vector_search_results if r['website_id'] not in existing_ids]
+                    vector_hits = [r for r in vector_search_results if r['website_id'] not in existing_ids]
                     
-                    if vector_ids:
-                        vector_query = base_query.filter(Website.id.in_(vector_ids))
-                        vector_results = vector_query.all()
-                        
-                        vector_websites = []
-                        score_map = {r['website_id']: r['score'] for r in vector_search_results}
-                        
-                        for site in vector_results:
-                            category_data = None
-                            if site.category:
-                                category_data = {
-                                    'id': site.category.id,
-                                    'name': site.category.name,
-                                    'icon': site.category.icon
-                                }
-                            
-                            vector_websites.append({
-                                'id': site.id,
-                                'title': site.title,
-                                'description': site.description,
-                                'url': site.url,
-                                    'icon': site.display_icon_url,
-                                'category': category_data,
-                                'views': site.views,
-                                'is_private': site.is_private,
-                                'vector_score': score_map.get(site.id, 0)
-                            })
+                    if vector_hits:
+                        vector_websites = _render_vector_hits(base_query, vector_hits)
                         
                         # 按vector_score降序排序向量结果
                         vector_websites.sort(key=lambda x: x.get('vector_score', 0), reverse=True)
@@ -488,6 +574,8 @@ def _progressive_search(query: str, user_id: Optional[int]):
                         
                 except Exception as e:
                     current_app.logger.warning(f"向量搜索失败: {str(e)}")
+                    from app.utils.vector_service import reset_vector_services
+                    reset_vector_services()
                     enhanced_error_data = {
                         'stage': 'enhanced',
                         'websites': websites_data,
@@ -496,9 +584,25 @@ def _progressive_search(query: str, user_id: Optional[int]):
                     }
                     yield f"data: {json_module.dumps(enhanced_error_data, ensure_ascii=False)}\n\n"
             
+            rank_mode = _rank_mode(settings)
+            hybrid_ranked = False
+            if rank_mode != 'llm' and websites_data:
+                # 本地混合排序：大模型精排（若启用）在此顺序的基础上进行，失败时保留此顺序
+                from app.utils.hybrid_ranker import hybrid_rank
+                ranked = hybrid_rank(
+                    [dict(w, category=(w.get('category') or {}).get('name', '')) for w in websites_data],
+                    query,
+                    vector_scores={w['id']: w['vector_score'] for w in websites_data if w.get('vector_score') is not None},
+                    keyword_ids=[site.id for site in keyword_results],
+                    method=settings.ai_hybrid_method or 'weighted'
+                )
+                website_map = {w['id']: w for w in websites_data}
+                websites_data = [website_map[website_id] for website_id, _ in ranked]
+                hybrid_ranked = True
+            
             rerank_ai_service = None
             intent_ai_service = None
-            if settings.ai_search_enabled:
+            if settings.ai_search_enabled and rank_mode != 'hybrid':
                 try:
                     from app.utils.ai_search import create_ai_service_from_settings
 
@@ -546,7 +650,9 @@ def _progressive_search(query: str, user_id: Optional[int]):
                                 'category_hints': []
                             }
                         
-                        recommendations = rerank_ai_service.recommend_websites(
+                        recommendations = _recommend_websites(
+                            rerank_ai_service,
+                            settings,
                             query,
                             intent,
                             websites_for_ai,
@@ -605,8 +711,8 @@ def _progressive_search(query: str, user_id: Optional[int]):
                     'stage': 'final',
                     'websites': websites_data,
                     'total': len(websites_data),
-                    'ai_enabled': False,
-                    'status': '搜索完成'
+                    'ai_enabled': hybrid_ranked,
+                    'status': '混合排序完成' if hybrid_ranked else '搜索完成'
                 }
                 yield f"data: {json_module.dumps(final_complete_data, ensure_ascii=False)}\n\n"
                 
@@ -630,6 +736,39 @@ def _progressive_search(query: str, user_id: Optional[int]):
     )
 
 
+@bp.route('/api/suggest')
+def api_suggest():
+    """搜索联想（前缀匹配网站标题、域名和分类名，读内存索引，其他进程修改目录后重建）"""
+    query = request.args.get('q', '').strip()
+    limit = max(1, min(request.args.get('limit', 8, type=int) or 8, 20))
+    if not query:
+        return jsonify({"suggestions": []})
+    
+    from app.utils.suggest_index import KIND_CATEGORY, get_suggest_index, suggest
+    index = get_suggest_index()
+    
+    suggestions = []
+    for entry in suggest(query, current_user, limit):
+        if entry.kind == KIND_CATEGORY:
+            suggestions.append({
+                'type': 'category',
+                'id': entry.id,
+                'text': entry.text
+            })
+            continue
+        category = index.get(KIND_CATEGORY, entry.category_id) if entry.category_id else None
+        suggestions.append({
+            'type': 'website',
+            'id': entry.id,
+            'text': entry.text,
+            'url': entry.url,
+            'domain': entry.domain,
+            'category': category.text if category else None
+        })
+    
+    return jsonify({"suggestions": suggestions})
+
+
 @bp.route('/api/cache/stats')
 @login_required
 def cache_stats():
@@ -639,7 +778,20 @@ def cache_stats():
     
     try:
         from app.utils.cache import get_cache_stats
+        from app.utils.embedding_store import get_embedding_store
+        from app.utils.http_client import get_http_stats
+        from app.utils.page_cache import get_page_cache_stats
+        from app.utils.settings_cache import get_settings_cache_stats
+        from app.utils.suggest_index import get_suggest_index
+        from app.utils.vector_queue import get_vector_queue_stats
         stats = get_cache_stats()
+        stats['page'] = get_page_cache_stats()
+        stats['suggest'] = get_suggest_index().stats()
+        stats['settings'] = get_settings_cache_stats()
+        store = get_embedding_store()
+        stats['embedding_store'] = store.stats() if store is not None else None
+        stats['http'] = get_http_stats()
+        stats['vector_queue'] = get_vector_queue_stats()
         return jsonify({
             "success": True,
             "stats": stats
@@ -664,6 +816,9 @@ def clear_cache():
             clear_search_cache()
         if cache_type == 'vector' or cache_type == 'all':
             clear_vector_cache()
+        if cache_type == 'page' or cache_type == 'all':
+            from app.utils.page_cache import clear_page_cache
+            clear_page_cache()
         
         return jsonify({
             "success": True,
@@ -683,23 +838,10 @@ def search_in_category(category_id):
     
     category = Category.query.get_or_404(category_id)
     
-    websites = Website.query.filter(
-        Website.category_id == category_id,
-        or_(
-            Website.title.ilike(f'%{query}%'),
-            Website.description.ilike(f'%{query}%'),
-            Website.url.ilike(f'%{query}%')
-        )
-    )
+    # 分类内搜索保持分类的手动排序，只用全文索引过滤
+    websites = apply_keyword_search(Website.query.filter(Website.category_id == category_id), query, rank=False)
     
-    if not current_user.is_authenticated:
-        websites = websites.filter_by(is_private=False)
-    elif not current_user.is_admin:
-        websites = websites.filter(
-            (Website.is_private == False) |
-            (Website.created_by_id == current_user.id) |
-            (Website.visible_to.contains(str(current_user.id)))
-        )
+    websites = apply_visibility(websites, current_user)
     
     websites = websites.order_by(Website.sort_order.desc(), Website.created_at.asc(), Website.views.desc()).all()
     
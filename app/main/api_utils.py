@@ -5,16 +5,17 @@
 from flask import request, jsonify, Response, stream_with_context, current_app
 from flask_login import current_user, login_required
 from app.main import bp
-from app.models import Website, Category, SiteSettings
+from app.models import Website, Category
 from app.main.utils import parse_website_info, get_website_icon
+from app.utils.category_counts import get_category_counts
+from app.utils.http_client import http_get
+from app.utils.settings_cache import get_site_settings
 from urllib.parse import urlparse
 import json
-import requests
-from bs4 import BeautifulSoup
 
 
 def _get_configured_icon_result(url):
-    settings = SiteSettings.get_settings()
+    settings = get_site_settings()
     return get_website_icon(url, providers=settings.get_icon_source_providers())
 
 
@@ -66,7 +67,7 @@ def fetch_website_info():
         try:
             from app.utils.ai_search import create_ai_service_from_settings
             
-            settings = SiteSettings.get_settings()
+            settings = get_site_settings()
             ai_service = create_ai_service_from_settings(settings, task='site_info')
             
             if not ai_service:
@@ -141,10 +142,9 @@ def translate_description():
         if not text:
             return jsonify({"success": False, "message": "未提供要翻译的文本"})
         
-        from app.models import SiteSettings
         from app.utils.ai_search import create_ai_service_from_settings
         
-        settings = SiteSettings.get_settings()
+        settings = get_site_settings()
         ai_service = create_ai_service_from_settings(settings, task='translate')
         
         if not ai_service:
@@ -177,6 +177,7 @@ def fetch_website_info_with_progress():
         return jsonify({"success": False, "message": "未提供URL参数"})
     
     def generate():
+        from bs4 import BeautifulSoup
         try:
             yield json.dumps({"stage": "init", "progress": 10, "message": "正在连接网站..."}) + "\n"
             
@@ -191,7 +192,7 @@ def fetch_website_info_with_progress():
                 processed_url = 'https://' + processed_url
                 
             yield json.dumps({"stage": "connecting", "progress": 20, "message": "正在下载网页内容..."}) + "\n"
-            response = requests.get(processed_url, headers=headers, timeout=10)
+            response = http_get(processed_url, headers=headers, timeout=10)
             response.raise_for_status()
             
             yield json.dumps({"stage": "analyzing", "progress": 30, "message": "正在分析网页编码..."}) + "\n"
@@ -301,24 +302,14 @@ def get_category_website_count(category_id):
                 'message': '分类不存在'
             }), 404
         
-        websites_query = Website.query.filter_by(category_id=category_id)
-        
-        if not current_user.is_authenticated:
-            websites_query = websites_query.filter_by(is_private=False)
-        elif not current_user.is_admin:
-            websites_query = websites_query.filter(
-                (Website.is_private == False) |
-                (Website.created_by_id == current_user.id) |
-                (Website.visible_to.contains(str(current_user.id)))
-            )
-        
-        total_count = websites_query.count()
+        counts = get_category_counts(current_user)
         
         return jsonify({
             'success': True,
             'category_id': category_id,
             'category_name': category.name,
-            'total_count': total_count
+            'total_count': counts.direct_count(category_id),
+            'total_count_with_children': counts.total_count(category_id)
         })
     except Exception as e:
         return jsonify({
@@ -6,10 +6,12 @@ from flask import request, jsonify, current_app
 from flask_login import current_user, login_required
 from app import db, csrf
 from app.main import bp
-from app.models import Website, Category, OperationLog, SiteSettings
+from app.models import Website, Category, OperationLog
 from app.utils.icon_service import delete_website_icon_assets, sync_icon_after_save
+from app.utils.settings_cache import get_site_settings
+from app.utils.vector_queue import enqueue_vector_indexing
+from app.utils.visibility import apply_visibility
 import json
-import threading
 
 
 @bp.route('/api/website/<int:site_id>/update', methods=['POST'])
@@ -27,10 +29,6 @@ def update_website(site_id):
         if not current_user.is_admin:
             return jsonify({"success": False, "message": "没有权限执行此操作"}), 403
         
-        old_title = site.title
-        old_description = site.description
-        old_category_id = site.category_id
-
         if 'title' in data:
             site.title = data['title']
         if 'url' in data:
@@ -51,20 +49,11 @@ def update_website(site_id):
         if 'icon' in data or 'url' in data:
             sync_icon_after_save(site, icon_url=data.get('icon') if 'icon' in data else None, auto_fetch=True)
         
-        # 检查是否需要更新向量（标题、描述或分类变化时）
-        needs_vector_update = (
-            ('title' in data and data['title'] != old_title) or
-            ('description' in data and data.get('description') != old_description) or
-            ('category_id' in data and data.get('category_id') != old_category_id)
-        )
-        
-        if needs_vector_update:
-            try:
-                category = Category.query.get(site.category_id) if site.category_id else None
-                category_name = category.name if category else None
-                _trigger_vector_indexing(site.id, category_name)
-            except Exception as e:
-                current_app.logger.warning(f"触发向量更新失败: {str(e)}")
+        # 更新向量索引（标题、描述、分类、URL、权限都未变化时按内容哈希跳过）
+        try:
+            enqueue_vector_indexing(site.id)
+        except Exception as e:
+            current_app.logger.warning(f"触发向量更新失败: {str(e)}")
         
         return jsonify({
             "success": True, 
@@ -171,19 +160,11 @@ def api_update_website(id):
         db.session.add(operation_log)
         db.session.commit()
     
-    # 检查是否需要更新向量（标题、描述或分类变化时）
-    needs_vector_update = (
-        old_title != website.title or
-        old_description != website.description or
-        old_category_id != website.category_id
-    )
-    
-    if needs_vector_update:
-        try:
-            new_category_name = website.category.name if website.category else None
-            _trigger_vector_indexing(website.id, new_category_name)
-        except Exception as e:
-            current_app.logger.warning(f"触发向量更新失败: {str(e)}")
+    # 更新向量索引（标题、描述、分类、URL、权限都未变化时按内容哈希跳过）
+    try:
+        enqueue_vector_indexing(website.id)
+    except Exception as e:
+        current_app.logger.warning(f"触发向量更新失败: {str(e)}")
     
     return jsonify({
         'success': True, 
@@ -315,18 +296,11 @@ def api_modify_link():
             db.session.add(operation_log)
             db.session.commit()
         
-        # 检查是否需要更新向量（标题、描述变化时）
-        needs_vector_update = (
-            old_title != website.title or
-            old_description != website.description
-        )
-        
-        if needs_vector_update:
-            try:
-                category_name = website.category.name if website.category else None
-                _trigger_vector_indexing(website.id, category_name)
-            except Exception as e:
-                current_app.logger.warning(f"触发向量更新失败: {str(e)}")
+        # 更新向量索引（标题、描述、分类、URL、权限都未变化时按内容哈希跳过）
+        try:
+            enqueue_vector_indexing(website.id)
+        except Exception as e:
+            current_app.logger.warning(f"触发向量更新失败: {str(e)}")
         
         return jsonify({'success': True, 'message': '链接已更新'})
     except Exception as e:
@@ -362,14 +336,7 @@ def update_website_order():
         
         all_websites_query = Website.query.filter_by(category_id=category_id)
         
-        if not current_user.is_authenticated:
-            all_websites_query = all_websites_query.filter_by(is_private=False)
-        elif not current_user.is_admin:
-            all_websites_query = all_websites_query.filter(
-                (Website.is_private == False) |
-                (Website.created_by_id == current_user.id) |
-                (Website.visible_to.contains(str(current_user.id)))
-            )
+        all_websites_query = apply_visibility(all_websites_query, current_user)
         
         all_websites = all_websites_query.all()
         total_websites = len(all_websites)
@@ -448,7 +415,7 @@ def quick_add_website():
         sync_icon_after_save(
             website,
             icon_url=data.get('icon', '') or '',
-            auto_fetch=bool(SiteSettings.get_settings().icon_auto_fetch_on_create),
+            auto_fetch=bool(get_site_settings().icon_auto_fetch_on_create),
         )
         
         category_name = Category.query.get(data['category_id']).name if data['category_id'] else None
@@ -468,7 +435,7 @@ def quick_add_website():
         
         # 异步生成向量（如果向量搜索已启用）
         try:
-            _trigger_vector_indexing(website.id, category_name)
+            enqueue_vector_indexing(website.id)
         except Exception as e:
             current_app.logger.warning(f"触发向量生成失败: {str(e)}")
         
@@ -526,81 +493,3 @@ def check_url_exists():
     
     return jsonify({'exists': False})
 
-
-def _trigger_vector_indexing(website_id: int, category_name: str = None):
-    """
-    异步触发向量生成（后台线程执行，不阻塞主流程）
-    
-    Args:
-        website_id: 网站ID
-        category_name: 分类名称（如果为None，会从数据库查询）
-    """
-    # 在主线程中获取应用实例（必须在应用上下文中调用）
-    try:
-        app = current_app._get_current_object()
-    except RuntimeError:
-        # 如果不在应用上下文中，无法启动后台任务
-        return
-    
-    def _generate_vector_in_background():
-        try:
-            # 在后台线程中创建新的应用上下文
-            with app.app_context():
-                settings = SiteSettings.get_settings()
-                
-                # 检查向量搜索是否启用
-                embedding_api_url, embedding_api_key = settings.get_embedding_api_config()
-                if not (settings and settings.vector_search_enabled and 
-                        all([settings.qdrant_url, settings.embedding_model, 
-                             embedding_api_url, embedding_api_key])):
-                    return
-                
-                # 获取网站信息
-                website = Website.query.get(website_id)
-                if not website:
-                    return
-                
-                # 如果没有提供分类名称，从数据库查询
-                if category_name is None and website.category_id:
-                    category = Category.query.get(website.category_id)
-                    cat_name = category.name if category else ""
-                else:
-                    cat_name = category_name or ""
-                
-                # 初始化向量服务
-                from app.utils.vector_service import EmbeddingClient, QdrantVectorStore, VectorSearchService
-                
-                embedding_client = EmbeddingClient(
-                    api_base_url=embedding_api_url,
-                    api_key=embedding_api_key,
-                    model_name=settings.embedding_model or 'text-embedding-3-small'
-                )
-                vector_store = QdrantVectorStore(
-                    qdrant_url=settings.qdrant_url,
-                    vector_dimension=embedding_client.dimension
-                )
-                vector_service = VectorSearchService(embedding_client, vector_store)
-                
-                # 生成向量
-                vector_service.index_website(
-                    website_id=website.id,
-                    title=website.title or "",
-                    description=website.description or "",
-                    category_name=cat_name,
-                    url=website.url or ""
-                )
-                
-                app.logger.info(f"网站 {website_id} 向量生成成功")
-        except Exception as e:
-            # 异常处理也需要在应用上下文中，如果上下文创建失败，使用 print 作为后备
-            try:
-                with app.app_context():
-                    app.logger.error(f"后台向量生成失败 (website_id={website_id}): {str(e)}")
-            except Exception:
-                # 如果连应用上下文都无法创建，使用 print 作为最后的后备
-                print(f"后台向量生成失败 (website_id={website_id}): {str(e)}")
-    
-    # 在后台线程中执行，不阻塞主流程
-    thread = threading.Thread(target=_generate_vector_in_background, daemon=True)
-    thread.start()
-
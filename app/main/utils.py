@@ -4,11 +4,11 @@
 
 from __future__ import annotations
 
-import requests
-from bs4 import BeautifulSoup
 from pathlib import Path
 from urllib.parse import quote, urljoin, urlparse
 
+from app.utils.http_client import http_get
+
 
 ICON_PROXY_SIZE = 128
 ICON_FETCH_HEADERS = {
@@ -176,7 +176,8 @@ def _fetch_origin_icon_candidates(url):
     candidates = []
 
     try:
-        response = requests.get(processed_url, headers=ICON_FETCH_HEADERS, timeout=10)
+        from bs4 import BeautifulSoup
+        response = http_get(processed_url, headers=ICON_FETCH_HEADERS, timeout=10)
         response.raise_for_status()
         soup = BeautifulSoup(response.text, 'html.parser')
         for link in soup.find_all('link'):
@@ -282,7 +283,7 @@ def find_reachable_icon_candidate(url, providers=None, preferred_provider: str |
 
     for candidate in candidates:
         try:
-            response = requests.get(candidate['url'], headers=ICON_FETCH_HEADERS, timeout=8)
+            response = http_get(candidate['url'], headers=ICON_FETCH_HEADERS, timeout=8)
             response.raise_for_status()
             if not response.content:
                 raise ValueError('empty response body')
@@ -297,6 +298,8 @@ def find_reachable_icon_candidate(url, providers=None, preferred_provider: str |
 
 def parse_website_info(url):
     """解析网站信息（标题、描述）"""
+    # BeautifulSoup 只在解析网页时加载，不拖慢应用启动
+    from bs4 import BeautifulSoup
     try:
         processed_url = url
         if not processed_url.startswith(('http://', 'https://')):
@@ -307,7 +310,7 @@ def parse_website_info(url):
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
             'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
         }
-        response = requests.get(processed_url, headers=headers, timeout=10)
+        response = http_get(processed_url, headers=headers, timeout=10)
         response.raise_for_status()
         
         content_type = response.headers.get('content-type', '').lower()
@@ -421,7 +424,7 @@ def get_website_icon(url, providers=None, preferred_provider: str | None = None)
         }
         
         api_url = f"https://v2.xxapi.cn/api/ico?url={processed_url}"
-        response = requests.get(api_url, headers=headers, timeout=5)
+        response = http_get(api_url, headers=headers, timeout=5)
         
         try:
             result = response.json()
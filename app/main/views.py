@@ -7,10 +7,15 @@ from flask_login import current_user, login_required
 from sqlalchemy.orm import joinedload
 from app import db
 from app.main import bp
-from app.models import Category, Website, SiteSettings, WebsiteIcon
+from app.models import Category, Website, WebsiteIcon
 from app.main.forms import WebsiteForm
 from app.utils.icon_service import delete_website_icon_assets, sync_icon_after_save
-from app.utils.ai_search import resolve_ai_service_candidates
+from app.utils.category_counts import get_category_counts
+from app.utils.fts_search import apply_keyword_search
+from app.utils.nav_snapshot import get_navigation_snapshot
+from app.utils.page_cache import cached_page
+from app.utils.settings_cache import get_site_settings
+from app.utils.visibility import apply_visibility
 from datetime import datetime
 
 
@@ -19,124 +24,28 @@ def _can_show_frontend_ai_search(settings):
         return False
     if not current_user.is_authenticated and not settings.ai_search_allow_anonymous:
         return False
+    from app.utils.ai_search import resolve_ai_service_candidates
     return bool(resolve_ai_service_candidates(settings, task='rerank'))
 
 
 @bp.route('/')
+@cached_page
 def index():
     """首页"""
-    icon_load = joinedload(Website.icon_meta).joinedload(WebsiteIcon.icon_asset)
-
-    # 只获取一级分类（parent_id为None的分类）
-    categories = Category.query.filter_by(parent_id=None).order_by(Category.order.desc()).all()
-    
-    featured_sites_query = Website.query.options(icon_load).filter_by(is_featured=True)
-    if not current_user.is_authenticated:
-        featured_sites_query = featured_sites_query.filter_by(is_private=False)
-    elif not current_user.is_admin:
-        featured_sites_query = featured_sites_query.filter(
-            (Website.is_private == False) |
-            (Website.created_by_id == current_user.id) |
-            (Website.visible_to.contains(str(current_user.id)))
-        )
-    featured_sites = featured_sites_query.order_by(Website.views.desc()).limit(6).all()
-    
-    for category in categories:
-        websites_query = Website.query.options(icon_load).filter_by(category_id=category.id)
-        if not current_user.is_authenticated:
-            websites_query = websites_query.filter_by(is_private=False)
-        elif not current_user.is_admin:
-            websites_query = websites_query.filter(
-                (Website.is_private == False) |
-                (Website.created_by_id == current_user.id) |
-                (Website.visible_to.contains(str(current_user.id)))
-            )
-        
-        # 计算一级分类下直接链接的数量（直接属于一级分类的网站）
-        category.direct_website_count = websites_query.count()
-        
-        # 获取所有子分类并计算每个子分类的网站数量
-        children = category.children.order_by(Category.order.desc()).all()
-        children_total_count = 0
-        for child in children:
-            child_query = Website.query.filter_by(category_id=child.id)
-            if not current_user.is_authenticated:
-                child_query = child_query.filter_by(is_private=False)
-            elif not current_user.is_admin:
-                child_query = child_query.filter(
-                    (Website.is_private == False) |
-                    (Website.created_by_id == current_user.id) |
-                    (Website.visible_to.contains(str(current_user.id)))
-                )
-            # 计算子分类的网站数量
-            child.total_count = child_query.count()
-            children_total_count += child.total_count
-        
-        # 将处理过的子分类列表存储到category对象，供模板使用（即使为空也要设置）
-        category.children_list = children
-        
-        # 如果一级分类有子分类
-        if len(children) > 0:
-            # 一级分类下未分类的链接数量 = 直接链接数量（直接属于一级分类的就是未分类的）
-            category.total_count = category.direct_website_count
-            # 一级分类的总数 = 直接链接数量 + 所有子分类的网站数量
-            category.total_count_with_children = category.direct_website_count + children_total_count
-            
-            # 智能默认显示逻辑：如果未分类网站数量 < display_limit，则显示第一个二级分类的网站
-            if category.direct_website_count < category.display_limit:
-                # 获取第一个二级分类（权重靠前的，order值最大的）
-                first_child = children[0]
-                # 查询第一个二级分类的网站
-                first_child_query = Website.query.options(icon_load).filter_by(category_id=first_child.id)
-                if not current_user.is_authenticated:
-                    first_child_query = first_child_query.filter_by(is_private=False)
-                elif not current_user.is_admin:
-                    first_child_query = first_child_query.filter(
-                        (Website.is_private == False) |
-                        (Website.created_by_id == current_user.id) |
-                        (Website.visible_to.contains(str(current_user.id)))
-                    )
-                # 使用第一个二级分类的网站列表
-                category.website_list = first_child_query.order_by(
-                    Website.sort_order.desc(),
-                    Website.created_at.asc(),
-                    Website.views.desc()
-                ).limit(category.display_limit).all()
-                # 标记当前显示的是第一个子分类（用于可能的后续功能）
-                category.displayed_subcategory_id = first_child.id
-            else:
-                # 未分类网站数量 >= display_limit，显示未分类的网站
-                category.website_list = websites_query.order_by(
-                    Website.sort_order.desc(),
-                    Website.created_at.asc(),
-                    Website.views.desc()
-                ).limit(category.display_limit).all()
-                # 标记当前显示的是未分类
-                category.displayed_subcategory_id = None
-        else:
-            # 如果一级分类没有子分类，直接链接数量就是总数
-            category.total_count = category.direct_website_count
-            category.total_count_with_children = category.direct_website_count
-            # 没有子分类时，直接显示一级分类的网站
-            category.website_list = websites_query.order_by(
-                Website.sort_order.desc(),
-                Website.created_at.asc(),
-                Website.views.desc()
-            ).limit(category.display_limit).all()
-            # 标记当前显示的是主分类
-            category.displayed_subcategory_id = None
-    
-    settings = SiteSettings.get_settings()
+    # 分类树、数量和各分类展示的网站来自导航快照，只在网站或分类变更后重建
+    snapshot = get_navigation_snapshot(current_user)
+    settings = get_site_settings()
     
     return render_template('index.html', 
                            title='首页', 
-                           categories=categories, 
-                           featured_sites=featured_sites,
+                           categories=snapshot.categories, 
+                           featured_sites=snapshot.featured_sites,
                            settings=settings,
                            frontend_ai_search_available=_can_show_frontend_ai_search(settings))
 
 
 @bp.route('/category/<int:id>')
+@cached_page
 def category(id):
     """分类页面"""
     category = Category.query.get_or_404(id)
@@ -146,14 +55,7 @@ def category(id):
     icon_load = joinedload(Website.icon_meta).joinedload(WebsiteIcon.icon_asset)
     websites_query = Website.query.options(icon_load).filter_by(category_id=id)
     
-    if not current_user.is_authenticated:
-        websites_query = websites_query.filter_by(is_private=False)
-    elif not current_user.is_admin:
-        websites_query = websites_query.filter(
-            (Website.is_private == False) |
-            (Website.created_by_id == current_user.id) |
-            (Website.visible_to.contains(str(current_user.id)))
-        )
+    websites_query = apply_visibility(websites_query, current_user)
     
     websites = websites_query.order_by(
         Website.sort_order.desc(),
@@ -173,10 +75,14 @@ def category(id):
         'highlight_id': highlight_id
     }
     
+    counts = get_category_counts(current_user)
+    
     if category.parent_id is not None:
         siblings = Category.query.filter_by(parent_id=category.parent_id)\
                                 .order_by(Category.order.desc())\
                                 .all()
+        for sibling in siblings:
+            sibling.total_count = counts.total_count(sibling.id)
         context['siblings'] = siblings
     
     children = Category.query.filter_by(parent_id=id)\
@@ -184,32 +90,10 @@ def category(id):
                             .all()
     if children:
         context['children'] = children
-        # 计算一级分类下直接链接的数量（未分类的）
-        direct_websites_query = Website.query.filter_by(category_id=id)
-        if not current_user.is_authenticated:
-            direct_websites_query = direct_websites_query.filter_by(is_private=False)
-        elif not current_user.is_admin:
-            direct_websites_query = direct_websites_query.filter(
-                (Website.is_private == False) |
-                (Website.created_by_id == current_user.id) |
-                (Website.visible_to.contains(str(current_user.id)))
-            )
-        # 计算所有子分类的网站数量
-        children_total_count = 0
         for child in children:
-            child_query = Website.query.filter_by(category_id=child.id)
-            if not current_user.is_authenticated:
-                child_query = child_query.filter_by(is_private=False)
-            elif not current_user.is_admin:
-                child_query = child_query.filter(
-                    (Website.is_private == False) |
-                    (Website.created_by_id == current_user.id) |
-                    (Website.visible_to.contains(str(current_user.id)))
-                )
-            child.total_count = child_query.count()
-            children_total_count += child.total_count
+            child.total_count = counts.total_count(child.id)
         # 未分类的数量 = 直接链接数量 - 子分类链接数量
-        context['uncategorized_count'] = max(0, direct_websites_query.count() - children_total_count)
+        context['uncategorized_count'] = max(0, counts.direct_count(id) - counts.children_direct_count(id))
     
     return render_template('category.html', **context)
 
@@ -234,20 +118,9 @@ def search():
         return redirect(url_for('main.index'))
     
     icon_load = joinedload(Website.icon_meta).joinedload(WebsiteIcon.icon_asset)
-    websites_query = Website.query.options(icon_load).filter(
-        Website.title.contains(query) |
-        Website.description.contains(query) |
-        Website.url.contains(query)
-    )
+    websites_query = apply_keyword_search(Website.query.options(icon_load), query)
     
-    if not current_user.is_authenticated:
-        websites_query = websites_query.filter_by(is_private=False)
-    elif not current_user.is_admin:
-        websites_query = websites_query.filter(
-            (Website.is_private == False) |
-            (Website.created_by_id == current_user.id) |
-            (Website.visible_to.contains(str(current_user.id)))
-        )
+    websites_query = apply_visibility(websites_query, current_user)
     
     websites = websites_query.all()
     return render_template('search.html', 
@@ -287,7 +160,7 @@ def add():
             website,
             uploaded_file=form.icon_file.data,
             icon_url=form.icon.data or '',
-            auto_fetch=bool(SiteSettings.get_settings().icon_auto_fetch_on_create),
+            auto_fetch=bool(get_site_settings().icon_auto_fetch_on_create),
         )
         
         category_name = Category.query.get(form.category_id.data).name if form.category_id.data and form.category_id.data != 0 else None
@@ -307,8 +180,8 @@ def add():
         
         # 异步生成向量（如果向量搜索已启用）
         try:
-            from app.main.api_website import _trigger_vector_indexing
-            _trigger_vector_indexing(website.id, category_name)
+            from app.utils.vector_queue import enqueue_vector_indexing
+            enqueue_vector_indexing(website.id)
         except Exception as e:
             current_app.logger.warning(f"触发向量生成失败: {str(e)}")
         
@@ -398,20 +271,12 @@ def edit(id):
             db.session.add(operation_log)
             db.session.commit()
         
-        # 检查是否需要更新向量（标题、描述或分类变化时）
-        needs_vector_update = (
-            old_title != website.title or
-            old_description != website.description or
-            old_category_id != website.category_id
-        )
-        
-        if needs_vector_update:
-            try:
-                from app.main.api_website import _trigger_vector_indexing
-                new_category_name = website.category.name if website.category else None
-                _trigger_vector_indexing(website.id, new_category_name)
-            except Exception as e:
-                current_app.logger.warning(f"触发向量更新失败: {str(e)}")
+        # 更新向量索引（标题、描述、分类、URL、权限都未变化时按内容哈希跳过）
+        try:
+            from app.utils.vector_queue import enqueue_vector_indexing
+            enqueue_vector_indexing(website.id)
+        except Exception as e:
+            current_app.logger.warning(f"触发向量更新失败: {str(e)}")
         
         flash('链接更新成功！', 'success')
         return redirect(url_for('main.site', id=website.id))
@@ -488,7 +353,7 @@ def goto(website_id):
         flash('该网站需要登录后才能访问', 'warning')
         return redirect(url_for('auth.login'))
 
-    settings = SiteSettings.get_settings()
+    settings = get_site_settings()
 
     if current_user.is_authenticated and current_user.is_admin:
         countdown = settings.admin_transition_time or 0
@@ -177,12 +177,26 @@ class Website(db.Model):
             
         # 妫€鏌ユ槸鍚﹀湪鍙鐢ㄦ埛鍒楄〃涓?
         if self.visible_to:
-            visible_user_ids = [int(id) for id in self.visible_to.split(',') if id]
-            return user.id in visible_user_ids
+            from app.utils.visibility import parse_visible_to
+            return user.id in parse_visible_to(self.visible_to)
             
         return False 
 
 
+class WebsiteVisibility(db.Model):
+    """私有网站的可见用户（由 Website.visible_to 同步，供权限过滤走索引）"""
+    __tablename__ = 'website_visibility'
+    website_id = db.Column(db.Integer, db.ForeignKey('website.id', ondelete='CASCADE'), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), primary_key=True)
+
+    __table_args__ = (
+        db.Index('ix_website_visibility_user_website', 'user_id', 'website_id'),
+    )
+
+    def __repr__(self):
+        return f'<WebsiteVisibility website={self.website_id} user={self.user_id}>'
+
+
 class IconAsset(db.Model):
     __tablename__ = 'icon_asset'
 
@@ -266,15 +280,19 @@ class IconSyncTask(db.Model):
 class WebsiteVector(db.Model):
     """缃戠珯鍚戦噺鍏冩暟鎹〃"""
     id = db.Column(db.Integer, primary_key=True)
-    website_id = db.Column(db.Integer, db.ForeignKey('website.id'), unique=True, nullable=False)
+    website_id = db.Column(db.Integer, db.ForeignKey('website.id', ondelete='CASCADE'), unique=True, nullable=False)
     vector_status = db.Column(db.String(20), default='pending')  # pending, completed, failed
     embedding_model = db.Column(db.String(128), default='text-embedding-3-small')
     dimension = db.Column(db.Integer, default=1536)  # 鍚戦噺缁村害
+    content_hash = db.Column(db.String(64), nullable=True)  # 索引内容（embedding 输入文本 + 元数据）的 SHA-256，未变时跳过重新索引
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # 鍏宠仈鍏崇郴
-    website = db.relationship('Website', backref='vector_info', uselist=False)
+    website = db.relationship(
+        'Website',
+        backref=db.backref('vector_info', uselist=False, cascade='all, delete-orphan', passive_deletes=True)
+    )
     
     def __repr__(self):
         return f'<WebsiteVector {self.website_id} - {self.vector_status}>'
@@ -462,6 +480,9 @@ class SiteSettings(db.Model):
     ai_model_probe_signature = db.Column(db.String(64), nullable=True)
     ai_task_bindings_json = db.Column(db.Text, nullable=True)
     ai_task_test_results_json = db.Column(db.Text, nullable=True)
+    # AI 搜索排序方式：llm（大模型推荐）、hybrid（本地混合排序）、hybrid_llm（本地混合排序后再由大模型精排）
+    ai_rank_mode = db.Column(db.String(16), default='llm')
+    ai_hybrid_method = db.Column(db.String(16), default='weighted')  # weighted, rrf
     vector_search_enabled = db.Column(db.Boolean, default=False)
     qdrant_url = db.Column(db.String(512), default='http://localhost:6333')
     embedding_model = db.Column(db.String(128), default='text-embedding-3-small')
@@ -469,6 +490,14 @@ class SiteSettings(db.Model):
     embedding_api_key = db.Column(db.String(512), nullable=True)
     vector_similarity_threshold = db.Column(db.Float, default=0.3)
     vector_max_results = db.Column(db.Integer, default=50)
+    # Qdrant 集合参数：HNSW、量化、磁盘存储在创建集合时生效，hnsw_ef 与重打分在检索时生效
+    qdrant_hnsw_m = db.Column(db.Integer, default=16)
+    qdrant_hnsw_ef_construct = db.Column(db.Integer, default=100)
+    qdrant_hnsw_ef = db.Column(db.Integer, nullable=True)  # 为空时使用 Qdrant 默认值
+    qdrant_quantization = db.Column(db.String(16), default='none')  # none, int8
+    qdrant_quantization_rescore = db.Column(db.Boolean, default=True)
+    qdrant_vectors_on_disk = db.Column(db.Boolean, default=False)
+    qdrant_payload_on_disk = db.Column(db.Boolean, default=False)
     webdav_url = db.Column(db.String(512), nullable=True)
     webdav_username = db.Column(db.String(256), nullable=True)
     webdav_password = db.Column(db.String(512), nullable=True)
@@ -515,13 +544,10 @@ class SiteSettings(db.Model):
         if not db_path:
             return False
 
-        from app.utils.db_migration import migrate_ai_provider_config_table, migrate_site_settings_fields, migrate_webdav_config_table
-        from app.utils.icon_db_migration import migrate_icon_management_tables
+        from app.utils.db_migration import run_schema_migrations
 
-        migrate_site_settings_fields(db_path)
-        migrate_webdav_config_table(db_path)
-        migrate_ai_provider_config_table(db_path)
-        migrate_icon_management_tables(db_path)
+        # 已记录的版本号与实际结构不一致（例如数据库文件被手动替换），重新执行全部迁移步骤
+        run_schema_migrations(db_path, force=True)
         return True
 
     @classmethod
@@ -544,10 +570,15 @@ class SiteSettings(db.Model):
             db.session.add(settings)
             db.session.commit()
 
+        return settings
+
+    @classmethod
+    def prepare_settings(cls):
+        """启动时确保设置记录存在，并把旧版单一 AI 配置迁移为提供方（只在启动或替换数据库后调用）"""
+        settings = cls.get_settings()
         if settings.ensure_legacy_ai_provider():
             settings.sync_legacy_ai_fields_from_providers()
             db.session.commit()
-
         return settings
 
     def get_embedding_api_config(self):
@@ -931,3 +962,15 @@ class DeadlinkCheck(db.Model):
     
     def __repr__(self):
         return f'<DeadlinkCheck {self.url} - {"Valid" if self.is_valid else "Invalid"}>'
+
+
+class DataVersion(db.Model):
+    """数据版本号（目录、设置等写入后递增，用于进程内缓存失效）"""
+    __tablename__ = 'data_version'
+
+    name = db.Column(db.String(32), primary_key=True)
+    version = db.Column(db.BigInteger, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<DataVersion {self.name}={self.version}>'
@@ -574,8 +574,52 @@ document.addEventListener("DOMContentLoaded", function () {
     });
   }
 
+  // 搜索联想（输入停顿后请求 /api/suggest，只读内存索引，不触发完整搜索）
+  const suggestionList = document.getElementById("searchSuggestions");
+  let suggestTimer = null;
+  let suggestController = null;
+
+  function _loadSuggestions(query) {
+    if (!suggestionList) return;
+    if (suggestController) {
+      suggestController.abort();
+    }
+    suggestController =
+      typeof AbortController !== "undefined" ? new AbortController() : null;
+
+    fetch(`/api/suggest?q=${encodeURIComponent(query)}&limit=8`, {
+      signal: suggestController ? suggestController.signal : undefined,
+    })
+      .then((response) => response.json())
+      .then((data) => {
+        suggestionList.innerHTML = "";
+        (data.suggestions || []).forEach(function (item) {
+          const option = document.createElement("option");
+          option.value = item.text;
+          option.label =
+            item.type === "category" ? "分类" : item.domain || item.category || "";
+          suggestionList.appendChild(option);
+        });
+      })
+      .catch(function (error) {
+        if (error.name !== "AbortError") {
+          console.warn("获取搜索联想失败:", error);
+        }
+      });
+  }
+
   // 监听搜索框输入
   searchInput.addEventListener("input", function () {
+    const query = this.value.trim();
+    clearTimeout(suggestTimer);
+    if (query) {
+      suggestTimer = setTimeout(function () {
+        _loadSuggestions(query);
+      }, 150);
+    } else if (suggestionList) {
+      suggestionList.innerHTML = "";
+    }
+
     if (this.value.trim()) {
       clearSearchBtn.style.display = "flex";
     } else {
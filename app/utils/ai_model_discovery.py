@@ -10,12 +10,11 @@ from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from typing import Any, Dict, List, Optional
 
-import requests
-
 from app.utils.ai_search import (
     AIEmptyResponseError,
     AISearchService,
 )
+from app.utils.http_client import http_get
 
 NON_CHAT_MODEL_MARKERS = (
     "embedding",
@@ -91,7 +90,7 @@ def list_provider_models(api_base_url: str, api_key: str, timeout: int = 20) ->
         "Content-Type": "application/json",
     }
 
-    response = requests.get(url, headers=headers, timeout=timeout)
+    response = http_get(url, headers=headers, timeout=timeout)
     response.raise_for_status()
 
     payload = response.json()
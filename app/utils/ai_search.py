@@ -9,6 +9,7 @@ from typing import Any, Dict, List, Optional, Tuple
 
 import requests
 from flask import current_app, has_app_context
+from app.utils.http_client import http_post
 
 
 AI_SEARCH_PROMPT_TEMPLATE = """You are a website search assistant.
@@ -556,7 +557,7 @@ class AISearchService:
         response: Optional[requests.Response] = None
 
         try:
-            response = requests.post(url, json=request_data, headers=headers, timeout=AI_REQUEST_TIMEOUT)
+            response = http_post(url, json=request_data, headers=headers, timeout=AI_REQUEST_TIMEOUT)
             response.raise_for_status()
             if self._response_looks_like_sse(response):
                 _get_logger().warning(
@@ -609,7 +610,7 @@ class AISearchService:
         stream_data.pop("response_format", None)
         stream_data["stream"] = True
 
-        response = requests.post(
+        response = http_post(
             url,
             json=stream_data,
             headers=headers,
@@ -685,7 +686,7 @@ class AISearchService:
         request_data.setdefault("stream", False)
 
         try:
-            response = requests.post(url, json=request_data, headers=headers, timeout=AI_REQUEST_TIMEOUT)
+            response = http_post(url, json=request_data, headers=headers, timeout=AI_REQUEST_TIMEOUT)
             response.raise_for_status()
             if self._response_looks_like_sse(response):
                 _get_logger().warning(
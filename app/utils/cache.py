@@ -1,43 +1,144 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
-"""简单的内存缓存工具（用于搜索优化）"""
+"""缓存引擎（用于搜索优化）- 进程内 LRU + TTL 缓存，或多个 worker 共享、重启后保留的 SQLite 缓存"""
 
-import time
 import hashlib
-from typing import Any, Optional, Dict
+import os
+import pickle
+import sqlite3
+import sys
+import threading
+import time
+from abc import ABC, abstractmethod
+from array import array
+from collections import OrderedDict
 from threading import Lock
-from flask import current_app
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 
-class SimpleCache:
-    """简单的内存缓存实现（线程安全）"""
-    
-    def __init__(self, default_ttl: int = 3600):
+_DEFAULT_STRIPES = 16
+# 每个分段至少容纳的条目数，条目上限很小时减少分段数，避免分段不均导致有效容量过低
+_MIN_ENTRIES_PER_STRIPE = 64
+
+
+def approx_size(value: Any) -> int:
+    """
+    估算缓存值大小（用于字节预算）
+
+    以 pickle 序列化后的长度计：C 实现足够快（一个搜索结果约几微秒），且与共享存储后端的
+    实际占用一致；Python 对象在内存中的实际占用约为该值的数倍。
+
+    Args:
+        value: 缓存值
+
+    Returns:
+        估算的字节数
+    """
+    if isinstance(value, array):
+        return value.itemsize * len(value)
+    try:
+        return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return sys.getsizeof(value)
+
+
+class _Segment:
+    """缓存分段：独立的锁、LRU 链表和计数器"""
+
+    __slots__ = ('lock', 'entries', 'bytes', 'hits', 'misses', 'evictions', 'expirations')
+
+    def __init__(self):
+        self.lock = Lock()
+        # key -> (value, expires_at, size)；OrderedDict 头部为最久未使用
+        self.entries: 'OrderedDict[str, tuple]' = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+
+class CacheBackend(ABC):
+    """缓存后端接口：按命名空间划分，get/set/delete/clear/configure/stats"""
+
+    name = ''
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Any]:
+        """获取缓存值，不存在或已过期时返回None"""
+
+    @abstractmethod
+    def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
+        """设置缓存值，ttl 为None时使用默认过期时间"""
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        """删除缓存条目"""
+
+    @abstractmethod
+    def clear(self) -> None:
+        """清空本命名空间的所有条目"""
+
+    @abstractmethod
+    def configure(self, max_entries: Optional[int] = None, max_bytes: Optional[int] = None) -> None:
+        """调整容量上限（None 表示保持不变）"""
+
+    @abstractmethod
+    def stats(self) -> Dict[str, Any]:
+        """获取统计信息"""
+
+
+class LRUCache(CacheBackend):
+    """
+    线程安全的 LRU + TTL 缓存
+
+    get / set / 淘汰均为 O(1)：条目按访问顺序保存在 OrderedDict 中，超出条目数或字节预算时
+    从最久未使用的一端淘汰；过期条目在访问或淘汰时清理。键按哈希分散到多个分段，
+    每个分段一把锁，gunicorn 多线程并发访问时互不阻塞。
+    """
+
+    def __init__(self, name: str, max_entries: int = 1000, max_bytes: Optional[int] = None,
+                 default_ttl: int = 3600, stripes: int = _DEFAULT_STRIPES,
+                 sizeof: Callable[[Any], int] = approx_size):
         """
         初始化缓存
-        
+
         Args:
-            default_ttl: 默认过期时间（秒），默认1小时
+            name: 命名空间名称（用于统计）
+            max_entries: 最大条目数
+            max_bytes: 最大字节数（None 表示不限制）
+            default_ttl: 默认过期时间（秒）
+            stripes: 分段数
+            sizeof: 估算缓存值字节数的函数
         """
-        self._cache: Dict[str, Dict[str, Any]] = {}
-        self._lock = Lock()
+        self.name = name
         self.default_ttl = default_ttl
-        self._max_size = 1000  # 最大缓存条目数
-    
-    def _make_key(self, prefix: str, *args, **kwargs) -> str:
-        """生成缓存键"""
-        # 将参数序列化为字符串
-        key_parts = [prefix]
-        if args:
-            key_parts.extend(str(arg) for arg in args)
-        if kwargs:
-            sorted_kwargs = sorted(kwargs.items())
-            key_parts.extend(f"{k}={v}" for k, v in sorted_kwargs)
-        
-        key_str = "|".join(key_parts)
-        # 使用hash缩短键长度
-        return hashlib.md5(key_str.encode('utf-8')).hexdigest()
-    
+        self._sizeof = sizeof
+        stripes = max(1, min(stripes, max_entries // _MIN_ENTRIES_PER_STRIPE))
+        self._segments = [_Segment() for _ in range(stripes)]
+        self.configure(max_entries, max_bytes)
+
+    def configure(self, max_entries: Optional[int] = None, max_bytes: Optional[int] = None) -> None:
+        """
+        调整容量上限（超出部分在下一次写入对应分段时淘汰）
+
+        Args:
+            max_entries: 最大条目数（None 表示保持不变）
+            max_bytes: 最大字节数（None 表示保持不变，0 表示不限制）
+        """
+        if max_entries is not None:
+            self.max_entries = max(1, int(max_entries))
+        if max_bytes is not None:
+            self.max_bytes = int(max_bytes) or None
+        elif not hasattr(self, 'max_bytes'):
+            self.max_bytes = None
+        stripes = len(self._segments)
+        self._segment_entries = max(1, -(-self.max_entries // stripes))
+        self._segment_bytes = -(-self.max_bytes // stripes) if self.max_bytes else None
+
+    def _segment(self, key: str) -> _Segment:
+        return self._segments[hash(key) % len(self._segments)]
+
     def get(self, key: str) -> Optional[Any]:
         """
         获取缓存值
@@ -48,18 +149,22 @@ class SimpleCache:
         Returns:
             缓存值，如果不存在或已过期则返回None
         """
-        with self._lock:
-            if key not in self._cache:
+        segment = self._segment(key)
+        with segment.lock:
+            entry = segment.entries.get(key)
+            if entry is None:
+                segment.misses += 1
                 return None
-            
-            entry = self._cache[key]
-            # 检查是否过期
-            if time.time() > entry['expires_at']:
-                del self._cache[key]
+            if entry[1] <= time.monotonic():
+                del segment.entries[key]
+                segment.bytes -= entry[2]
+                segment.expirations += 1
+                segment.misses += 1
                 return None
-            
-            return entry['value']
-    
+            segment.entries.move_to_end(key)
+            segment.hits += 1
+            return entry[0]
+
     def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
         """
         设置缓存值
@@ -69,78 +174,394 @@ class SimpleCache:
             value: 缓存值
             ttl: 过期时间（秒），如果为None则使用默认值
         """
-        with self._lock:
-            # 如果缓存已满，删除最旧的条目
-            if len(self._cache) >= self._max_size:
-                self._evict_oldest()
-            
-            ttl = ttl or self.default_ttl
-            self._cache[key] = {
-                'value': value,
-                'expires_at': time.time() + ttl,
-                'created_at': time.time()
-            }
-    
-    def _evict_oldest(self) -> None:
-        """删除最旧的缓存条目"""
-        if not self._cache:
+        # 估算大小在锁外进行，不阻塞同分段的读取
+        size = self._sizeof(value) if self._segment_bytes else 0
+        if self._segment_bytes and size > self._segment_bytes:
+            # 单个值超过分段预算，缓存它只会把整个分段挤空
             return
-        
-        # 找到最旧的条目
-        oldest_key = min(
-            self._cache.keys(),
-            key=lambda k: self._cache[k]['created_at']
-        )
-        del self._cache[oldest_key]
-    
+        expires_at = time.monotonic() + (ttl or self.default_ttl)
+
+        segment = self._segment(key)
+        with segment.lock:
+            old = segment.entries.pop(key, None)
+            if old is not None:
+                segment.bytes -= old[2]
+            segment.entries[key] = (value, expires_at, size)
+            segment.bytes += size
+            self._evict(segment)
+
+    def _evict(self, segment: _Segment) -> None:
+        """从最久未使用的一端淘汰，直到满足条目数和字节预算（调用方持有分段锁）"""
+        entries = segment.entries
+        max_bytes = self._segment_bytes
+        now = None
+        while len(entries) > self._segment_entries or (max_bytes and segment.bytes > max_bytes):
+            _, (_, expires_at, size) = entries.popitem(last=False)
+            segment.bytes -= size
+            now = now or time.monotonic()
+            if expires_at <= now:
+                segment.expirations += 1
+            else:
+                segment.evictions += 1
+
     def delete(self, key: str) -> None:
         """删除缓存条目"""
-        with self._lock:
-            if key in self._cache:
-                del self._cache[key]
-    
+        segment = self._segment(key)
+        with segment.lock:
+            entry = segment.entries.pop(key, None)
+            if entry is not None:
+                segment.bytes -= entry[2]
+
     def clear(self) -> None:
         """清空所有缓存"""
-        with self._lock:
-            self._cache.clear()
-    
+        for segment in self._segments:
+            with segment.lock:
+                segment.entries.clear()
+                segment.bytes = 0
+
     def stats(self) -> Dict[str, Any]:
-        """获取缓存统计信息"""
-        with self._lock:
+        """获取缓存统计信息（按分段汇总计数器，不遍历条目）"""
+        totals = {'entries': 0, 'bytes': 0, 'hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0}
+        for segment in self._segments:
+            with segment.lock:
+                totals['entries'] += len(segment.entries)
+                totals['bytes'] += segment.bytes
+                totals['hits'] += segment.hits
+                totals['misses'] += segment.misses
+                totals['evictions'] += segment.evictions
+                totals['expirations'] += segment.expirations
+        lookups = totals['hits'] + totals['misses']
+        return {
+            'total_entries': totals['entries'],
+            'max_size': self.max_entries,
+            'bytes': totals['bytes'],
+            'max_bytes': self.max_bytes,
+            'hits': totals['hits'],
+            'misses': totals['misses'],
+            'hit_rate': round(totals['hits'] / lookups, 4) if lookups else 0.0,
+            'evictions': totals['evictions'],
+            'expirations': totals['expirations'],
+            'backend': 'memory',
+            'stripes': len(self._segments),
+        }
+
+
+class SQLiteCache(CacheBackend):
+    """
+    基于 SQLite（WAL 模式）的共享缓存
+
+    同一主机上的所有 gunicorn worker 读写同一个缓存文件，重启后缓存仍然有效，不需要外部服务。
+    值以 pickle 保存；LRU 顺序按访问时间近似（同一条目每分钟最多更新一次访问时间，避免读操作
+    都变成写操作），容量检查每隔若干次写入做一次。
+    """
+
+    # 访问时间的最小更新间隔（秒）
+    TOUCH_INTERVAL = 60
+    # 每隔多少次写入检查一次容量并清理过期条目
+    TRIM_EVERY = 64
+
+    def __init__(self, path: str, name: str, max_entries: int = 1000, max_bytes: Optional[int] = None,
+                 default_ttl: int = 3600):
+        """
+        初始化共享缓存
+
+        Args:
+            path: 缓存数据库文件路径
+            name: 命名空间名称（同一文件中的不同缓存按命名空间区分）
+            max_entries: 最大条目数
+            max_bytes: 最大字节数（按序列化后大小计，None 表示不限制）
+            default_ttl: 默认过期时间（秒）
+        """
+        self.path = path
+        self.name = name
+        self.default_ttl = default_ttl
+        self.max_entries = max(1, int(max_entries))
+        self.max_bytes = max_bytes or None
+        self._local = threading.local()
+        self._counter_lock = Lock()
+        self._writes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+        self._ensure_schema()
+
+    def _connect(self) -> sqlite3.Connection:
+        """每个线程一个连接；fork 出的子进程重新连接"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+        conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    def _ensure_schema(self) -> None:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._connect()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS cache_entry (
+                namespace TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                expires_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                PRIMARY KEY (namespace, key)
+            ) WITHOUT ROWID
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_cache_entry_lru ON cache_entry (namespace, accessed_at)")
+
+    def _count(self, name: str, amount: int = 1) -> None:
+        with self._counter_lock:
+            setattr(self, name, getattr(self, name) + amount)
+
+    def configure(self, max_entries: Optional[int] = None, max_bytes: Optional[int] = None) -> None:
+        """调整容量上限（超出部分在后续写入时淘汰）"""
+        if max_entries is not None:
+            self.max_entries = max(1, int(max_entries))
+        if max_bytes is not None:
+            self.max_bytes = int(max_bytes) or None
+
+    def get(self, key: str) -> Optional[Any]:
+        try:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT value, expires_at, accessed_at FROM cache_entry WHERE namespace = ? AND key = ?",
+                (self.name, key)
+            ).fetchone()
+            if row is None:
+                self._count('_misses')
+                return None
             now = time.time()
-            valid_count = sum(
-                1 for entry in self._cache.values()
-                if entry['expires_at'] > now
+            if row[1] <= now:
+                conn.execute("DELETE FROM cache_entry WHERE namespace = ? AND key = ?", (self.name, key))
+                self._count('_expirations')
+                self._count('_misses')
+                return None
+            if now - row[2] > self.TOUCH_INTERVAL:
+                conn.execute(
+                    "UPDATE cache_entry SET accessed_at = ? WHERE namespace = ? AND key = ?",
+                    (now, self.name, key)
+                )
+            value = pickle.loads(row[0])
+        except (sqlite3.Error, pickle.UnpicklingError, EOFError, AttributeError, ImportError) as e:
+            # 缓存不可用时当作未命中，不影响业务
+            print(f"共享缓存读取失败（{self.name}）: {str(e)}")
+            self._count('_misses')
+            return None
+        self._count('_hits')
+        return value
+
+    def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
+        try:
+            blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception:
+            return
+        if self.max_bytes and len(blob) > self.max_bytes:
+            return
+        now = time.time()
+        try:
+            self._connect().execute(
+                "INSERT OR REPLACE INTO cache_entry (namespace, key, value, size, expires_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (self.name, key, sqlite3.Binary(blob), len(blob), now + (ttl or self.default_ttl), now)
             )
-            expired_count = len(self._cache) - valid_count
-            
-            return {
-                'total_entries': len(self._cache),
-                'valid_entries': valid_count,
-                'expired_entries': expired_count,
-                'max_size': self._max_size
-            }
+        except sqlite3.Error as e:
+            print(f"共享缓存写入失败（{self.name}）: {str(e)}")
+            return
+
+        with self._counter_lock:
+            self._writes += 1
+            should_trim = self._writes % self.TRIM_EVERY == 1
+        if should_trim:
+            self.trim()
+
+    def trim(self) -> None:
+        """清理过期条目，并按访问时间淘汰超出条目数或字节预算的部分"""
+        try:
+            conn = self._connect()
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                expired = conn.execute(
+                    "DELETE FROM cache_entry WHERE namespace = ? AND expires_at <= ?", (self.name, time.time())
+                ).rowcount
+                count, total = conn.execute(
+                    "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache_entry WHERE namespace = ?", (self.name,)
+                ).fetchone()
+                evicted = 0
+                if count > self.max_entries:
+                    evicted += conn.execute(
+                        "DELETE FROM cache_entry WHERE namespace = ? AND key IN ("
+                        "SELECT key FROM cache_entry WHERE namespace = ? ORDER BY accessed_at LIMIT ?)",
+                        (self.name, self.name, count - self.max_entries)
+                    ).rowcount
+                    count, total = conn.execute(
+                        "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache_entry WHERE namespace = ?", (self.name,)
+                    ).fetchone()
+                if self.max_bytes and total > self.max_bytes:
+                    # 按访问时间从旧到新累计大小，删除超出预算的部分
+                    excess = total - self.max_bytes
+                    victims = []
+                    for row_key, size in conn.execute(
+                        "SELECT key, size FROM cache_entry WHERE namespace = ? ORDER BY accessed_at", (self.name,)
+                    ):
+                        victims.append((self.name, row_key))
+                        excess -= size
+                        if excess <= 0:
+                            break
+                    conn.executemany("DELETE FROM cache_entry WHERE namespace = ? AND key = ?", victims)
+                    evicted += len(victims)
+                conn.execute('COMMIT')
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+        except sqlite3.Error as e:
+            print(f"共享缓存清理失败（{self.name}）: {str(e)}")
+            return
+        self._count('_expirations', expired)
+        self._count('_evictions', evicted)
+
+    def delete(self, key: str) -> None:
+        try:
+            self._connect().execute("DELETE FROM cache_entry WHERE namespace = ? AND key = ?", (self.name, key))
+        except sqlite3.Error as e:
+            print(f"共享缓存删除失败（{self.name}）: {str(e)}")
+
+    def clear(self) -> None:
+        try:
+            self._connect().execute("DELETE FROM cache_entry WHERE namespace = ?", (self.name,))
+        except sqlite3.Error as e:
+            print(f"共享缓存清空失败（{self.name}）: {str(e)}")
+
+    def stats(self) -> Dict[str, Any]:
+        """获取缓存统计信息（条目数和大小为所有 worker 共享的数据，命中计数为当前进程）"""
+        try:
+            count, total = self._connect().execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache_entry WHERE namespace = ?", (self.name,)
+            ).fetchone()
+        except sqlite3.Error:
+            count, total = 0, 0
+        with self._counter_lock:
+            hits, misses = self._hits, self._misses
+            evictions, expirations = self._evictions, self._expirations
+        lookups = hits + misses
+        return {
+            'backend': 'sqlite',
+            'path': self.path,
+            'total_entries': count,
+            'max_size': self.max_entries,
+            'bytes': total,
+            'max_bytes': self.max_bytes,
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / lookups, 4) if lookups else 0.0,
+            'evictions': evictions,
+            'expirations': expirations,
+        }
 
 
-# 全局缓存实例
-_search_cache = SimpleCache(default_ttl=3600)  # 搜索结果缓存1小时
-_vector_cache = SimpleCache(default_ttl=86400)  # 向量缓存24小时（embedding结果不变）
+def make_cache_key(prefix: str, *args, **kwargs) -> str:
+    """
+    生成缓存键
 
+    Args:
+        prefix: 键前缀
+        *args, **kwargs: 参与键计算的参数
 
-def get_search_cache_key(query: str, use_ai: bool, user_id: Optional[int] = None) -> str:
+    Returns:
+        缓存键（md5 十六进制）
+    """
+    key_parts = [prefix]
+    if args:
+        key_parts.extend(str(arg) for arg in args)
+    if kwargs:
+        key_parts.extend(f"{k}={v}" for k, v in sorted(kwargs.items()))
+    # 使用hash缩短键长度
+    return hashlib.md5("|".join(key_parts).encode('utf-8')).hexdigest()
+
+
+# 全局缓存实例（容量可由 configure_caches 按应用配置调整）
+# 搜索结果键中包含目录版本号，数据变更即失效，TTL 只用于回收不再访问的条目
+_search_cache = LRUCache('search', max_entries=20000, max_bytes=32 * 1024 * 1024, default_ttl=86400)  # 搜索结果缓存24小时
+_vector_cache = LRUCache('vector', max_entries=20000, max_bytes=128 * 1024 * 1024, default_ttl=86400)  # 向量缓存24小时（embedding结果不变）
+
+
+def _default_sqlite_cache_path(config, filename: str = 'cache.db') -> str:
+    """共享缓存文件默认放在主数据库旁边（容器中即挂载的数据目录），否则放在系统临时目录"""
+    db_uri = config.get('SQLALCHEMY_DATABASE_URI') or ''
+    if db_uri.startswith('sqlite:///'):
+        db_path = db_uri.replace('sqlite:///', '', 1)
+        if db_path and db_path != ':memory:':
+            return os.path.join(os.path.dirname(os.path.abspath(db_path)), filename)
+    import tempfile
+    return os.path.join(tempfile.gettempdir(), f'book_nav_{filename}')
+
+
+def configure_caches(config) -> None:
+    """
+    按应用配置选择缓存后端并调整各命名空间的容量
+
+    Args:
+        config: Flask 配置（CACHE_BACKEND / CACHE_SQLITE_PATH / SEARCH_CACHE_MAX_ENTRIES / SEARCH_CACHE_MAX_MB /
+                VECTOR_CACHE_MAX_ENTRIES / VECTOR_CACHE_MAX_MB）
+    """
+    global _search_cache, _vector_cache
+
+    backend = (config.get('CACHE_BACKEND') or 'memory').strip().lower()
+    if backend == 'sqlite':
+        path = config.get('CACHE_SQLITE_PATH') or _default_sqlite_cache_path(config)
+        try:
+            if not isinstance(_search_cache, SQLiteCache) or _search_cache.path != path:
+                _search_cache = SQLiteCache(path, 'search', default_ttl=_search_cache.default_ttl)
+            if not isinstance(_vector_cache, SQLiteCache) or _vector_cache.path != path:
+                _vector_cache = SQLiteCache(path, 'vector', default_ttl=_vector_cache.default_ttl)
+        except (sqlite3.Error, OSError) as e:
+            # 共享缓存文件不可用时退回进程内缓存
+            print(f"共享缓存初始化失败，使用进程内缓存: {str(e)}")
+    elif backend != 'memory':
+        print(f"未知的缓存后端 {backend}，使用进程内缓存")
+
+    for prefix, cache in (('SEARCH', _search_cache), ('VECTOR', _vector_cache)):
+        max_mb = config.get(f'{prefix}_CACHE_MAX_MB')
+        cache.configure(
+            max_entries=config.get(f'{prefix}_CACHE_MAX_ENTRIES'),
+            max_bytes=int(max_mb * 1024 * 1024) if max_mb is not None else None,
+        )
+
+
+def get_search_generation() -> tuple:
+    """
+    当前的目录/设置版本号（网站、分类、标签或站点设置提交后递增）
+
+    搜索缓存键包含该版本号，数据变更后旧结果自然不再命中，无需依赖短 TTL。
+    同一请求内只查询一次，请求开始时调用即可固定本次请求使用的版本。
+    """
+    from app.utils.data_version import CATALOG, SETTINGS, get_data_versions
+    return get_data_versions((CATALOG, SETTINGS))
+
+
+def get_search_cache_key(query: str, use_ai: bool, scope: Tuple = ('anonymous',),
+                         rank_mode: Optional[str] = None) -> str:
     """
     生成搜索缓存键
     
     Args:
         query: 搜索查询
         use_ai: 是否使用AI
-        user_id: 用户ID（用于区分不同用户的权限）
+        scope: 可见性范围（visibility_scope 的返回值，可见数据相同的用户共享缓存）
+        rank_mode: AI 搜索的排序方式（切换排序方式后不复用旧结果）
         
     Returns:
         缓存键
     """
-    cache = SimpleCache()
-    return cache._make_key('search', query=query.lower().strip(), use_ai=use_ai, user_id=user_id)
+    extra = {'rank_mode': rank_mode} if rank_mode else {}
+    return make_cache_key('search', query=query.lower().strip(), use_ai=use_ai, scope=scope,
+                          generation=get_search_generation(), **extra)
 
 
 def get_vector_cache_key(query: str, model: str) -> str:
@@ -154,11 +575,11 @@ def get_vector_cache_key(query: str, model: str) -> str:
     Returns:
         缓存键
     """
-    cache = SimpleCache()
-    return cache._make_key('vector', query=query.lower().strip(), model=model)
+    return make_cache_key('vector', query=query.lower().strip(), model=model)
 
 
-def cache_search_result(query: str, use_ai: bool, result: Any, user_id: Optional[int] = None, ttl: int = 3600) -> None:
+def cache_search_result(query: str, use_ai: bool, result: Any, scope: Tuple = ('anonymous',), ttl: Optional[int] = None,
+                        rank_mode: Optional[str] = None) -> None:
     """
     缓存搜索结果
     
@@ -166,26 +587,29 @@ def cache_search_result(query: str, use_ai: bool, result: Any, user_id: Optional
         query: 搜索查询
         use_ai: 是否使用AI
         result: 搜索结果
-        user_id: 用户ID
-        ttl: 缓存时间（秒）
+        scope: 可见性范围
+        ttl: 缓存时间（秒），默认使用搜索缓存的 TTL
+        rank_mode: AI 搜索的排序方式
     """
-    key = get_search_cache_key(query, use_ai, user_id)
+    key = get_search_cache_key(query, use_ai, scope, rank_mode)
     _search_cache.set(key, result, ttl=ttl)
 
 
-def get_cached_search_result(query: str, use_ai: bool, user_id: Optional[int] = None) -> Optional[Any]:
+def get_cached_search_result(query: str, use_ai: bool, scope: Tuple = ('anonymous',),
+                             rank_mode: Optional[str] = None) -> Optional[Any]:
     """
     获取缓存的搜索结果
     
     Args:
         query: 搜索查询
         use_ai: 是否使用AI
-        user_id: 用户ID
+        scope: 可见性范围
+        rank_mode: AI 搜索的排序方式
         
     Returns:
         缓存的搜索结果，如果不存在则返回None
     """
-    key = get_search_cache_key(query, use_ai, user_id)
+    key = get_search_cache_key(query, use_ai, scope, rank_mode)
     return _search_cache.get(key)
 
 
@@ -200,7 +624,8 @@ def cache_vector(query: str, model: str, vector: list, ttl: int = 86400) -> None
         ttl: 缓存时间（秒）
     """
     key = get_vector_cache_key(query, model)
-    _vector_cache.set(key, vector, ttl=ttl)
+    # 以紧凑的 float32 数组保存（与持久化 Embedding 存储精度一致，约为 list[float] 的八分之一内存），取出时还原为列表
+    _vector_cache.set(key, array('f', vector), ttl=ttl)
 
 
 def get_cached_vector(query: str, model: str) -> Optional[list]:
@@ -215,7 +640,72 @@ def get_cached_vector(query: str, model: str) -> Optional[list]:
         缓存的向量，如果不存在则返回None
     """
     key = get_vector_cache_key(query, model)
-    return _vector_cache.get(key)
+    vector = _vector_cache.get(key)
+    return vector.tolist() if vector is not None else None
+
+
+def get_rerank_cache_key(query: str, intent: Optional[Dict], candidates: List[Dict], model: Optional[str],
+                         max_recommendations: int = 20, vector_scores: Optional[Dict[int, float]] = None) -> str:
+    """
+    生成大模型精排结果的缓存键
+
+    候选按ID排序后连同交给模型的字段（标题、描述、分类、URL、向量相似度）一起计算指纹，
+    向量相似度同时决定候选在提示词中的顺序和截断。任一候选的内容或相似度变化、候选集合变化
+    都会得到新的键；与搜索结果缓存不同，不依赖目录版本号，修改其他网站不会使本条缓存失效。
+
+    Args:
+        query: 搜索查询
+        intent: 意图理解结果（只有 intent 文本会进入提示词）
+        candidates: 交给模型的候选网站（id / title / description / category / url）
+        model: 精排模型名称
+        max_recommendations: 最多推荐数量
+        vector_scores: 网站ID -> 向量相似度（保留三位小数参与指纹）
+
+    Returns:
+        缓存键
+    """
+    vector_scores = vector_scores or {}
+    fingerprint = hashlib.md5()
+    for candidate in sorted(candidates, key=lambda item: item['id']):
+        fingerprint.update(repr((
+            candidate['id'],
+            candidate.get('title') or '',
+            candidate.get('description') or '',
+            candidate.get('category') or '',
+            candidate.get('url') or '',
+            round(float(vector_scores[candidate['id']]), 3) if candidate['id'] in vector_scores else None,
+        )).encode('utf-8'))
+    return make_cache_key('rerank', query=query.lower().strip(), intent=(intent or {}).get('intent', ''),
+                          candidates=fingerprint.hexdigest(), count=len(candidates), model=model or '',
+                          max_recommendations=max_recommendations)
+
+
+def cache_rerank_result(key: str, result: Dict, ttl: Optional[int] = None) -> None:
+    """
+    缓存大模型精排结果（只保存归一化后的 recommendations 和 summary）
+
+    Args:
+        key: get_rerank_cache_key 生成的键
+        result: recommend_websites 的返回值
+        ttl: 缓存时间（秒），默认使用搜索缓存的 TTL
+    """
+    _search_cache.set(key, {
+        'recommendations': list(result.get('recommendations') or []),
+        'summary': result.get('summary') or '',
+    }, ttl=ttl)
+
+
+def get_cached_rerank_result(key: str) -> Optional[Dict]:
+    """
+    获取缓存的大模型精排结果
+
+    Args:
+        key: get_rerank_cache_key 生成的键
+
+    Returns:
+        {'recommendations': [...], 'summary': str}，如果不存在则返回None
+    """
+    return _search_cache.get(key)
 
 
 def clear_search_cache() -> None:
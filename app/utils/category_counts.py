@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""分类网站数量统计 - 每个可见性分类一次 GROUP BY 聚合，缓存到下一次目录写入为止"""
+
+from threading import Lock
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import func
+
+from app import db
+from app.models import Category, Website
+from app.utils.data_version import CATALOG, get_data_version
+from app.utils.visibility import apply_visibility, visibility_scope
+
+
+class CategoryCounts:
+    """某个可见性分类下所有分类的网站数量（只读）"""
+
+    def __init__(self, direct: Dict[int, int], parents: Dict[int, Optional[int]]):
+        self.direct = direct
+        self.parents = parents
+        self.total = self._roll_up(direct, parents)
+
+    @staticmethod
+    def _roll_up(direct: Dict[int, int], parents: Dict[int, Optional[int]]) -> Dict[int, int]:
+        """把每个分类的直接数量累加到所有祖先分类"""
+        total = {category_id: direct.get(category_id, 0) for category_id in parents}
+        for category_id in parents:
+            count = direct.get(category_id, 0)
+            if not count:
+                continue
+            seen = {category_id}
+            parent_id = parents.get(category_id)
+            # seen 用于防御异常数据中的循环父子关系
+            while parent_id is not None and parent_id in parents and parent_id not in seen:
+                total[parent_id] += count
+                seen.add(parent_id)
+                parent_id = parents.get(parent_id)
+        return total
+
+    def direct_count(self, category_id: int) -> int:
+        """分类自身（不含子分类）的可见网站数量"""
+        return self.direct.get(category_id, 0)
+
+    def total_count(self, category_id: int) -> int:
+        """分类及其所有子孙分类的可见网站数量"""
+        return self.total.get(category_id, 0)
+
+    def children_direct_count(self, category_id: int) -> int:
+        """分类所有直接子分类的网站数量之和"""
+        return sum(
+            self.direct.get(child_id, 0)
+            for child_id, parent_id in self.parents.items()
+            if parent_id == category_id
+        )
+
+
+_counts: Dict[Tuple, Tuple[int, CategoryCounts]] = {}
+_counts_lock = Lock()
+_MAX_ENTRIES = 256
+
+
+def build_category_counts(user) -> CategoryCounts:
+    """
+    统计所有分类的网站数量（一次分组查询）
+
+    Args:
+        user: 当前用户（可为匿名用户）
+
+    Returns:
+        CategoryCounts
+    """
+    count_query = db.session.query(Website.category_id, func.count(Website.id))\
+                            .group_by(Website.category_id)
+    direct = {
+        category_id: count
+        for category_id, count in apply_visibility(count_query, user).all()
+        if category_id is not None
+    }
+    parents = dict(db.session.query(Category.id, Category.parent_id).all())
+    return CategoryCounts(direct, parents)
+
+
+def get_category_counts(user) -> CategoryCounts:
+    """
+    获取当前可见性分类的分类数量统计，目录变更后自动重新统计
+
+    Args:
+        user: 当前用户（可为匿名用户）
+
+    Returns:
+        CategoryCounts
+    """
+    key = visibility_scope(user)
+    version = get_data_version(CATALOG)
+
+    entry = _counts.get(key)
+    if entry and entry[0] == version:
+        return entry[1]
+
+    counts = build_category_counts(user)
+
+    with _counts_lock:
+        if len(_counts) >= _MAX_ENTRIES:
+            for stale_key in [k for k, v in _counts.items() if v[0] != version]:
+                del _counts[stale_key]
+        if len(_counts) >= _MAX_ENTRIES:
+            _counts.pop(next(iter(_counts)))
+        _counts[key] = (version, counts)
+
+    return counts
+
+
+def clear_category_counts() -> None:
+    """清空所有分类数量缓存"""
+    with _counts_lock:
+        _counts.clear()
+
+
+def get_category_counts_stats() -> Dict[str, Any]:
+    """获取分类数量缓存统计信息"""
+    with _counts_lock:
+        return {
+            'entries': len(_counts),
+            'max_entries': _MAX_ENTRIES,
+        }
@@ -0,0 +1,218 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""数据版本号工具 - 在写入事务中递增版本号，供各类进程内缓存判断是否失效"""
+
+import time
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+from flask import g, has_app_context
+from sqlalchemy import bindparam, event, text
+from sqlalchemy.orm import Session
+
+from app import db
+
+
+CATALOG = 'catalog'    # 网站、分类、图标等导航数据
+SETTINGS = 'settings'  # 站点设置（含 AI 服务商配置）
+
+# 仅修改这些字段时不视为目录变更（访问计数、死链检测等高频写入）
+_WEBSITE_VOLATILE_FIELDS = {'views', 'views_today', 'last_view', 'last_check', 'is_valid'}
+
+_SESSION_INFO_KEY = 'data_version_bumped'
+# 本事务递增的版本号 {数据域: (旧版本号, 新版本号)}，保留到提交后的钩子执行完，下一个事务开始时清除
+_BUMPED_VERSIONS_KEY = 'data_version_bumped_versions'
+
+
+def _tracked_domains(obj) -> Set[str]:
+    """返回对象变更会影响的数据域"""
+    from app.models import AIProviderConfig, Category, IconAsset, SiteSettings, Tag, Website, WebsiteIcon
+
+    if isinstance(obj, (Website, Category, WebsiteIcon, IconAsset, Tag)):
+        return {CATALOG}
+    if isinstance(obj, (SiteSettings, AIProviderConfig)):
+        return {SETTINGS}
+    return set()
+
+
+def _is_volatile_website_update(obj) -> bool:
+    """判断网站对象是否只修改了访问计数类字段"""
+    from sqlalchemy import inspect as sa_inspect
+    from app.models import Website
+
+    if not isinstance(obj, Website):
+        return False
+    state = sa_inspect(obj)
+    changed = {attr.key for attr in state.attrs if attr.history.has_changes()}
+    return bool(changed) and changed.issubset(_WEBSITE_VOLATILE_FIELDS)
+
+
+def _next_version(current: Optional[int]) -> int:
+    # 使用毫秒时间戳保证单调且跨数据库恢复后不会与旧值重复
+    return max(int(current or 0) + 1, int(time.time() * 1000))
+
+
+def bump_data_version(name: str, connection=None) -> int:
+    """
+    递增指定数据域的版本号
+
+    Args:
+        name: 数据域名称（CATALOG / SETTINGS）
+        connection: 可选的数据库连接（在 flush 钩子中传入当前事务连接）
+
+    Returns:
+        新的版本号
+    """
+    return _bump(name, connection)[1]
+
+
+def _bump(name: str, connection=None) -> Tuple[int, int]:
+    """递增版本号，返回 (旧版本号, 新版本号)"""
+    own_transaction = connection is None
+    if own_transaction:
+        connection = db.session.connection()
+
+    row = connection.execute(
+        text("SELECT version FROM data_version WHERE name = :name"),
+        {'name': name}
+    ).fetchone()
+    old_version = int(row[0]) if row else 0
+    new_version = _next_version(old_version)
+    if row:
+        connection.execute(
+            text("UPDATE data_version SET version = :version, updated_at = CURRENT_TIMESTAMP WHERE name = :name"),
+            {'name': name, 'version': new_version}
+        )
+    else:
+        connection.execute(
+            text("INSERT INTO data_version (name, version, updated_at) VALUES (:name, :version, CURRENT_TIMESTAMP)"),
+            {'name': name, 'version': new_version}
+        )
+
+    if own_transaction:
+        db.session.commit()
+    _forget_request_versions()
+    return old_version, new_version
+
+
+def get_data_versions(names: Iterable[str]) -> tuple:
+    """
+    按顺序返回多个数据域的版本号（同一请求内只查询一次）
+
+    Args:
+        names: 数据域名称列表
+
+    Returns:
+        版本号元组，表不存在或无记录时对应值为0
+    """
+    names = tuple(names)
+    versions: Optional[Dict[str, int]] = None
+    if has_app_context():
+        versions = g.setdefault('_data_versions', {})
+    else:
+        versions = {}
+
+    missing = [name for name in names if name not in versions]
+    if missing:
+        try:
+            rows = db.session.execute(
+                text("SELECT name, version FROM data_version WHERE name IN :names").bindparams(
+                    bindparam('names', expanding=True)
+                ),
+                {'names': missing}
+            ).fetchall()
+            found = {row[0]: int(row[1]) for row in rows}
+        except Exception:
+            db.session.rollback()
+            found = {}
+        for name in missing:
+            versions[name] = found.get(name, 0)
+
+    return tuple(versions[name] for name in names)
+
+
+def get_bumped_versions(session) -> Dict[str, Tuple[int, int]]:
+    """
+    本会话刚提交（或正在进行）的事务递增过的版本号，供提交后的钩子同步进程内缓存的版本号
+
+    Args:
+        session: SQLAlchemy 会话
+
+    Returns:
+        {数据域: (旧版本号, 新版本号)}
+    """
+    return dict(session.info.get(_BUMPED_VERSIONS_KEY) or {})
+
+
+def get_data_version(name: str) -> int:
+    """获取指定数据域的当前版本号"""
+    return get_data_versions((name,))[0]
+
+
+def _forget_request_versions() -> None:
+    if has_app_context():
+        g.pop('_data_versions', None)
+
+
+def _after_flush(session, flush_context):
+    domains: Set[str] = set()
+    for obj in session.new:
+        domains |= _tracked_domains(obj)
+    for obj in session.deleted:
+        domains |= _tracked_domains(obj)
+    for obj in session.dirty:
+        if not session.is_modified(obj, include_collections=False):
+            continue
+        if _is_volatile_website_update(obj):
+            continue
+        domains |= _tracked_domains(obj)
+
+    _bump_in_session(session, domains)
+
+
+def _after_bulk_operation(context):
+    from app.models import AIProviderConfig, Category, IconAsset, SiteSettings, Tag, Website, WebsiteIcon
+
+    mapper = getattr(context, 'mapper', None)
+    entity = mapper.class_ if mapper is not None else None
+    if entity in (Website, Category, WebsiteIcon, IconAsset, Tag):
+        _bump_in_session(context.session, {CATALOG})
+    elif entity in (SiteSettings, AIProviderConfig):
+        _bump_in_session(context.session, {SETTINGS})
+
+
+def _bump_in_session(session, domains: Set[str]) -> None:
+    """在当前事务中递增版本号（每个事务每个数据域只递增一次）"""
+    bumped = session.info.setdefault(_SESSION_INFO_KEY, set())
+    pending = domains - bumped
+    if not pending:
+        return
+    try:
+        connection = session.connection()
+        versions = session.info.setdefault(_BUMPED_VERSIONS_KEY, {})
+        for name in sorted(pending):
+            versions[name] = _bump(name, connection=connection)
+        bumped |= pending
+    except Exception as e:
+        # 版本号写入失败不应影响业务写入，缓存会在TTL或下一次写入后恢复一致
+        print(f"数据版本号更新失败: {str(e)}")
+
+
+def _reset_session_marks(session, *args):
+    session.info.pop(_SESSION_INFO_KEY, None)
+
+
+def _reset_bumped_versions(session, *args):
+    session.info.pop(_BUMPED_VERSIONS_KEY, None)
+
+
+def register_data_version_hooks() -> None:
+    """注册 SQLAlchemy 会话钩子（幂等）"""
+    if event.contains(Session, 'after_flush', _after_flush):
+        return
+    event.listen(Session, 'after_flush', _after_flush)
+    event.listen(Session, 'after_bulk_update', _after_bulk_operation)
+    event.listen(Session, 'after_bulk_delete', _after_bulk_operation)
+    event.listen(Session, 'after_commit', _reset_session_marks)
+    event.listen(Session, 'after_rollback', _reset_session_marks)
+    event.listen(Session, 'after_begin', _reset_bumped_versions)
+    event.listen(Session, 'after_rollback', _reset_bumped_versions)
@@ -3,15 +3,18 @@
 """数据库迁移工具 - 统一处理字段添加和表创建"""
 
 import sqlite3
-from typing import List, Tuple
+from typing import Callable, Dict, List, Tuple
 
+from app.utils.icon_db_migration import migrate_icon_management_tables
 
-def migrate_webdav_config_table(db_path: str) -> int:
+
+def migrate_webdav_config_table(db_path: str, raise_errors: bool = False) -> int:
     """
     创建 webdav_config 表（如果不存在），并从 site_settings 迁移旧数据
     
     Args:
         db_path: 数据库文件路径
+        raise_errors: 出错时抛出异常而不是返回0
         
     Returns:
         迁移的记录数
@@ -80,11 +83,13 @@ def migrate_webdav_config_table(db_path: str) -> int:
         conn.commit()
         conn.close()
         return migrated
-    except Exception as e:
+    except Exception:
+        if raise_errors:
+            raise
         return 0
 
 
-def migrate_ai_provider_config_table(db_path: str) -> int:
+def migrate_ai_provider_config_table(db_path: str, raise_errors: bool = False) -> int:
     try:
         conn = sqlite3.connect(db_path)
         cursor = conn.cursor()
@@ -110,15 +115,18 @@ def migrate_ai_provider_config_table(db_path: str) -> int:
         conn.close()
         return 1
     except Exception:
+        if raise_errors:
+            raise
         return 0
 
 
-def migrate_site_settings_fields(db_path: str) -> int:
+def migrate_site_settings_fields(db_path: str, raise_errors: bool = False) -> int:
     """
     检查并添加 site_settings 表的缺失字段
     
     Args:
         db_path: 数据库文件路径
+        raise_errors: 出错时抛出异常而不是返回0
         
     Returns:
         添加的字段数量
@@ -153,7 +161,9 @@ def migrate_site_settings_fields(db_path: str) -> int:
             ('ai_model_probe_error', 'TEXT'),
             ('ai_model_probe_signature', 'VARCHAR(64)'),
             ('ai_task_bindings_json', 'TEXT'),
-            ('ai_task_test_results_json', 'TEXT')
+            ('ai_task_test_results_json', 'TEXT'),
+            ('ai_rank_mode', "VARCHAR(16) DEFAULT 'llm'"),
+            ('ai_hybrid_method', "VARCHAR(16) DEFAULT 'weighted'")
         ]
         
         # 向量搜索配置字段
@@ -165,7 +175,15 @@ def migrate_site_settings_fields(db_path: str) -> int:
             ('vector_max_results', 'INTEGER DEFAULT 50'),
             # 新增：独立的 Embedding API 配置
             ('embedding_api_base_url', 'VARCHAR(512)'),
-            ('embedding_api_key', 'VARCHAR(512)')
+            ('embedding_api_key', 'VARCHAR(512)'),
+            # Qdrant 集合参数
+            ('qdrant_hnsw_m', 'INTEGER DEFAULT 16'),
+            ('qdrant_hnsw_ef_construct', 'INTEGER DEFAULT 100'),
+            ('qdrant_hnsw_ef', 'INTEGER'),
+            ('qdrant_quantization', "VARCHAR(16) DEFAULT 'none'"),
+            ('qdrant_quantization_rescore', 'BOOLEAN DEFAULT 1'),
+            ('qdrant_vectors_on_disk', 'BOOLEAN DEFAULT 0'),
+            ('qdrant_payload_on_disk', 'BOOLEAN DEFAULT 0')
         ]
         
         # 过渡页设置字段
@@ -243,7 +261,368 @@ def migrate_site_settings_fields(db_path: str) -> int:
         
         conn.close()
         return added_count
-    except Exception as e:
+    except Exception:
+        if raise_errors:
+            raise
         # 迁移失败时返回0，不中断应用启动
         return 0
 
+
+
+def migrate_website_fts_table(db_path: str, raise_errors: bool = False) -> int:
+    """
+    创建网站全文索引（FTS5 trigram 分词，支持中文子串匹配）及同步触发器
+
+    Args:
+        db_path: 数据库文件路径
+        raise_errors: 出错时抛出异常而不是返回0
+
+    Returns:
+        1 表示全文索引可用，0 表示当前 SQLite 不支持 FTS5/trigram
+    """
+    try:
+        conn = sqlite3.connect(db_path)
+        cursor = conn.cursor()
+
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='website_fts'")
+        exists = cursor.fetchone() is not None
+
+        if not exists:
+            # 外部内容表：只存索引，内容从 website 表读取
+            cursor.execute("""
+                CREATE VIRTUAL TABLE website_fts USING fts5(
+                    title, description, url,
+                    content='website', content_rowid='id',
+                    tokenize='trigram'
+                )
+            """)
+
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS website_fts_ai AFTER INSERT ON website BEGIN
+                INSERT INTO website_fts(rowid, title, description, url)
+                VALUES (new.id, new.title, new.description, new.url);
+            END
+        """)
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS website_fts_ad AFTER DELETE ON website BEGIN
+                INSERT INTO website_fts(website_fts, rowid, title, description, url)
+                VALUES ('delete', old.id, old.title, old.description, old.url);
+            END
+        """)
+        # 只在检索字段变化时更新索引，访问计数等高频写入不触发
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS website_fts_au AFTER UPDATE OF title, description, url ON website BEGIN
+                INSERT INTO website_fts(website_fts, rowid, title, description, url)
+                VALUES ('delete', old.id, old.title, old.description, old.url);
+                INSERT INTO website_fts(rowid, title, description, url)
+                VALUES (new.id, new.title, new.description, new.url);
+            END
+        """)
+
+        if not exists:
+            cursor.execute("INSERT INTO website_fts(website_fts) VALUES ('rebuild')")
+
+        conn.commit()
+        conn.close()
+        return 1
+    except Exception:
+        if raise_errors:
+            raise
+        return 0
+
+
+def website_fts_table_ready(db_path: str) -> bool:
+    """全文索引表及其同步触发器是否都已存在"""
+    try:
+        conn = sqlite3.connect(db_path)
+        try:
+            count = conn.execute(
+                "SELECT COUNT(*) FROM sqlite_master WHERE name IN "
+                "('website_fts', 'website_fts_ai', 'website_fts_ad', 'website_fts_au')"
+            ).fetchone()[0]
+        finally:
+            conn.close()
+        return count == 4
+    except sqlite3.Error:
+        return False
+
+
+def migrate_website_visibility_table(db_path: str, raise_errors: bool = False) -> int:
+    """
+    创建 website_visibility 关联表，并从 website.visible_to 回填（仅在关联表为空时回填）
+
+    Args:
+        db_path: 数据库文件路径
+        raise_errors: 出错时抛出异常而不是返回0
+
+    Returns:
+        回填的关联记录数
+    """
+    try:
+        conn = sqlite3.connect(db_path)
+        cursor = conn.cursor()
+
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS website_visibility (
+                website_id INTEGER NOT NULL REFERENCES website(id) ON DELETE CASCADE,
+                user_id INTEGER NOT NULL REFERENCES user(id) ON DELETE CASCADE,
+                PRIMARY KEY (website_id, user_id)
+            )
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS ix_website_visibility_user_website
+            ON website_visibility (user_id, website_id)
+        """)
+
+        cursor.execute("SELECT COUNT(*) FROM website_visibility")
+        if cursor.fetchone()[0] > 0:
+            conn.commit()
+            conn.close()
+            return 0
+
+        cursor.execute("SELECT id FROM user")
+        user_ids = {row[0] for row in cursor.fetchall()}
+
+        cursor.execute("SELECT id, visible_to FROM website WHERE visible_to IS NOT NULL AND visible_to != ''")
+        rows: List[Tuple[int, int]] = []
+        for website_id, visible_to in cursor.fetchall():
+            seen = set()
+            for item in visible_to.split(','):
+                item = item.strip()
+                if item.isdigit() and int(item) in user_ids and int(item) not in seen:
+                    seen.add(int(item))
+                    rows.append((website_id, int(item)))
+
+        if rows:
+            cursor.executemany(
+                "INSERT OR IGNORE INTO website_visibility (website_id, user_id) VALUES (?, ?)",
+                rows
+            )
+
+        conn.commit()
+        conn.close()
+        return len(rows)
+    except Exception:
+        if raise_errors:
+            raise
+        return 0
+
+
+_WEBSITE_VECTOR_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS website_vector (
+        id INTEGER NOT NULL PRIMARY KEY,
+        website_id INTEGER NOT NULL UNIQUE REFERENCES website(id) ON DELETE CASCADE,
+        vector_status VARCHAR(20),
+        embedding_model VARCHAR(128),
+        dimension INTEGER,
+        content_hash VARCHAR(64),
+        created_at DATETIME,
+        updated_at DATETIME
+    )
+"""
+
+
+def migrate_website_vector_table(db_path: str, raise_errors: bool = False) -> int:
+    """
+    确保 website_vector 表包含 content_hash 字段，且删除网站时级联删除向量记录
+
+    旧表的外键没有 ON DELETE CASCADE，SQLite 无法修改约束，因此按新结构重建并复制原有记录。
+
+    Args:
+        db_path: 数据库文件路径
+        raise_errors: 出错时抛出异常而不是返回0
+
+    Returns:
+        重建时复制的记录数
+    """
+    try:
+        conn = sqlite3.connect(db_path)
+        cursor = conn.cursor()
+
+        cursor.execute("PRAGMA table_info(website_vector)")
+        columns = [col[1] for col in cursor.fetchall()]
+        if not columns:
+            cursor.execute(_WEBSITE_VECTOR_TABLE_SQL)
+            conn.commit()
+            conn.close()
+            return 0
+
+        cursor.execute("PRAGMA foreign_key_list(website_vector)")
+        cascades = any(fk[2] == 'website' and (fk[6] or '').upper() == 'CASCADE' for fk in cursor.fetchall())
+        if 'content_hash' in columns and cascades:
+            conn.close()
+            return 0
+
+        copied_columns = [
+            name for name in ('id', 'website_id', 'vector_status', 'embedding_model', 'dimension',
+                              'content_hash', 'created_at', 'updated_at')
+            if name in columns
+        ]
+        column_list = ', '.join(copied_columns)
+        cursor.execute("ALTER TABLE website_vector RENAME TO website_vector_old")
+        cursor.execute(_WEBSITE_VECTOR_TABLE_SQL)
+        cursor.execute(f"""
+            INSERT INTO website_vector ({column_list})
+            SELECT {column_list} FROM website_vector_old
+            WHERE website_id IN (SELECT id FROM website)
+        """)
+        copied = cursor.rowcount
+        cursor.execute("DROP TABLE website_vector_old")
+
+        conn.commit()
+        conn.close()
+        return max(copied, 0)
+    except Exception:
+        if raise_errors:
+            raise
+        return 0
+
+
+# 受管理的索引集合：(索引名, 表名, 索引列)。根据热点查询的 EXPLAIN QUERY PLAN 设计，
+# 由 `flask perf explain` 校验这些查询不会退化为全表扫描
+MANAGED_INDEXES: List[Tuple[str, str, str]] = [
+    # 分类页/首页网站列表：按分类过滤（匿名访客额外过滤 is_private），按手动排序规则排序
+    ('ix_website_category_listing', 'website', 'category_id, is_private, sort_order DESC, created_at, views DESC'),
+    # 首页热门推荐
+    ('ix_website_featured_views', 'website', 'is_featured, views DESC'),
+    # 添加网站时的重复URL检查
+    ('ix_website_url', 'website', 'url'),
+]
+
+
+def migrate_managed_indexes(db_path: str, raise_errors: bool = False) -> int:
+    """
+    创建受管理的索引（已存在则跳过），并更新查询规划器统计信息
+
+    Args:
+        db_path: 数据库文件路径
+        raise_errors: 出错时抛出异常而不是返回0
+
+    Returns:
+        新建的索引数量
+    """
+    try:
+        conn = sqlite3.connect(db_path)
+        cursor = conn.cursor()
+
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='index'")
+        existing = {row[0] for row in cursor.fetchall()}
+
+        created = 0
+        for name, table, columns in MANAGED_INDEXES:
+            if name in existing:
+                continue
+            cursor.execute(f'CREATE INDEX IF NOT EXISTS {name} ON "{table}" ({columns})')
+            created += 1
+
+        if created:
+            # 新索引需要统计信息才能被规划器正确选用
+            cursor.execute("ANALYZE")
+
+        conn.commit()
+        conn.close()
+        return created
+    except Exception:
+        if raise_errors:
+            raise
+        return 0
+
+
+# 结构迁移步骤：(版本号, 说明, 迁移函数)。按版本号顺序执行，每一步都是幂等的；
+# 执行成功后写入 schema_version 表，之后启动只需比较一个整数。
+# 新增迁移（包括修改 MANAGED_INDEXES）时在末尾追加新版本号的步骤，不要修改已有步骤的版本号。
+SCHEMA_STEPS: List[Tuple[int, str, Callable[..., int]]] = [
+    (1, 'site_settings 缺失字段', migrate_site_settings_fields),
+    (2, 'webdav_config 表', migrate_webdav_config_table),
+    (3, 'ai_provider_config 表', migrate_ai_provider_config_table),
+    (4, '图标管理表', migrate_icon_management_tables),
+    (5, 'website_visibility 关联表', migrate_website_visibility_table),
+    (6, '受管理的索引', migrate_managed_indexes),
+    (7, '网站全文索引', migrate_website_fts_table),
+    (8, 'website_vector 内容哈希', migrate_website_vector_table),
+    # 已完成第1步的数据库补充 Qdrant 集合参数字段（字段已存在时不做任何修改）
+    (9, 'site_settings Qdrant 集合参数', migrate_site_settings_fields),
+    (10, 'site_settings AI 搜索排序方式', migrate_site_settings_fields),
+]
+
+SCHEMA_VERSION = SCHEMA_STEPS[-1][0]
+
+# 这些步骤返回0表示当前环境不支持（如 SQLite 缺少 FTS5 trigram）或暂时失败，同样记为已完成，运行时自动降级；
+# 每次执行迁移时用对应的检查函数确认结果是否存在，不存在则重试（SQLite 升级或错误消除后自动启用）
+_OPTIONAL_STEPS: Dict[int, Callable[[str], bool]] = {7: website_fts_table_ready}
+
+
+def get_schema_version(db_path: str) -> int:
+    """
+    读取数据库已完成的结构迁移版本号
+
+    Args:
+        db_path: 数据库文件路径
+
+    Returns:
+        版本号，schema_version 表不存在时为0
+    """
+    try:
+        conn = sqlite3.connect(db_path)
+        try:
+            row = conn.execute("SELECT MAX(version) FROM schema_version").fetchone()
+        finally:
+            conn.close()
+        return int(row[0] or 0)
+    except sqlite3.Error:
+        return 0
+
+
+def _record_schema_step(db_path: str, version: int, name: str) -> None:
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS schema_version (
+                version INTEGER PRIMARY KEY,
+                name VARCHAR(128) NOT NULL,
+                applied_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        conn.execute(
+            "INSERT OR REPLACE INTO schema_version (version, name, applied_at) VALUES (?, ?, CURRENT_TIMESTAMP)",
+            (version, name)
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def run_schema_migrations(db_path: str, force: bool = False) -> Dict[str, int]:
+    """
+    执行尚未完成的结构迁移步骤（版本号已是最新时只读取一个整数，并检查一次可选步骤的结果）
+
+    Args:
+        db_path: 数据库文件路径
+        force: 忽略已记录的版本号，重新执行全部步骤（检测到结构缺失或替换数据库文件后使用）
+
+    Returns:
+        本次执行的步骤及其返回值 {迁移函数名: 返回值}；某一步失败时停止，
+        失败步骤及之后的步骤留到下次启动重试
+    """
+    current = 0 if force else get_schema_version(db_path)
+    results: Dict[str, int] = {}
+
+    # 已记为完成、但当时没有成功的可选步骤
+    for version, name, step in SCHEMA_STEPS:
+        check = _OPTIONAL_STEPS.get(version)
+        if check is not None and version <= current and not check(db_path):
+            results[step.__name__] = step(db_path, raise_errors=False)
+
+    if current >= SCHEMA_VERSION:
+        return results
+
+    for version, name, step in SCHEMA_STEPS:
+        if version <= current:
+            continue
+        try:
+            results[step.__name__] = step(db_path, raise_errors=version not in _OPTIONAL_STEPS)
+            _record_schema_step(db_path, version, name)
+        except Exception as e:
+            print(f"数据库迁移步骤 {version}（{name}）失败: {str(e)}")
+            break
+    return results
@@ -0,0 +1,334 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""持久化 Embedding 存储 - 按 (模型, 文本哈希) 保存 float32 打包的向量，重启、重建索引后无需重新调用 Embedding API"""
+
+import hashlib
+import os
+import sqlite3
+import sys
+import threading
+import time
+from array import array
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+# float32 每维 4 字节，1536 维约 6KB（list[float] 约 37KB）
+_ITEM_SIZE = array('f').itemsize
+
+
+def text_hash(text: str) -> bytes:
+    """文本的 SHA-256 摘要（按原文计算，不做大小写归一，避免不同文本共用向量）"""
+    return hashlib.sha256((text or '').encode('utf-8')).digest()
+
+
+def pack_vector(vector: Sequence[float]) -> bytes:
+    """将向量打包为小端 float32 字节串"""
+    packed = array('f', vector)
+    if sys.byteorder != 'little':
+        packed.byteswap()
+    return packed.tobytes()
+
+
+def unpack_vector(blob: bytes) -> List[float]:
+    """将小端 float32 字节串还原为向量列表"""
+    packed = array('f')
+    packed.frombytes(blob)
+    if sys.byteorder != 'little':
+        packed.byteswap()
+    return packed.tolist()
+
+
+class EmbeddingStore:
+    """
+    基于 SQLite（WAL 模式）的 Embedding 持久化存储
+
+    查询向量和网站文档向量都写入同一张表，主键为 (模型, 文本哈希)。embedding 结果对同一模型和文本是确定的，
+    因此条目不设过期时间，只在总大小超出预算时按访问时间淘汰最久未用的部分。
+    同一主机的所有 worker 共享同一个文件。文件在第一次写入时才创建，未配置向量搜索的站点不会产生该文件。
+    """
+
+    # 访问时间的最小更新间隔（秒）
+    TOUCH_INTERVAL = 3600
+    # 每隔多少次写入检查一次容量
+    TRIM_EVERY = 256
+    # 单条 SQL 中 IN 列表的最大长度
+    _BATCH = 500
+
+    def __init__(self, path: str, max_bytes: Optional[int] = None):
+        """
+        初始化存储
+
+        Args:
+            path: 数据库文件路径
+            max_bytes: 向量数据总大小上限（None 表示不限制）
+        """
+        self.path = path
+        self.max_bytes = max_bytes or None
+        self._local = threading.local()
+        self._counter_lock = threading.Lock()
+        self._writes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._schema_lock = threading.Lock()
+        self._ready = False
+
+    def _connect(self) -> sqlite3.Connection:
+        """每个线程一个连接；fork 出的子进程重新连接"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+        conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    def _open(self, create: bool = False) -> Optional[sqlite3.Connection]:
+        """
+        获取当前线程的连接，首次使用时建表
+
+        Args:
+            create: 文件不存在时是否创建（只有写入时创建）
+
+        Returns:
+            连接，文件尚不存在且不创建时返回 None
+        """
+        if not self._ready:
+            if not create and not os.path.exists(self.path):
+                return None
+            with self._schema_lock:
+                if not self._ready:
+                    self._ensure_schema()
+                    self._ready = True
+        return self._connect()
+
+    def _ensure_schema(self) -> None:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._connect()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS embedding (
+                model TEXT NOT NULL,
+                text_hash BLOB NOT NULL,
+                dimension INTEGER NOT NULL,
+                vector BLOB NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                PRIMARY KEY (model, text_hash)
+            ) WITHOUT ROWID
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_embedding_accessed ON embedding (accessed_at)")
+
+    def _count(self, name: str, amount: int = 1) -> None:
+        with self._counter_lock:
+            setattr(self, name, getattr(self, name) + amount)
+
+    def get(self, model: str, text: str) -> Optional[List[float]]:
+        """
+        读取向量
+
+        Args:
+            model: embedding 模型名称
+            text: 原始文本
+
+        Returns:
+            向量列表，不存在时返回 None
+        """
+        return self.get_many(model, [text]).get(text)
+
+    def get_many(self, model: str, texts: Iterable[str]) -> Dict[str, List[float]]:
+        """
+        批量读取向量
+
+        Args:
+            model: embedding 模型名称
+            texts: 原始文本列表
+
+        Returns:
+            {文本: 向量}，只包含已存储的文本
+        """
+        by_hash = {text_hash(text): text for text in texts}
+        if not by_hash:
+            return {}
+        found: Dict[str, List[float]] = {}
+        stale = []
+        now = time.time()
+        try:
+            conn = self._open()
+            if conn is None:
+                self._count('_misses', len(by_hash))
+                return {}
+            hashes = list(by_hash)
+            for start in range(0, len(hashes), self._BATCH):
+                chunk = hashes[start:start + self._BATCH]
+                placeholders = ','.join('?' * len(chunk))
+                rows = conn.execute(
+                    f"SELECT text_hash, vector, accessed_at FROM embedding "
+                    f"WHERE model = ? AND text_hash IN ({placeholders})",
+                    [model] + chunk
+                ).fetchall()
+                for digest, blob, accessed_at in rows:
+                    found[by_hash[bytes(digest)]] = unpack_vector(blob)
+                    if now - accessed_at > self.TOUCH_INTERVAL:
+                        stale.append((now, model, digest))
+            if stale:
+                conn.executemany("UPDATE embedding SET accessed_at = ? WHERE model = ? AND text_hash = ?", stale)
+        except (sqlite3.Error, OSError) as e:
+            # 存储不可用时当作未命中，调用方会重新请求 API
+            print(f"Embedding 存储读取失败: {str(e)}")
+            self._count('_misses', len(by_hash))
+            return {}
+        self._count('_hits', len(found))
+        self._count('_misses', len(by_hash) - len(found))
+        return found
+
+    def put(self, model: str, text: str, vector: Sequence[float]) -> None:
+        """
+        保存向量
+
+        Args:
+            model: embedding 模型名称
+            text: 原始文本
+            vector: 向量
+        """
+        self.put_many(model, [(text, vector)])
+
+    def put_many(self, model: str, items: Iterable) -> None:
+        """
+        批量保存向量
+
+        Args:
+            model: embedding 模型名称
+            items: (文本, 向量) 序列
+        """
+        now = time.time()
+        rows = [
+            (model, text_hash(text), len(vector), sqlite3.Binary(pack_vector(vector)), now, now)
+            for text, vector in items if vector
+        ]
+        if not rows:
+            return
+        try:
+            self._open(create=True).executemany(
+                "INSERT OR REPLACE INTO embedding (model, text_hash, dimension, vector, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                rows
+            )
+        except (sqlite3.Error, OSError) as e:
+            print(f"Embedding 存储写入失败: {str(e)}")
+            return
+
+        with self._counter_lock:
+            before = self._writes
+            self._writes += len(rows)
+            should_trim = before // self.TRIM_EVERY != self._writes // self.TRIM_EVERY
+        if should_trim and self.max_bytes:
+            self.trim()
+
+    def trim(self) -> None:
+        """按访问时间淘汰超出字节预算的向量"""
+        if not self.max_bytes:
+            return
+        try:
+            conn = self._open()
+            if conn is None:
+                return
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                total = conn.execute("SELECT COALESCE(SUM(dimension), 0) FROM embedding").fetchone()[0] * _ITEM_SIZE
+                evicted = 0
+                if total > self.max_bytes:
+                    excess = total - self.max_bytes
+                    victims = []
+                    for model, digest, dimension in conn.execute(
+                        "SELECT model, text_hash, dimension FROM embedding ORDER BY accessed_at"
+                    ):
+                        victims.append((model, digest))
+                        excess -= dimension * _ITEM_SIZE
+                        if excess <= 0:
+                            break
+                    conn.executemany("DELETE FROM embedding WHERE model = ? AND text_hash = ?", victims)
+                    evicted = len(victims)
+                conn.execute('COMMIT')
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+        except sqlite3.Error as e:
+            print(f"Embedding 存储清理失败: {str(e)}")
+            return
+        self._count('_evictions', evicted)
+
+    def clear(self, model: Optional[str] = None) -> None:
+        """清空存储（指定模型时只清空该模型的向量）"""
+        try:
+            conn = self._open()
+            if conn is None:
+                return
+            if model is None:
+                conn.execute("DELETE FROM embedding")
+            else:
+                conn.execute("DELETE FROM embedding WHERE model = ?", (model,))
+        except (sqlite3.Error, OSError) as e:
+            print(f"Embedding 存储清空失败: {str(e)}")
+
+    def stats(self) -> Dict[str, Any]:
+        """获取存储统计信息（条目数和大小为所有 worker 共享的数据，命中计数为当前进程）"""
+        try:
+            conn = self._open()
+            models = {
+                model: {'entries': count, 'bytes': dims * _ITEM_SIZE}
+                for model, count, dims in conn.execute(
+                    "SELECT model, COUNT(*), COALESCE(SUM(dimension), 0) FROM embedding GROUP BY model"
+                )
+            } if conn is not None else {}
+        except (sqlite3.Error, OSError):
+            models = {}
+        with self._counter_lock:
+            hits, misses, evictions = self._hits, self._misses, self._evictions
+        lookups = hits + misses
+        return {
+            'path': self.path,
+            'total_entries': sum(m['entries'] for m in models.values()),
+            'bytes': sum(m['bytes'] for m in models.values()),
+            'max_bytes': self.max_bytes,
+            'models': models,
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / lookups, 4) if lookups else 0.0,
+            'evictions': evictions,
+        }
+
+
+_store: Optional[EmbeddingStore] = None
+
+
+def configure_embedding_store(config) -> None:
+    """
+    按应用配置打开 Embedding 存储
+
+    Args:
+        config: Flask 配置（EMBEDDING_STORE_ENABLED / EMBEDDING_STORE_PATH / EMBEDDING_STORE_MAX_MB）
+    """
+    global _store
+
+    if not config.get('EMBEDDING_STORE_ENABLED', True):
+        _store = None
+        return
+
+    from app.utils.cache import _default_sqlite_cache_path
+
+    path = config.get('EMBEDDING_STORE_PATH') or _default_sqlite_cache_path(config, 'embeddings.db')
+    max_mb = config.get('EMBEDDING_STORE_MAX_MB')
+    max_bytes = int(max_mb * 1024 * 1024) if max_mb else None
+    if _store is not None and _store.path == path:
+        _store.max_bytes = max_bytes
+        return
+    # 只记录路径，文件在第一次写入向量时创建；不可用时读写都按未命中处理
+    _store = EmbeddingStore(path, max_bytes=max_bytes)
+
+
+def get_embedding_store() -> Optional[EmbeddingStore]:
+    """当前的 Embedding 存储（未启用时返回 None）"""
+    return _store
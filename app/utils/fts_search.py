@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""网站全文检索 - 基于 SQLite FTS5 trigram 索引的关键词匹配，按 bm25 排序"""
+
+from threading import Lock
+from typing import Iterable, Optional
+
+from sqlalchemy import Float, Integer, bindparam, or_, text
+
+from app import db
+from app.models import Website
+
+
+FTS_TABLE = 'website_fts'
+
+# trigram 分词器至少需要3个字符才能走索引，更短的关键词回退为 LIKE 匹配
+MIN_TRIGRAM_LENGTH = 3
+
+# bm25 列权重：标题 > 描述 > URL
+_BM25_WEIGHTS = {'title': 10.0, 'description': 4.0, 'url': 1.0}
+_COLUMNS = ('title', 'description', 'url')
+
+_state = {'available': None}
+_state_lock = Lock()
+
+
+def fts_available() -> bool:
+    """全文索引表是否存在（进程内只检查一次，迁移或恢复备份后需调用 reset_fts_state）"""
+    if _state['available'] is None:
+        with _state_lock:
+            if _state['available'] is None:
+                try:
+                    row = db.session.execute(
+                        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                        {'name': FTS_TABLE}
+                    ).fetchone()
+                    _state['available'] = row is not None
+                except Exception:
+                    db.session.rollback()
+                    _state['available'] = False
+    return bool(_state['available'])
+
+
+def reset_fts_state() -> None:
+    """重置全文索引可用状态（数据库文件被替换后调用）"""
+    with _state_lock:
+        _state['available'] = None
+
+
+def build_match_expression(term: str, columns: Iterable[str] = _COLUMNS) -> Optional[str]:
+    """
+    构造 FTS5 MATCH 表达式（整个关键词作为短语，等价于子串匹配）
+
+    Args:
+        term: 搜索关键词
+        columns: 参与匹配的列
+
+    Returns:
+        MATCH 表达式，关键词过短时返回 None
+    """
+    term = (term or '').strip()
+    if len(term) < MIN_TRIGRAM_LENGTH:
+        return None
+    phrase = '"' + term.replace('"', '""') + '"'
+    columns = [column for column in columns if column in _COLUMNS]
+    if tuple(columns) == _COLUMNS:
+        return phrase
+    return '{' + ' '.join(columns) + '} : ' + phrase
+
+
+def _match_subquery(match: str):
+    weights = ', '.join(str(_BM25_WEIGHTS[column]) for column in _COLUMNS)
+    statement = text(
+        f"SELECT rowid AS website_id, bm25({FTS_TABLE}, {weights}) AS score "
+        f"FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :fts_match"
+    ).bindparams(bindparam('fts_match', value=match))
+    return statement.columns(website_id=Integer, score=Float).subquery('fts_match')
+
+
+def _like_filter(term: str, columns: Iterable[str]):
+    pattern = f'%{term}%'
+    return or_(*[getattr(Website, column).ilike(pattern) for column in columns])
+
+
+def apply_keyword_search(query, term: str, columns: Iterable[str] = _COLUMNS, rank: bool = True):
+    """
+    在网站查询上追加关键词匹配条件
+
+    Args:
+        query: Website 查询
+        term: 搜索关键词
+        columns: 参与匹配的列（title / description / url）
+        rank: 是否按 bm25 相关度排序（调用方有自己的排序时传 False）
+
+    Returns:
+        追加条件后的查询
+    """
+    columns = tuple(columns)
+    term = (term or '').strip()
+    match = build_match_expression(term, columns) if fts_available() else None
+    if match is None:
+        return query.filter(_like_filter(term, columns))
+
+    matched = _match_subquery(match)
+    if not rank:
+        return query.filter(Website.id.in_(db.session.query(matched.c.website_id)))
+    return query.join(matched, Website.id == matched.c.website_id).order_by(matched.c.score)
@@ -0,0 +1,224 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""出站 HTTP 客户端 - 按主机复用 keep-alive 连接池（LLM、Embedding、图标抓取、死链检测共用）"""
+
+import threading
+from collections import OrderedDict
+from http.cookiejar import DefaultCookiePolicy
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class HTTPClient:
+    """
+    按主机（scheme + host + port）划分会话的 HTTP 客户端
+
+    每个主机一个 requests.Session，连接在请求之间保持，后续请求省去 TCP/TLS 握手。
+    会话数量有上限，超出时关闭最久未用的主机会话。会话不保存 Cookie，行为与模块级 requests.get/post 一致。
+    """
+
+    def __init__(self, pool_maxsize: int = 10, max_hosts: int = 64,
+                 connect_timeout: Optional[float] = None, default_timeout: float = 30):
+        """
+        初始化客户端
+
+        Args:
+            pool_maxsize: 每个主机保持的最大连接数（并发请求超出时临时新建，用完即关闭）
+            max_hosts: 最多保留会话的主机数
+            connect_timeout: 建立连接的超时（秒），None 表示沿用调用方给出的超时
+            default_timeout: 调用方未指定超时时使用的超时（秒）
+        """
+        self.pool_maxsize = max(1, int(pool_maxsize))
+        self.max_hosts = max(1, int(max_hosts))
+        self.connect_timeout = connect_timeout
+        self.default_timeout = default_timeout
+        self._sessions: 'OrderedDict[Tuple[str, str], requests.Session]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._requests = 0
+        self._errors = 0
+        self._closed_connections = 0
+        self._closed_requests = 0
+
+    def configure(self, pool_maxsize: Optional[int] = None, max_hosts: Optional[int] = None,
+                  connect_timeout: Optional[float] = None, default_timeout: Optional[float] = None) -> None:
+        """调整连接池参数（已建立的会话会被关闭，按新参数重新创建）"""
+        if pool_maxsize is not None:
+            self.pool_maxsize = max(1, int(pool_maxsize))
+        if max_hosts is not None:
+            self.max_hosts = max(1, int(max_hosts))
+        self.connect_timeout = connect_timeout or None
+        if default_timeout is not None:
+            self.default_timeout = default_timeout
+        self.close()
+
+    def _new_session(self) -> requests.Session:
+        session = requests.Session()
+        # 不在请求之间保留 Cookie（各调用方原本都是无状态请求）
+        session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+        # 重定向可能跳到其他主机，同一会话保留少量额外的连接池，避免把本主机的连接池挤掉
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self.pool_maxsize)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    def _session_for(self, url: str) -> requests.Session:
+        parts = urlsplit(url)
+        host_key = (parts.scheme.lower(), parts.netloc.lower())
+        with self._lock:
+            session = self._sessions.get(host_key)
+            if session is not None:
+                self._sessions.move_to_end(host_key)
+                return session
+            session = self._new_session()
+            self._sessions[host_key] = session
+            while len(self._sessions) > self.max_hosts:
+                _, stale = self._sessions.popitem(last=False)
+                self._retire(stale)
+        return session
+
+    def _retire(self, session: requests.Session) -> None:
+        """关闭会话前把其连接计数并入累计值（调用方持有锁）"""
+        connections, requests_sent = self._pool_counts(session)
+        self._closed_connections += connections
+        self._closed_requests += requests_sent
+        session.close()
+
+    def _timeout(self, timeout: Any) -> Any:
+        if timeout is None:
+            timeout = self.default_timeout
+        if self.connect_timeout and isinstance(timeout, (int, float)):
+            return (min(self.connect_timeout, timeout), timeout)
+        return timeout
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """
+        发送请求（参数与 requests.request 相同，异常类型也相同）
+
+        Args:
+            method: HTTP 方法
+            url: 请求地址
+            **kwargs: 传给 Session.request 的参数
+
+        Returns:
+            requests.Response
+        """
+        kwargs['timeout'] = self._timeout(kwargs.get('timeout'))
+        session = self._session_for(url)
+        with self._lock:
+            self._requests += 1
+        try:
+            return session.request(method, url, **kwargs)
+        except requests.exceptions.RequestException:
+            with self._lock:
+                self._errors += 1
+            raise
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        kwargs.setdefault('allow_redirects', True)
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request('POST', url, **kwargs)
+
+    def head(self, url: str, **kwargs) -> requests.Response:
+        kwargs.setdefault('allow_redirects', False)
+        return self.request('HEAD', url, **kwargs)
+
+    @staticmethod
+    def _pool_counts(session: requests.Session) -> Tuple[int, int]:
+        """会话下所有连接池新建的连接数和发出的请求数"""
+        connections = requests_sent = 0
+        for adapter in set(session.adapters.values()):
+            pools = getattr(getattr(adapter, 'poolmanager', None), 'pools', None)
+            if pools is None:
+                continue
+            for pool_key in list(pools.keys()):
+                pool = pools.get(pool_key)
+                if pool is None:
+                    continue
+                connections += getattr(pool, 'num_connections', 0)
+                requests_sent += getattr(pool, 'num_requests', 0)
+        return connections, requests_sent
+
+    def close(self) -> None:
+        """关闭所有主机会话"""
+        with self._lock:
+            while self._sessions:
+                _, session = self._sessions.popitem(last=False)
+                self._retire(session)
+
+    def stats(self) -> Dict[str, Any]:
+        """获取连接复用统计（连接数、复用率按 urllib3 连接池计数汇总）"""
+        with self._lock:
+            hosts = {
+                f'{scheme}://{netloc}': self._pool_counts(session)
+                for (scheme, netloc), session in self._sessions.items()
+            }
+            connections = self._closed_connections + sum(c for c, _ in hosts.values())
+            requests_sent = self._closed_requests + sum(r for _, r in hosts.values())
+            total_requests, errors = self._requests, self._errors
+        # 重定向会在同一连接池上产生额外请求，因此按连接池统计的请求数为准
+        reused = max(0, requests_sent - connections)
+        return {
+            'requests': total_requests,
+            'errors': errors,
+            'pooled_requests': requests_sent,
+            'new_connections': connections,
+            'reused_connections': reused,
+            'reuse_rate': round(reused / requests_sent, 4) if requests_sent else 0.0,
+            'active_hosts': len(hosts),
+            'max_hosts': self.max_hosts,
+            'pool_maxsize': self.pool_maxsize,
+            'connect_timeout': self.connect_timeout,
+            'hosts': {
+                host: {'connections': c, 'requests': r}
+                for host, (c, r) in sorted(hosts.items(), key=lambda item: item[1][1], reverse=True)[:20]
+            },
+        }
+
+
+# 全局客户端实例（参数可由 configure_http_client 按应用配置调整）
+_client = HTTPClient()
+
+
+def configure_http_client(config) -> None:
+    """
+    按应用配置调整出站连接池
+
+    Args:
+        config: Flask 配置（HTTP_POOL_MAXSIZE / HTTP_POOL_MAX_HOSTS / HTTP_CONNECT_TIMEOUT / HTTP_DEFAULT_TIMEOUT）
+    """
+    _client.configure(
+        pool_maxsize=config.get('HTTP_POOL_MAXSIZE'),
+        max_hosts=config.get('HTTP_POOL_MAX_HOSTS'),
+        connect_timeout=config.get('HTTP_CONNECT_TIMEOUT'),
+        default_timeout=config.get('HTTP_DEFAULT_TIMEOUT'),
+    )
+
+
+def get_http_client() -> HTTPClient:
+    """全局出站 HTTP 客户端"""
+    return _client
+
+
+def http_get(url: str, **kwargs) -> requests.Response:
+    """requests.get 的连接复用版本"""
+    return _client.get(url, **kwargs)
+
+
+def http_post(url: str, **kwargs) -> requests.Response:
+    """requests.post 的连接复用版本"""
+    return _client.post(url, **kwargs)
+
+
+def http_head(url: str, **kwargs) -> requests.Response:
+    """requests.head 的连接复用版本"""
+    return _client.head(url, **kwargs)
+
+
+def get_http_stats() -> Dict[str, Any]:
+    """获取出站连接复用统计"""
+    return _client.stats()
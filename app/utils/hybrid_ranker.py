@@ -0,0 +1,171 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+本地混合排序 - 不调用大模型，在候选网站上融合关键词匹配、向量相似度、访问量和管理员排序
+
+    * weighted（默认）：每路信号按最大值缩放到 0-1 后加权求和，关键词匹配强弱的差别得以保留
+    * rrf：倒数排名融合，每路信号按各自排名贡献 权重 / (RRF_K + 排名)，不受各路分值量纲影响，
+      但相邻排名的贡献几乎相同，访问量等先验信号容易盖过细微的相关度差别
+
+所有信号都以候选集为单位用 NumPy 向量化计算，几百个候选的排序在毫秒级完成。
+"""
+
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+RANK_METHODS = ('weighted', 'rrf')
+
+# 关键词匹配的字段权重（与全文检索 bm25 的列权重一致：标题 > 描述 > URL，分类名与 URL 同级）
+FIELD_WEIGHTS = {'title': 10.0, 'description': 4.0, 'url': 1.0, 'category': 1.0}
+
+# 倒数排名融合的平滑常数（越大，排名靠前与靠后的差距越小）
+RRF_K = 60
+
+# 各路信号的权重
+RRF_WEIGHTS = {'keyword': 1.0, 'vector': 1.0, 'views': 0.1, 'sort_order': 0.1}
+WEIGHTED_WEIGHTS = {'keyword': 0.45, 'vector': 0.4, 'views': 0.1, 'sort_order': 0.05}
+
+# AI 意图理解给出的扩展关键词相对原始查询的权重
+EXPANDED_TERM_WEIGHT = 0.5
+
+
+def _search_terms(query: str, extra_terms: Sequence[str] = ()) -> List[Tuple[str, float]]:
+    """查询词及其权重：完整查询、空格分隔的各个词、扩展关键词（去重，忽略大小写）"""
+    terms: Dict[str, float] = {}
+    query = (query or '').strip().lower()
+    if query:
+        terms[query] = 1.0
+        for word in query.split():
+            terms.setdefault(word, 1.0 / max(1, len(query.split())))
+    for term in extra_terms:
+        term = (term or '').strip().lower()
+        if term:
+            terms.setdefault(term, EXPANDED_TERM_WEIGHT)
+    return list(terms.items())
+
+
+def keyword_scores(candidates: List[Dict], query: str, extra_terms: Sequence[str] = ()) -> np.ndarray:
+    """
+    按字段权重计算每个候选的关键词匹配分（子串匹配；标题以查询开头、含完整的查询词或与查询相同时额外加分）
+
+    Args:
+        candidates: 候选网站（title / description / url / category 字段）
+        query: 搜索查询
+        extra_terms: 扩展关键词
+
+    Returns:
+        与 candidates 等长的分值数组
+    """
+    scores = np.zeros(len(candidates), dtype=np.float64)
+    if not candidates:
+        return scores
+    terms = _search_terms(query, extra_terms)
+    if not terms:
+        return scores
+
+    for field, field_weight in FIELD_WEIGHTS.items():
+        values = np.char.lower(np.array([str(c.get(field) or '') for c in candidates], dtype=str))
+        for term, term_weight in terms:
+            scores += field_weight * term_weight * (np.char.find(values, term) >= 0)
+        if field == 'title':
+            full_query = terms[0][0]
+            padded = np.char.add(np.char.add(' ', values), ' ')
+            scores += 0.5 * field_weight * np.char.startswith(values, full_query)
+            scores += 0.5 * field_weight * (np.char.find(padded, f' {full_query} ') >= 0)
+            scores += 0.5 * field_weight * (values == full_query)
+    return scores
+
+
+def _ranks(values: np.ndarray) -> np.ndarray:
+    """按分值降序的排名（从1开始，分值相同的并列，取其中最好的名次）"""
+    ordered = np.sort(values)[::-1]
+    return np.searchsorted(-ordered, -values, side='left').astype(np.float64) + 1
+
+
+def _normalize(values: np.ndarray, present: np.ndarray) -> np.ndarray:
+    """
+    按最大值把有信号的候选缩放到 (0, 1]（没有信号的为 0）
+
+    不减去最小值：最弱的真实信号仍大于 0，不会与没有信号的候选混为一谈
+
+    >>> _normalize(np.array([0.8, 0.4, 0.0]), np.array([True, True, False])).tolist()
+    [1.0, 0.5, 0.0]
+    """
+    result = np.zeros(len(values), dtype=np.float64)
+    if not present.any():
+        return result
+    high = values[present].max()
+    if high > 0:
+        result[present] = np.maximum(values[present], 0) / high
+    else:
+        result[present] = 1.0
+    return result
+
+
+def hybrid_rank(candidates: List[Dict], query: str, vector_scores: Optional[Dict[int, float]] = None,
+                keyword_ids: Sequence[int] = (), extra_terms: Sequence[str] = (),
+                method: str = 'weighted') -> List[Tuple[int, float]]:
+    """
+    对候选网站做混合排序
+
+    Args:
+        candidates: 候选网站，每项包含 id / title / description / url / category（分类名）/ views / sort_order
+        query: 搜索查询
+        vector_scores: 网站ID -> 向量相似度
+        keyword_ids: 全文检索按 bm25 排好序的网站ID（关键词匹配分相同时按此顺序）
+        extra_terms: AI 意图理解给出的扩展关键词
+        method: weighted 或 rrf
+
+    Returns:
+        [(网站ID, 融合分)]，按融合分降序
+
+    向量相似度相近时由关键词匹配决定先后，只在描述中匹配的网站仍排在没有关键词匹配的网站之前：
+
+    >>> candidates = [
+    ...     {'id': 1, 'title': 'Python', 'url': 'https://python.org'},
+    ...     {'id': 2, 'title': 'Docs', 'description': 'python tutorials', 'url': 'https://docs.example'},
+    ...     {'id': 3, 'title': 'Other', 'url': 'https://other.example'},
+    ... ]
+    >>> [i for i, _ in hybrid_rank(candidates, 'python', vector_scores={1: 0.82, 2: 0.80, 3: 0.81})]
+    [1, 2, 3]
+    """
+    if not candidates:
+        return []
+    vector_scores = vector_scores or {}
+    count = len(candidates)
+    ids = np.array([c['id'] for c in candidates], dtype=np.int64)
+
+    bm25_position = {website_id: position for position, website_id in enumerate(keyword_ids)}
+    # 不在全文检索结果中的候选排在其后，再按原顺序
+    tiebreak = np.array([bm25_position.get(int(i), len(bm25_position) + n) for n, i in enumerate(ids)],
+                        dtype=np.float64)
+
+    keyword = keyword_scores(candidates, query, extra_terms)
+    keyword_present = keyword > 0
+    if bm25_position:
+        keyword_present |= np.isin(ids, np.fromiter(bm25_position, dtype=np.int64))
+    vector = np.array([vector_scores.get(int(i), 0.0) for i in ids], dtype=np.float64)
+    vector_present = np.array([int(i) in vector_scores for i in ids])
+    views = np.log1p(np.array([max(0, c.get('views') or 0) for c in candidates], dtype=np.float64))
+    sort_order = np.array([c.get('sort_order') or 0 for c in candidates], dtype=np.float64)
+
+    signals = {
+        'keyword': (keyword, keyword_present),
+        'vector': (vector, vector_present),
+        'views': (views, views > 0),
+        'sort_order': (sort_order, sort_order > 0),
+    }
+
+    fused = np.zeros(count, dtype=np.float64)
+    if method == 'rrf':
+        for name, (values, present) in signals.items():
+            if present.any():
+                fused += present * (RRF_WEIGHTS[name] / (RRF_K + _ranks(values)))
+    else:
+        for name, (values, present) in signals.items():
+            fused += WEIGHTED_WEIGHTS[name] * _normalize(values, present)
+
+    order = np.lexsort((tiebreak, -fused))
+    return [(int(ids[i]), float(fused[i])) for i in order]
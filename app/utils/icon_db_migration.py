@@ -56,7 +56,7 @@ def _ensure_columns(cursor: sqlite3.Cursor, table_name: str, fields: Iterable[tu
     return added
 
 
-def migrate_icon_management_tables(db_path: str) -> int:
+def migrate_icon_management_tables(db_path: str, raise_errors: bool = False) -> int:
     """
     创建图标系统所需表，并补齐 site_settings 新字段。
 
@@ -180,4 +180,6 @@ def migrate_icon_management_tables(db_path: str) -> int:
         conn.close()
         return change_count
     except Exception:
+        if raise_errors:
+            raise
         return 0
@@ -22,7 +22,9 @@ from sqlalchemy.exc import OperationalError
 from sqlalchemy.orm import joinedload
 
 from app import db
-from app.models import IconAsset, IconSyncTask, SiteSettings, Website, WebsiteIcon
+from app.models import IconAsset, IconSyncTask, Website, WebsiteIcon
+from app.utils.settings_cache import get_site_settings
+from app.utils.http_client import http_get, http_post
 
 
 ICON_TASK_SYNC_MISSING = 'sync_missing'
@@ -159,23 +161,13 @@ def _provider_url_for_domain(provider: dict[str, Any], domain: str, size: int =
     return template.format(domain=quote(domain, safe=''), size=size, default='identicon')
 
 
-def _get_site_settings_cached() -> SiteSettings:
-    if has_app_context():
-        cached = getattr(g, '_icon_site_settings', None)
-        if cached is None:
-            cached = SiteSettings.get_settings()
-            g._icon_site_settings = cached
-        return cached
-    return SiteSettings.get_settings()
-
-
 def _get_source_provider_configs() -> list[dict[str, Any]]:
     if has_app_context():
         cached = getattr(g, '_icon_source_provider_configs', None)
         if cached is not None:
             return cached
     try:
-        providers = _get_site_settings_cached().get_icon_source_providers()
+        providers = get_site_settings().get_icon_source_providers()
     except Exception:
         providers = []
     if has_app_context():
@@ -294,7 +286,7 @@ def _download_icon_response(website: Website, source_url: str) -> tuple[str, req
     errors: list[str] = []
     for candidate_url in _build_icon_download_candidates(website, source_url):
         try:
-            response = requests.get(candidate_url, headers=REQUEST_HEADERS, timeout=15)
+            response = http_get(candidate_url, headers=REQUEST_HEADERS, timeout=15)
             response.raise_for_status()
             if not response.content:
                 raise ValueError('empty icon response')
@@ -413,14 +405,14 @@ def get_imagebed_icon_url(meta: WebsiteIcon | None) -> str | None:
 
 
 def _get_effective_display_mode(meta: WebsiteIcon | None) -> str:
-    settings = _get_site_settings_cached()
+    settings = get_site_settings()
     if meta and meta.display_mode_override and meta.display_mode_override != 'inherit':
         return meta.display_mode_override
     return (settings.icon_display_mode or 'smart').strip() or 'smart'
 
 
 def should_sync_local(meta: WebsiteIcon | None) -> bool:
-    settings = _get_site_settings_cached()
+    settings = get_site_settings()
     mode = (meta.sync_local_mode if meta else 'inherit') or 'inherit'
     if mode == 'always':
         return True
@@ -430,7 +422,7 @@ def should_sync_local(meta: WebsiteIcon | None) -> bool:
 
 
 def should_sync_imagebed(meta: WebsiteIcon | None) -> bool:
-    settings = _get_site_settings_cached()
+    settings = get_site_settings()
     mode = (meta.sync_imagebed_mode if meta else 'inherit') or 'inherit'
     if mode == 'always':
         return True
@@ -774,7 +766,7 @@ def upload_icon_to_imagebed(website: Website) -> dict[str, Any]:
         db.session.commit()
         raise ValueError('missing local icon asset')
 
-    provider, api_url, token = _get_site_settings_cached().get_icon_imagebed_config()
+    provider, api_url, token = get_site_settings().get_icon_imagebed_config()
     if provider != IMAGEBED_PROVIDER_EASYIMAGE or not api_url or not token:
         meta.imagebed_status = 'failed'
         meta.last_error = 'imagebed is not configured'
@@ -784,7 +776,7 @@ def upload_icon_to_imagebed(website: Website) -> dict[str, Any]:
     local_path = _asset_absolute_path(asset)
     try:
         with local_path.open('rb') as handle:
-            response = requests.post(
+            response = http_post(
                 api_url,
                 data={'token': token},
                 files={'image': (local_path.name, handle, asset.mime_type or 'application/octet-stream')},
@@ -0,0 +1,374 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+进程内向量存储 - 以内存映射的 float32 矩阵做精确余弦检索，可替代 Qdrant（适合二十万以下的网站规模）
+
+磁盘布局（目录下三个文件）：
+    meta.json     向量维度
+    vectors.f32   按行追加的向量矩阵（已 L2 归一化），通过 np.memmap 读取
+    rows.jsonl    追加式行日志：{"row": 行号, "id": 网站ID, "payload": {...}} 表示新增/覆盖，
+                  {"delete": 网站ID} 表示删除；覆盖和删除只让旧行失效（墓碑），失效行过多时整体压缩
+"""
+
+import json
+import os
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows 下没有 fcntl，只保证进程内的写入互斥
+    fcntl = None
+
+
+class LocalVectorStore:
+    """与 QdrantVectorStore 接口一致的本地向量存储"""
+
+    # 失效行超过该比例（且不少于 COMPACT_MIN_DEAD 行）时压缩文件
+    COMPACT_RATIO = 0.25
+    COMPACT_MIN_DEAD = 1000
+
+    def __init__(self, path: str, vector_dimension: Optional[int] = 1024):
+        """
+        打开（或创建）本地向量存储
+
+        Args:
+            path: 存储目录
+            vector_dimension: 向量维度（与已有数据不一致时清空重建，与 Qdrant 集合的行为相同；None 表示沿用已有维度）
+        """
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self._meta_path = os.path.join(path, 'meta.json')
+        self._matrix_path = os.path.join(path, 'vectors.f32')
+        self._log_path = os.path.join(path, 'rows.jsonl')
+        self._lock_path = os.path.join(path, '.lock')
+        self._lock = threading.RLock()
+        self.vector_dimension = vector_dimension
+        self._reset_state()
+        self._ensure_collection()
+
+    # ---- 内部状态 ----
+
+    def _reset_state(self) -> None:
+        self._ids = np.zeros(0, dtype=np.int64)       # 行号 -> 网站ID，失效行为 -1
+        self._row_of: Dict[int, int] = {}              # 网站ID -> 当前有效行号
+        self._payloads: Dict[int, dict] = {}
+        # 私有网站ID -> (创建者ID, 可见用户ID)，按元数据中的权限字段维护，用于检索时的可见性过滤
+        self._private: Dict[int, Tuple[Optional[int], frozenset]] = {}
+        self._matrix: Optional[np.ndarray] = None
+        self._rows = 0                                 # 行日志中出现过的行数（含失效行）
+        self._mapped_rows = 0
+        self._log_offset = 0
+        self._log_inode = None
+
+    @contextmanager
+    def _file_lock(self):
+        """跨进程写锁（批量索引脚本可能与 Web 进程同时写入）"""
+        with open(self._lock_path, 'a') as handle:
+            if fcntl is not None:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+
+    def _read_meta(self) -> Optional[int]:
+        try:
+            with open(self._meta_path, 'r', encoding='utf-8') as f:
+                return int(json.load(f)['dimension'])
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _write_meta(self, dimension: int) -> None:
+        tmp_path = self._meta_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'dimension': dimension}, f)
+        os.replace(tmp_path, self._meta_path)
+
+    def _apply_line(self, line: str) -> None:
+        try:
+            record = json.loads(line)
+        except ValueError:
+            # 写入中断留下的半行，忽略
+            return
+        if 'delete' in record:
+            website_id = int(record['delete'])
+            row = self._row_of.pop(website_id, None)
+            if row is not None:
+                self._ids[row] = -1
+            self._payloads.pop(website_id, None)
+            self._private.pop(website_id, None)
+            return
+        row, website_id = int(record['row']), int(record['id'])
+        self._rows = max(self._rows, row + 1)
+        if row >= len(self._ids):
+            grown = np.full(max(row + 1, len(self._ids) * 2, 1024), -1, dtype=np.int64)
+            grown[:len(self._ids)] = self._ids
+            self._ids = grown
+        previous = self._row_of.get(website_id)
+        if previous is not None:
+            self._ids[previous] = -1
+        self._ids[row] = website_id
+        self._row_of[website_id] = row
+        payload = record.get('payload') or {}
+        self._payloads[website_id] = payload
+        if payload.get('is_private'):
+            self._private[website_id] = (payload.get('created_by_id'), frozenset(payload.get('visible_to') or ()))
+        else:
+            self._private.pop(website_id, None)
+
+    def _refresh(self) -> None:
+        """读取行日志中新追加的部分（其他进程写入或压缩后重新加载），并重新映射矩阵"""
+        try:
+            stat = os.stat(self._log_path)
+        except FileNotFoundError:
+            if self._log_offset:
+                self._reset_state()
+            return
+        if stat.st_ino != self._log_inode or stat.st_size < self._log_offset:
+            # 文件被压缩替换，整体重新加载
+            self._reset_state()
+            self._log_inode = stat.st_ino
+        if stat.st_size > self._log_offset:
+            with open(self._log_path, 'rb') as f:
+                f.seek(self._log_offset)
+                chunk = f.read()
+            # 只处理完整的行，末尾未写完的行留到下次
+            end = chunk.rfind(b'\n') + 1
+            for line in chunk[:end].decode('utf-8').splitlines():
+                if line:
+                    self._apply_line(line)
+            self._log_offset += end
+        self._remap()
+
+    def _remap(self) -> None:
+        if not self.vector_dimension:
+            return
+        if self._matrix is not None and self._rows == self._mapped_rows:
+            return
+        try:
+            available = os.path.getsize(self._matrix_path) // (self.vector_dimension * 4)
+        except OSError:
+            available = 0
+        rows = min(self._rows, available)
+        self._matrix = (
+            np.memmap(self._matrix_path, dtype=np.float32, mode='r', shape=(rows, self.vector_dimension))
+            if rows else None
+        )
+        self._mapped_rows = rows
+
+    def _append_rows(self, website_ids: List[int], vectors: np.ndarray, payloads: List[dict]) -> None:
+        """追加若干行（调用方持有进程内锁）"""
+        with self._file_lock():
+            self._refresh()
+            row_bytes = self.vector_dimension * 4
+            with open(self._matrix_path, 'ab') as f:
+                first_row = f.tell() // row_bytes
+                if f.tell() % row_bytes:
+                    # 截掉上次中断写入留下的不完整行
+                    f.truncate(first_row * row_bytes)
+                    f.seek(first_row * row_bytes)
+                f.write(np.ascontiguousarray(vectors, dtype=np.float32).tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+            lines = ''.join(
+                json.dumps({'row': first_row + i, 'id': int(website_id), 'payload': payload}, ensure_ascii=False) + '\n'
+                for i, (website_id, payload) in enumerate(zip(website_ids, payloads))
+            )
+            with open(self._log_path, 'a', encoding='utf-8') as f:
+                f.write(lines)
+            self._refresh()
+
+    # ---- 与 QdrantVectorStore 相同的接口 ----
+
+    def _ensure_collection(self, force_recreate: bool = False):
+        """
+        确保存储存在且维度匹配，不匹配时清空重建
+
+        Args:
+            force_recreate: 是否强制清空重建
+        """
+        with self._lock, self._file_lock():
+            existing_dimension = self._read_meta()
+            if self.vector_dimension is None:
+                self.vector_dimension = existing_dimension
+            if self.vector_dimension is None:
+                return
+            if force_recreate or existing_dimension != self.vector_dimension:
+                for file_path in (self._matrix_path, self._log_path):
+                    if os.path.exists(file_path):
+                        os.remove(file_path)
+                self._write_meta(self.vector_dimension)
+                self._reset_state()
+            self._refresh()
+
+    def update_dimension(self, new_dimension: int):
+        """
+        更新向量维度（维度改变时清空重建）
+
+        Args:
+            new_dimension: 新的向量维度
+        """
+        if self.vector_dimension != new_dimension:
+            self.vector_dimension = new_dimension
+            self._ensure_collection(force_recreate=True)
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    def store_vector(self, website_id: int, vector: List[float], payload: Dict):
+        """
+        存储网站向量（已存在时覆盖）
+
+        Args:
+            website_id: 网站ID
+            vector: 向量
+            payload: 元数据（title, description, category等）
+        """
+        self.store_vectors([website_id], [vector], [payload])
+
+    def store_vectors(self, website_ids: List[int], vectors: List[List[float]], payloads: List[Dict]):
+        """
+        批量存储网站向量
+
+        Args:
+            website_ids: 网站ID列表
+            vectors: 向量列表
+            payloads: 元数据列表
+        """
+        if not website_ids:
+            return
+        matrix = np.asarray(vectors, dtype=np.float32)
+        if matrix.ndim != 2 or matrix.shape[1] != self.vector_dimension:
+            raise ValueError(f'向量维度不匹配: {matrix.shape[-1]} != {self.vector_dimension}')
+        with self._lock:
+            self._append_rows(list(website_ids), self._normalize(matrix), list(payloads))
+            self._maybe_compact()
+
+    def _hidden_ids(self, visibility: Optional[Tuple]) -> List[int]:
+        """按可见性分类计算不可见的私有网站ID（调用方持有进程内锁）"""
+        if visibility is None or visibility[0] == 'admin':
+            return []
+        if visibility[0] != 'user':
+            return list(self._private)
+        user_id = visibility[1]
+        return [
+            website_id for website_id, (owner_id, shared) in self._private.items()
+            if owner_id != user_id and user_id not in shared
+        ]
+
+    def search_similar(self, query_vector: List[float], limit: int = 20,
+                       visibility: Optional[Tuple] = None, threshold: float = 0.3) -> List[Dict]:
+        """
+        搜索相似向量（精确余弦相似度：一次矩阵-向量乘积 + argpartition 取前 k）
+
+        Args:
+            query_vector: 查询向量
+            limit: 返回数量
+            visibility: 可见性分类（visibility_key 的结果，None 表示不过滤）
+            threshold: 相似度阈值
+
+        Returns:
+            搜索结果列表，每个结果包含 website_id, score, payload
+        """
+        with self._lock:
+            self._refresh()
+            matrix, ids, payloads = self._matrix, self._ids[:self._mapped_rows], self._payloads
+            hidden_ids = self._hidden_ids(visibility)
+        if matrix is None or limit <= 0:
+            return []
+
+        query = self._normalize(np.asarray(query_vector, dtype=np.float32))
+        scores = matrix @ query
+        valid = ids >= 0
+        if hidden_ids:
+            valid &= ~np.isin(ids, np.asarray(hidden_ids, dtype=np.int64))
+        valid &= scores >= threshold
+        candidates = np.flatnonzero(valid)
+        if candidates.size > limit:
+            top = np.argpartition(-scores[candidates], limit - 1)[:limit]
+            candidates = candidates[top]
+        order = candidates[np.argsort(-scores[candidates], kind='stable')]
+
+        return [
+            {
+                'website_id': int(ids[row]),
+                'score': float(scores[row]),
+                'payload': payloads.get(int(ids[row]), {}),
+            }
+            for row in order
+        ]
+
+    def delete_vector(self, website_id: int):
+        """
+        删除向量（写入墓碑记录）
+
+        Args:
+            website_id: 网站ID
+        """
+        with self._lock, self._file_lock():
+            self._refresh()
+            if website_id not in self._row_of:
+                return
+            with open(self._log_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps({'delete': int(website_id)}) + '\n')
+            self._refresh()
+
+    def existing_ids(self, website_ids: Iterable[int]) -> Set[int]:
+        """返回给定网站中已有向量的ID集合"""
+        with self._lock:
+            self._refresh()
+            return {website_id for website_id in website_ids if website_id in self._row_of}
+
+    def clear(self):
+        """清空所有向量"""
+        self._ensure_collection(force_recreate=True)
+
+    # ---- 压缩 ----
+
+    def _maybe_compact(self) -> None:
+        dead = self._mapped_rows - len(self._row_of)
+        if dead >= self.COMPACT_MIN_DEAD and dead > self._mapped_rows * self.COMPACT_RATIO:
+            self.compact()
+
+    def compact(self) -> None:
+        """丢弃失效行，重写矩阵和行日志（写入临时文件后原子替换）"""
+        with self._lock, self._file_lock():
+            self._refresh()
+            if self._matrix is None:
+                return
+            live = sorted(self._row_of.items(), key=lambda item: item[1])
+            rows = np.fromiter((row for _, row in live), dtype=np.int64, count=len(live))
+            tmp_matrix, tmp_log = self._matrix_path + '.tmp', self._log_path + '.tmp'
+            with open(tmp_matrix, 'wb') as f:
+                for start in range(0, len(rows), 4096):
+                    f.write(np.ascontiguousarray(self._matrix[rows[start:start + 4096]]).tobytes())
+            with open(tmp_log, 'w', encoding='utf-8') as f:
+                for new_row, (website_id, _) in enumerate(live):
+                    f.write(json.dumps({'row': new_row, 'id': website_id, 'payload': self._payloads.get(website_id, {})},
+                                       ensure_ascii=False) + '\n')
+            self._matrix = None
+            os.replace(tmp_matrix, self._matrix_path)
+            os.replace(tmp_log, self._log_path)
+            self._reset_state()
+            self._refresh()
+
+    def stats(self) -> Dict:
+        """获取存储统计信息"""
+        with self._lock:
+            self._refresh()
+            return {
+                'backend': 'local',
+                'path': self.path,
+                'dimension': self.vector_dimension,
+                'vectors': len(self._row_of),
+                'rows': self._mapped_rows,
+                'tombstones': self._mapped_rows - len(self._row_of),
+            }
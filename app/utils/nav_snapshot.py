@@ -0,0 +1,210 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""首页导航快照 - 用少量分组查询构建整棵分类树，按可见性分类缓存到数据变更为止"""
+
+from threading import Lock
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import joinedload
+
+from app import db
+from app.models import Category, Website, WebsiteIcon
+from app.utils.category_counts import get_category_counts
+from app.utils.data_version import CATALOG, SETTINGS, get_data_versions
+from app.utils.visibility import apply_visibility, visibility_scope
+
+
+FEATURED_LIMIT = 6
+
+
+class NavWebsite:
+    """快照中的网站（只读，脱离数据库会话）"""
+
+    def __init__(self, website: Website):
+        self.id = website.id
+        self.title = website.title
+        self.url = website.url
+        self.description = website.description
+        self.sort_order = website.sort_order
+        self.views = website.views
+        self.is_private = website.is_private
+        self.is_featured = website.is_featured
+        self.category_id = website.category_id
+        self.display_icon_url = website.display_icon_url
+
+    def __repr__(self):
+        return f'<NavWebsite {self.title}>'
+
+
+class NavCategory:
+    """快照中的分类（只读，脱离数据库会话）"""
+
+    def __init__(self, category: Category):
+        self.id = category.id
+        self.name = category.name
+        self.description = category.description
+        self.icon = category.icon
+        self.color = category.color
+        self.order = category.order
+        self.display_limit = category.display_limit
+        self.parent_id = category.parent_id
+        self.direct_website_count = 0
+        self.total_count = 0
+        self.total_count_with_children = 0
+        self.children_list: List['NavCategory'] = []
+        self.website_list: List[NavWebsite] = []
+        self.displayed_subcategory_id: Optional[int] = None
+
+    @property
+    def children(self):
+        """兼容模板中对 category.children 的遍历（与关系属性一致，按ID排列）"""
+        return sorted(self.children_list, key=lambda child: child.id)
+
+    def __repr__(self):
+        return f'<NavCategory {self.name}>'
+
+
+class NavigationSnapshot:
+    """首页渲染所需的全部数据"""
+
+    def __init__(self, categories: List[NavCategory], featured_sites: List[NavWebsite]):
+        self.categories = categories
+        self.featured_sites = featured_sites
+
+
+_snapshots: Dict[Tuple, Tuple[Tuple, NavigationSnapshot]] = {}
+_snapshots_lock = Lock()
+_MAX_SNAPSHOTS = 256
+
+
+def _load_ranked_websites(user, limits: Dict[int, Optional[int]]) -> Dict[int, List[Website]]:
+    """一次查询取出每个分类排序靠前的网站（ROW_NUMBER 窗口函数分组截断）"""
+    if not limits:
+        return {}
+
+    rank = func.row_number().over(
+        partition_by=Website.category_id,
+        order_by=(Website.sort_order.desc(), Website.created_at.asc(), Website.views.desc())
+    ).label('rank')
+    ranked = db.session.query(Website.id.label('id'), Website.category_id.label('category_id'), rank)
+    ranked = apply_visibility(ranked.filter(Website.category_id.in_(list(limits.keys()))), user).subquery()
+
+    icon_load = joinedload(Website.icon_meta).joinedload(WebsiteIcon.icon_asset)
+    query = db.session.query(Website, ranked.c.rank)\
+                      .options(icon_load)\
+                      .join(ranked, Website.id == ranked.c.id)
+    if all(limit is not None for limit in limits.values()):
+        query = query.filter(ranked.c.rank <= max(limits.values()))
+
+    grouped: Dict[int, List[Website]] = {}
+    for website, position in query.order_by(ranked.c.category_id, ranked.c.rank).all():
+        limit = limits.get(website.category_id)
+        if limit is not None and position > limit:
+            continue
+        grouped.setdefault(website.category_id, []).append(website)
+    return grouped
+
+
+def build_navigation_snapshot(user) -> NavigationSnapshot:
+    """
+    构建首页导航快照（分类、子分类、可见数量、每个分类的前N个网站）
+
+    Args:
+        user: 当前用户（可为匿名用户）
+
+    Returns:
+        NavigationSnapshot
+    """
+    all_categories = Category.query.order_by(Category.order.desc()).all()
+
+    counts = get_category_counts(user)
+
+    children_map: Dict[int, List[NavCategory]] = {}
+    top_categories: List[NavCategory] = []
+    for category in all_categories:
+        nav_category = NavCategory(category)
+        if category.parent_id is None:
+            top_categories.append(nav_category)
+        else:
+            children_map.setdefault(category.parent_id, []).append(nav_category)
+
+    # 决定每个一级分类展示哪个分类的网站，以及展示数量
+    display_sources: Dict[int, int] = {}
+    limits: Dict[int, Optional[int]] = {}
+    for category in top_categories:
+        children = children_map.get(category.id, [])
+        category.children_list = children
+        category.direct_website_count = counts.direct_count(category.id)
+        category.total_count = category.direct_website_count
+        category.total_count_with_children = counts.total_count(category.id)
+        for child in children:
+            child.total_count = counts.total_count(child.id)
+
+        source_id = category.id
+        if children and category.display_limit is not None \
+                and category.direct_website_count < category.display_limit:
+            # 未分类网站不足 display_limit 时，显示第一个二级分类的网站
+            source_id = children[0].id
+            category.displayed_subcategory_id = source_id
+        display_sources[category.id] = source_id
+        limits[source_id] = category.display_limit
+
+    ranked_websites = _load_ranked_websites(user, limits)
+    for category in top_categories:
+        websites = ranked_websites.get(display_sources[category.id], [])
+        category.website_list = [NavWebsite(website) for website in websites]
+
+    icon_load = joinedload(Website.icon_meta).joinedload(WebsiteIcon.icon_asset)
+    featured_query = apply_visibility(Website.query.options(icon_load).filter_by(is_featured=True), user)
+    featured_sites = [
+        NavWebsite(website)
+        for website in featured_query.order_by(Website.views.desc()).limit(FEATURED_LIMIT).all()
+    ]
+
+    return NavigationSnapshot(top_categories, featured_sites)
+
+
+def get_navigation_snapshot(user) -> NavigationSnapshot:
+    """
+    获取当前可见性分类的导航快照，目录或设置变更后自动重建
+
+    Args:
+        user: 当前用户（可为匿名用户）
+
+    Returns:
+        NavigationSnapshot
+    """
+    key = visibility_scope(user)
+    versions = get_data_versions((CATALOG, SETTINGS))
+
+    entry = _snapshots.get(key)
+    if entry and entry[0] == versions:
+        return entry[1]
+
+    snapshot = build_navigation_snapshot(user)
+
+    with _snapshots_lock:
+        if len(_snapshots) >= _MAX_SNAPSHOTS:
+            for stale_key in [k for k, v in _snapshots.items() if v[0] != versions]:
+                del _snapshots[stale_key]
+        if len(_snapshots) >= _MAX_SNAPSHOTS:
+            _snapshots.pop(next(iter(_snapshots)))
+        _snapshots[key] = (versions, snapshot)
+
+    return snapshot
+
+
+def clear_navigation_snapshots() -> None:
+    """清空所有导航快照"""
+    with _snapshots_lock:
+        _snapshots.clear()
+
+
+def get_snapshot_stats() -> Dict[str, Any]:
+    """获取快照缓存统计信息"""
+    with _snapshots_lock:
+        return {
+            'entries': len(_snapshots),
+            'max_entries': _MAX_SNAPSHOTS,
+        }
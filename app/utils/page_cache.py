@@ -0,0 +1,187 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""整页缓存 - 缓存匿名访客的首页/分类页HTML，支持 ETag / Last-Modified 条件请求"""
+
+import hashlib
+import time
+from datetime import date, datetime, timezone
+from functools import wraps
+from threading import Lock
+from typing import Any, Dict, Optional, Tuple
+
+from flask import current_app, g, make_response, request, session
+from flask_login import current_user
+from flask_wtf.csrf import generate_csrf
+
+from app.utils.data_version import CATALOG, SETTINGS, get_data_versions
+
+
+# 缓存的HTML中用占位符替代CSRF令牌，命中时替换为当前会话的令牌
+_CSRF_PLACEHOLDER = '__PAGE_CACHE_CSRF_TOKEN__'
+
+_DEFAULT_MAX_ENTRIES = 512
+
+
+class CachedPage:
+    """一份已渲染的页面"""
+
+    def __init__(self, body: str, content_type: str, last_modified: float):
+        self.body = body
+        self.content_type = content_type
+        self.last_modified = last_modified
+        encoded = body.encode('utf-8')
+        self.size = len(encoded)
+        self.digest = hashlib.sha256(encoded).hexdigest()
+
+
+_pages: Dict[Tuple, Tuple[Tuple, CachedPage]] = {}
+_pages_lock = Lock()
+_stats = {'hits': 0, 'misses': 0, 'not_modified': 0, 'bypass': 0}
+_stats_lock = Lock()
+
+
+def _count(name: str) -> None:
+    with _stats_lock:
+        _stats[name] += 1
+
+
+def _is_enabled() -> bool:
+    return bool(current_app.config.get('PAGE_CACHE_ENABLED'))
+
+
+def _is_cacheable_request() -> bool:
+    """只缓存匿名访客的 GET/HEAD 请求，且会话中没有待显示的闪现消息"""
+    if request.method not in ('GET', 'HEAD'):
+        return False
+    if current_user.is_authenticated:
+        return False
+    return '_flashes' not in session
+
+
+def _csrf_field_name() -> str:
+    return current_app.config.get('WTF_CSRF_FIELD_NAME', 'csrf_token')
+
+
+def _token_bucket() -> int:
+    """
+    CSRF令牌时间分桶
+
+    页面中的CSRF令牌有有效期，ETag 随分桶变化可保证浏览器复用的页面令牌不会过期
+    """
+    time_limit = current_app.config.get('WTF_CSRF_TIME_LIMIT', 3600)
+    if not time_limit:
+        return 0
+    return int(time.time() // max(60, int(time_limit) // 2))
+
+
+def _page_key() -> Tuple:
+    view_args = tuple(sorted((request.view_args or {}).items()))
+    args = tuple(sorted(request.args.items(multi=True)))
+    # 页脚显示当前年份
+    return (request.endpoint, view_args, args, date.today().year)
+
+
+def _versions_time(versions: Tuple) -> Optional[float]:
+    """数据版本号是毫秒时间戳，可直接作为最后修改时间"""
+    latest = max(versions) if versions else 0
+    if latest > 10 ** 12:
+        return latest / 1000.0
+    return None
+
+
+def _store(key: Tuple, versions: Tuple, response) -> Optional[CachedPage]:
+    if response.status_code != 200 or response.mimetype != 'text/html':
+        return None
+    if response.direct_passthrough or '_flashes' in session:
+        return None
+
+    body = response.get_data(as_text=True)
+    token = g.get(_csrf_field_name())
+    if token:
+        body = body.replace(token, _CSRF_PLACEHOLDER)
+
+    page = CachedPage(body, response.content_type, _versions_time(versions) or time.time())
+    max_entries = current_app.config.get('PAGE_CACHE_MAX_ENTRIES', _DEFAULT_MAX_ENTRIES)
+    with _pages_lock:
+        if len(_pages) >= max_entries:
+            for stale_key in [k for k, v in _pages.items() if v[0] != versions]:
+                del _pages[stale_key]
+        if len(_pages) >= max_entries:
+            _pages.pop(next(iter(_pages)))
+        _pages[key] = (versions, page)
+    return page
+
+
+def _serve(page: CachedPage):
+    token = generate_csrf()
+    response = make_response(page.body.replace(_CSRF_PLACEHOLDER, token))
+    response.content_type = page.content_type
+
+    # ETag 绑定页面内容、会话令牌和令牌分桶，避免304复用其它会话或已过期的CSRF令牌
+    raw_token = session.get(_csrf_field_name(), '')
+    bucket = _token_bucket()
+    etag = hashlib.sha256(f'{page.digest}:{raw_token}:{bucket}'.encode('utf-8')).hexdigest()[:32]
+    response.set_etag(etag)
+
+    time_limit = current_app.config.get('WTF_CSRF_TIME_LIMIT', 3600)
+    bucket_start = bucket * max(60, int(time_limit) // 2) if time_limit else 0
+    response.last_modified = datetime.fromtimestamp(max(page.last_modified, bucket_start), tz=timezone.utc)
+    response.cache_control.no_cache = True
+    response.vary.add('Cookie')
+
+    response.make_conditional(request)
+    if response.status_code == 304:
+        _count('not_modified')
+    return response
+
+
+def cached_page(view):
+    """
+    整页缓存装饰器（需在配置中开启 PAGE_CACHE_ENABLED）
+
+    缓存键包含路由、参数以及目录和设置的数据版本号，网站、分类、设置写入后自动失效
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not _is_enabled() or not _is_cacheable_request():
+            if _is_enabled():
+                _count('bypass')
+            return view(*args, **kwargs)
+
+        key = _page_key()
+        versions = get_data_versions((CATALOG, SETTINGS))
+
+        entry = _pages.get(key)
+        if entry and entry[0] == versions:
+            _count('hits')
+            return _serve(entry[1])
+
+        _count('misses')
+        response = make_response(view(*args, **kwargs))
+        page = _store(key, versions, response)
+        if page is None:
+            return response
+        return _serve(page)
+
+    return wrapper
+
+
+def clear_page_cache() -> None:
+    """清空整页缓存"""
+    with _pages_lock:
+        _pages.clear()
+
+
+def get_page_cache_stats() -> Dict[str, Any]:
+    """获取整页缓存统计信息"""
+    with _pages_lock:
+        entries = len(_pages)
+        size = sum(page.size for _, page in _pages.values())
+    with _stats_lock:
+        counters = dict(_stats)
+    return {
+        'enabled': bool(current_app.config.get('PAGE_CACHE_ENABLED')),
+        'entries': entries,
+        'size_bytes': size,
+        **counters,
+    }
@@ -0,0 +1,209 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""查询计划回归检查 - 在合成数据上对热点查询执行 EXPLAIN QUERY PLAN，发现全表扫描即失败"""
+
+import os
+import random
+import re
+import sqlite3
+import tempfile
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import create_engine, func
+
+from app import db
+from app.models import User, Website
+from app.utils.db_migration import run_schema_migrations
+
+
+# 需要检查的表：这些表上出现不带索引的 SCAN 即视为回归
+CHECKED_TABLES = ('website', 'website_visibility')
+
+_FULL_SCAN = re.compile(r'^SCAN (?:TABLE )?(\w+)(?: AS \w+)?$')
+
+
+class PlanResult:
+    """单条查询的检查结果"""
+
+    def __init__(self, name: str, role: str, plan: List[str], violations: List[str]):
+        self.name = name
+        self.role = role
+        self.plan = plan
+        self.violations = violations
+
+    @property
+    def ok(self) -> bool:
+        return not self.violations
+
+
+def _plan_users() -> Dict[str, Optional[User]]:
+    """三种可见性身份：匿名、管理员、普通用户（临时对象，不写入会话）"""
+    return {
+        'anonymous': None,
+        'admin': User(id=1, username='plan_admin', is_admin=True),
+        'user': User(id=2, username='plan_user', is_admin=False),
+    }
+
+
+def _canonical_queries() -> List[Tuple[str, Callable]]:
+    """views.py / api_search.py / api_website.py 及导航快照中的热点查询"""
+    from app.utils.fts_search import apply_keyword_search
+    from app.utils.visibility import apply_visibility
+
+    order = (Website.sort_order.desc(), Website.created_at.asc(), Website.views.desc())
+
+    def category_listing(user):
+        # views.category：分类页网站列表
+        return apply_visibility(Website.query.filter_by(category_id=3), user).order_by(*order)
+
+    def ranked_listing(user):
+        # nav_snapshot：首页各分类前N个网站
+        rank = func.row_number().over(partition_by=Website.category_id, order_by=order).label('rank')
+        ranked = db.session.query(Website.id.label('id'), Website.category_id.label('category_id'), rank)
+        ranked = apply_visibility(ranked.filter(Website.category_id.in_([1, 2, 3, 4])), user).subquery()
+        return db.session.query(Website, ranked.c.rank).join(ranked, Website.id == ranked.c.id)\
+                         .filter(ranked.c.rank <= 20)
+
+    def featured(user):
+        # nav_snapshot：热门推荐
+        return apply_visibility(Website.query.filter_by(is_featured=True), user)\
+            .order_by(Website.views.desc()).limit(6)
+
+    def keyword_search(user):
+        # api_search / _progressive_search / /search
+        return apply_keyword_search(apply_visibility(Website.query, user), 'example').limit(200)
+
+    def category_search(user):
+        # api_search.search_in_category
+        query = apply_keyword_search(Website.query.filter(Website.category_id == 3), 'example', rank=False)
+        return apply_visibility(query, user).order_by(*order)
+
+    def update_order(user):
+        # api_website.update_website_order
+        return apply_visibility(Website.query.filter_by(category_id=3), user)
+
+    def check_url(user):
+        # api_website.check_url_exists
+        url = 'https://site42.example.com'
+        return Website.query.filter(Website.url.in_([url, url + '/'])).filter(Website.id != 1)
+
+    return [
+        ('category_listing', category_listing),
+        ('ranked_listing', ranked_listing),
+        ('featured', featured),
+        ('keyword_search', keyword_search),
+        ('category_search', category_search),
+        ('update_order', update_order),
+        ('check_url_exists', check_url),
+    ]
+
+
+def build_synthetic_catalog(db_path: str, website_count: int = 5000, category_count: int = 60,
+                            user_count: int = 20, seed: int = 42) -> None:
+    """
+    生成合成目录数据库（表结构与迁移、索引与线上一致）
+
+    Args:
+        db_path: 数据库文件路径
+        website_count: 网站数量
+        category_count: 分类数量（约三分之一为一级分类）
+        user_count: 用户数量
+        seed: 随机种子
+    """
+    engine = create_engine(f'sqlite:///{db_path}')
+    db.Model.metadata.create_all(engine)
+    engine.dispose()
+
+    rng = random.Random(seed)
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    cursor.executemany(
+        'INSERT INTO user (id, username, email, is_admin) VALUES (?, ?, ?, ?)',
+        [(i, f'user{i}', f'user{i}@example.com', 1 if i == 1 else 0) for i in range(1, user_count + 1)]
+    )
+    top_count = max(1, category_count // 3)
+    categories = []
+    for i in range(1, category_count + 1):
+        parent_id = None if i <= top_count else rng.randint(1, top_count)
+        categories.append((i, f'分类{i}', rng.randint(0, 100), parent_id))
+    cursor.executemany('INSERT INTO category (id, name, "order", parent_id) VALUES (?, ?, ?, ?)', categories)
+
+    start = datetime(2024, 1, 1)
+    websites = []
+    for i in range(1, website_count + 1):
+        is_private = rng.random() < 0.15
+        visible_to = ','.join(str(rng.randint(2, user_count)) for _ in range(rng.randint(1, 3))) \
+            if is_private and rng.random() < 0.5 else ''
+        websites.append((
+            i, f'站点{i} example title', f'https://site{i}.example.com', f'示例描述 {i}',
+            rng.randint(0, 5000), 1 if rng.random() < 0.02 else 0,
+            (start + timedelta(minutes=i)).isoformat(sep=' '), rng.randint(0, 100),
+            rng.randint(1, category_count), rng.randint(1, user_count), 1 if is_private else 0, visible_to,
+        ))
+    cursor.executemany(
+        'INSERT INTO website (id, title, url, description, views, is_featured, created_at, sort_order, '
+        'category_id, created_by_id, is_private, visible_to) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+        websites
+    )
+    conn.commit()
+    conn.close()
+
+    run_schema_migrations(db_path)
+
+    conn = sqlite3.connect(db_path)
+    conn.execute('ANALYZE')
+    conn.commit()
+    conn.close()
+
+
+def explain(connection, query) -> List[str]:
+    """对 SQLAlchemy 查询执行 EXPLAIN QUERY PLAN，返回每个计划步骤的描述"""
+    compiled = query.statement.compile(dialect=db.engine.dialect, compile_kwargs={'render_postcompile': True})
+    params = compiled.params
+    positional = tuple(params[name] for name in (compiled.positiontup or []))
+    rows = connection.execute('EXPLAIN QUERY PLAN ' + compiled.string, positional).fetchall()
+    return [row[3] for row in rows]
+
+
+def find_violations(plan: List[str]) -> List[str]:
+    """计划中对受检查表的全表扫描"""
+    violations = []
+    for detail in plan:
+        match = _FULL_SCAN.match(detail.strip())
+        if match and match.group(1) in CHECKED_TABLES:
+            violations.append(detail)
+    return violations
+
+
+def run_plan_checks(website_count: int = 5000, db_path: Optional[str] = None) -> List[PlanResult]:
+    """
+    生成合成目录并检查所有热点查询的执行计划
+
+    Args:
+        website_count: 合成网站数量
+        db_path: 合成数据库路径（默认使用临时文件，检查完删除）
+
+    Returns:
+        每条查询、每种身份的检查结果
+    """
+    owns_file = db_path is None
+    if owns_file:
+        handle, db_path = tempfile.mkstemp(suffix='.db', prefix='plan_check_')
+        os.close(handle)
+        os.remove(db_path)
+
+    try:
+        build_synthetic_catalog(db_path, website_count=website_count)
+        connection = sqlite3.connect(db_path)
+        results = []
+        users = _plan_users()
+        for name, build in _canonical_queries():
+            for role, user in users.items():
+                plan = explain(connection, build(user))
+                results.append(PlanResult(name, role, plan, find_violations(plan)))
+        connection.close()
+        return results
+    finally:
+        if owns_file and os.path.exists(db_path):
+            os.remove(db_path)
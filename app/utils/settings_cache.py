@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""站点设置缓存 - 进程内只读快照，按 settings 数据版本号失效（跨 gunicorn worker 一致），读取时从不写库"""
+
+import inspect
+from threading import Lock
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import inspect as sa_inspect
+from sqlalchemy.exc import OperationalError
+
+from app import db
+from app.models import SiteSettings
+from app.utils.data_version import SETTINGS, get_data_version
+
+
+class SettingsSnapshot:
+    """
+    站点设置的只读快照
+
+    字段值在创建时从 SiteSettings 行复制；SiteSettings 上的 get_* 等方法以快照为 self 调用，
+    因此模板和服务代码可以像使用 ORM 对象一样使用它，但任何赋值都会抛出 AttributeError。
+    """
+
+    __slots__ = ('_values',)
+
+    def __init__(self, values: Dict[str, Any]):
+        object.__setattr__(self, '_values', dict(values))
+
+    @classmethod
+    def from_model(cls, settings: SiteSettings) -> 'SettingsSnapshot':
+        return cls({attr.key: getattr(settings, attr.key) for attr in sa_inspect(SiteSettings).column_attrs})
+
+    @classmethod
+    def from_defaults(cls) -> 'SettingsSnapshot':
+        """数据库中还没有设置记录时，使用字段默认值"""
+        values = {}
+        for attr in sa_inspect(SiteSettings).column_attrs:
+            column = attr.columns[0]
+            default = column.default
+            values[attr.key] = default.arg if default is not None and default.is_scalar else None
+        return cls(values)
+
+    def __getattr__(self, name: str) -> Any:
+        values = object.__getattribute__(self, '_values')
+        if name in values:
+            return values[name]
+        try:
+            member = inspect.getattr_static(SiteSettings, name)
+        except AttributeError:
+            raise AttributeError(f"'SettingsSnapshot' object has no attribute '{name}'") from None
+        if isinstance(member, (staticmethod, classmethod)):
+            return getattr(SiteSettings, name)
+        if callable(member):
+            return member.__get__(self, type(self))
+        raise AttributeError(f"'SettingsSnapshot' object has no attribute '{name}'")
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError('站点设置快照是只读的，修改设置请使用 SiteSettings.get_settings()')
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError('站点设置快照是只读的')
+
+    def __repr__(self) -> str:
+        return f'<SettingsSnapshot {self.site_name}>'
+
+
+_snapshot: Optional[Tuple[int, SettingsSnapshot]] = None
+_snapshot_lock = Lock()
+_stats = {'hits': 0, 'loads': 0}
+_stats_lock = Lock()
+
+
+def _count(name: str) -> None:
+    with _stats_lock:
+        _stats[name] += 1
+
+
+def _load_snapshot() -> SettingsSnapshot:
+    try:
+        settings = SiteSettings.query.first()
+    except OperationalError:
+        # 旧库缺少字段：走 ORM 路径修复表结构后再读取
+        db.session.rollback()
+        settings = SiteSettings.get_settings()
+    if settings is None:
+        return SettingsSnapshot.from_defaults()
+    return SettingsSnapshot.from_model(settings)
+
+
+def get_site_settings() -> SettingsSnapshot:
+    """
+    获取站点设置的只读快照（settings 版本号不变时直接返回进程内缓存）
+
+    Returns:
+        SettingsSnapshot
+    """
+    global _snapshot
+
+    version = get_data_version(SETTINGS)
+    entry = _snapshot
+    if entry and entry[0] == version:
+        _count('hits')
+        return entry[1]
+
+    with _snapshot_lock:
+        entry = _snapshot
+        if entry and entry[0] == version:
+            return entry[1]
+        snapshot = _load_snapshot()
+        _snapshot = (version, snapshot)
+        _count('loads')
+        return snapshot
+
+
+def clear_settings_cache() -> None:
+    """丢弃缓存的设置快照（数据库文件被替换后调用）"""
+    global _snapshot
+    with _snapshot_lock:
+        _snapshot = None
+
+
+def get_settings_cache_stats() -> Dict[str, Any]:
+    """获取设置缓存统计信息"""
+    entry = _snapshot
+    with _stats_lock:
+        counters = dict(_stats)
+    return {
+        'version': entry[0] if entry else None,
+        **counters,
+    }
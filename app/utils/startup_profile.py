@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""启动耗时分析 - 在独立子进程中用 python -X importtime 统计模块导入耗时和 create_app() 总耗时"""
+
+import json
+import os
+import subprocess
+import sys
+from typing import Dict, List, Optional
+
+# 子进程脚本：分别计时导入 app 包和调用 create_app()，结果以 JSON 输出到 stdout 最后一行
+_PROBE_SCRIPT = """
+import json, time
+started = time.perf_counter()
+from app import create_app
+imported = time.perf_counter()
+create_app()
+finished = time.perf_counter()
+print(json.dumps({'import_ms': (imported - started) * 1000, 'create_app_ms': (finished - imported) * 1000}))
+"""
+
+
+class ImportRecord:
+    """-X importtime 输出中的一行"""
+
+    __slots__ = ('name', 'self_us', 'cumulative_us', 'depth')
+
+    def __init__(self, name: str, self_us: int, cumulative_us: int, depth: int):
+        self.name = name
+        self.self_us = self_us
+        self.cumulative_us = cumulative_us
+        self.depth = depth
+
+    @property
+    def package(self) -> str:
+        return self.name.split('.', 1)[0]
+
+
+class StartupReport:
+    """一次启动分析的结果"""
+
+    def __init__(self, import_ms: float, create_app_ms: float, records: List[ImportRecord]):
+        self.import_ms = import_ms
+        self.create_app_ms = create_app_ms
+        self.records = records
+
+    @property
+    def total_ms(self) -> float:
+        return self.import_ms + self.create_app_ms
+
+    def app_modules(self, limit: int = 20) -> List[ImportRecord]:
+        """项目自身模块，按累计导入耗时（含其导入的依赖）降序"""
+        modules = [r for r in self.records if r.package == 'app']
+        return sorted(modules, key=lambda r: r.cumulative_us, reverse=True)[:limit]
+
+    def packages(self, limit: int = 20) -> List[tuple]:
+        """按顶层包汇总自身导入耗时，返回 [(包名, 毫秒)] 降序"""
+        totals: Dict[str, int] = {}
+        for record in self.records:
+            totals[record.package] = totals.get(record.package, 0) + record.self_us
+        ranked = sorted(totals.items(), key=lambda item: item[1], reverse=True)[:limit]
+        return [(name, us / 1000) for name, us in ranked]
+
+
+def parse_importtime(output: str) -> List[ImportRecord]:
+    """
+    解析 -X importtime 的 stderr 输出
+
+    Args:
+        output: 子进程 stderr
+
+    Returns:
+        导入记录列表（按输出顺序）
+    """
+    records = []
+    for line in output.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        parts = line[len('import time:'):].split('|')
+        if len(parts) != 3:
+            continue
+        try:
+            self_us = int(parts[0].strip())
+            cumulative_us = int(parts[1].strip())
+        except ValueError:
+            # 表头行
+            continue
+        raw_name = parts[2].rstrip()
+        name = raw_name.lstrip()
+        depth = (len(raw_name) - len(name) - 1) // 2
+        records.append(ImportRecord(name, self_us, cumulative_us, depth))
+    return records
+
+
+def profile_startup(project_root: Optional[str] = None, env: Optional[Dict[str, str]] = None) -> StartupReport:
+    """
+    在全新的解释器中导入 app 并调用 create_app()，统计启动耗时
+
+    Args:
+        project_root: 项目根目录（默认取 app 包的上级目录）
+        env: 子进程环境变量（默认继承当前进程）
+
+    Returns:
+        StartupReport
+    """
+    if project_root is None:
+        project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', _PROBE_SCRIPT],
+        cwd=project_root,
+        env=env if env is not None else os.environ.copy(),
+        capture_output=True,
+        text=True,
+    )
+    if completed.returncode != 0:
+        tail = '\n'.join(line for line in completed.stderr.splitlines() if not line.startswith('import time:'))
+        raise RuntimeError(f'启动分析子进程失败: {tail[-2000:]}')
+
+    timings = json.loads(completed.stdout.strip().splitlines()[-1])
+    return StartupReport(timings['import_ms'], timings['create_app_ms'], parse_importtime(completed.stderr))
@@ -0,0 +1,381 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""搜索联想索引 - 进程内前缀索引（标题、域名、分类名），启动时构建，写入后增量更新，其他进程写入后按目录版本号重建"""
+
+import re
+import time
+from bisect import bisect_left, insort
+from threading import RLock
+from typing import Any, Dict, List, Optional, Set, Tuple
+from urllib.parse import urlparse
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.utils.visibility import parse_visible_to
+
+
+KIND_CATEGORY = 0
+KIND_WEBSITE = 1
+
+# 单次联想最多扫描的前缀键数量，保证极短前缀也能在亚毫秒内返回
+MAX_SCAN = 2000
+MAX_KEYS_PER_ENTRY = 8
+
+# 与数据库中目录版本号核对的最小间隔（秒）：其他 worker 的写入最迟在此时间后可见，
+# 其余联想请求只读内存，不查询数据库
+VERSION_CHECK_INTERVAL = 5.0
+
+_WORD_SEPARATORS = re.compile(r'[\s\-_|·:：,，/()（）\[\]【】《》.]+')
+
+_SESSION_INFO_KEY = 'suggest_changes'
+
+
+def normalize(text: Optional[str]) -> str:
+    """联想匹配统一使用小写、去除首尾空白"""
+    return (text or '').strip().lower()
+
+
+def extract_domain(url: Optional[str]) -> str:
+    """提取网址域名（去掉 www. 和端口）"""
+    try:
+        netloc = urlparse(url or '').netloc.lower()
+    except ValueError:
+        return ''
+    netloc = netloc.rsplit('@', 1)[-1].split(':', 1)[0]
+    return netloc[4:] if netloc.startswith('www.') else netloc
+
+
+def _prefix_keys(text: Optional[str]) -> List[str]:
+    """文本本身以及每个单词开头的后缀都可作为前缀匹配的键"""
+    normalized = normalize(text)
+    if not normalized:
+        return []
+    keys = [normalized]
+    for match in _WORD_SEPARATORS.finditer(normalized):
+        rest = normalized[match.end():]
+        if rest:
+            keys.append(rest)
+    return keys
+
+
+def _domain_keys(domain: str) -> List[str]:
+    """域名及其各级父域名（不含顶级域），如 docs.github.com -> github.com"""
+    if not domain:
+        return []
+    labels = domain.split('.')
+    return ['.'.join(labels[i:]) for i in range(max(1, len(labels) - 1))]
+
+
+class SuggestEntry:
+    """索引中的一条记录（网站或分类）"""
+
+    __slots__ = ('kind', 'id', 'text', 'url', 'domain', 'category_id', 'views', 'sort_order',
+                 'is_private', 'created_by_id', 'visible_to', 'keys')
+
+    def __init__(self, kind: int, id: int, text: str, url: str = '', domain: str = '',
+                 category_id: Optional[int] = None, views: int = 0, sort_order: int = 0,
+                 is_private: bool = False, created_by_id: Optional[int] = None,
+                 visible_to: Tuple[int, ...] = ()):
+        self.kind = kind
+        self.id = id
+        self.text = text
+        self.url = url
+        self.domain = domain
+        self.category_id = category_id
+        self.views = views or 0
+        self.sort_order = sort_order or 0
+        self.is_private = bool(is_private)
+        self.created_by_id = created_by_id
+        self.visible_to = visible_to
+
+        keys: List[str] = []
+        for key in _prefix_keys(text) + _domain_keys(domain):
+            if key not in keys:
+                keys.append(key)
+        self.keys = keys[:MAX_KEYS_PER_ENTRY]
+
+    def is_visible_to(self, user) -> bool:
+        if self.kind != KIND_WEBSITE or not self.is_private:
+            return True
+        if user is None or not user.is_authenticated:
+            return False
+        return user.is_admin or user.id == self.created_by_id or user.id in self.visible_to
+
+
+def website_entry(values: Dict[str, Any]) -> SuggestEntry:
+    """由网站字段构建索引记录"""
+    return SuggestEntry(
+        KIND_WEBSITE, values['id'], values.get('title') or '',
+        url=values.get('url') or '',
+        domain=extract_domain(values.get('url')),
+        category_id=values.get('category_id'),
+        views=values.get('views') or 0,
+        sort_order=values.get('sort_order') or 0,
+        is_private=values.get('is_private'),
+        created_by_id=values.get('created_by_id'),
+        visible_to=tuple(parse_visible_to(values.get('visible_to'))),
+    )
+
+
+def category_entry(values: Dict[str, Any]) -> SuggestEntry:
+    """由分类字段构建索引记录"""
+    return SuggestEntry(
+        KIND_CATEGORY, values['id'], values.get('name') or '',
+        sort_order=values.get('order') or 0,
+    )
+
+
+class SuggestIndex:
+    """有序前缀键数组 + 二分查找（线程安全）"""
+
+    def __init__(self):
+        self._lock = RLock()
+        self._keys: List[Tuple[str, int, int]] = []
+        self._entries: Dict[Tuple[int, int], SuggestEntry] = {}
+        self._dirty = True
+        # 索引内容对应的目录版本号，以及上次与数据库核对的时间
+        self._version: Optional[int] = None
+        self._checked_at = 0.0
+
+    @property
+    def dirty(self) -> bool:
+        return self._dirty
+
+    @property
+    def version(self) -> Optional[int]:
+        return self._version
+
+    def advance_version(self, old_version: int, new_version: int) -> None:
+        """本进程提交的写入已增量应用：索引原本对应 old_version 时直接前进到 new_version"""
+        with self._lock:
+            if self._version == old_version:
+                self._version = new_version
+
+    def needs_version_check(self) -> bool:
+        """距上次核对已超过 VERSION_CHECK_INTERVAL 时返回 True 并记下本次核对时间"""
+        now = time.monotonic()
+        with self._lock:
+            if now - self._checked_at < VERSION_CHECK_INTERVAL:
+                return False
+            self._checked_at = now
+            return True
+
+    def mark_dirty(self) -> None:
+        """标记索引需要重建（批量写入、恢复备份等无法增量跟踪的变更）"""
+        self._dirty = True
+
+    def load(self, entries: List[SuggestEntry], version: Optional[int] = None) -> None:
+        """
+        整体替换索引内容
+
+        Args:
+            entries: 索引记录
+            version: 读取这些记录之前的目录版本号
+        """
+        keys = []
+        table = {}
+        for entry in entries:
+            table[(entry.kind, entry.id)] = entry
+            keys.extend((key, entry.kind, entry.id) for key in entry.keys)
+        keys.sort()
+        with self._lock:
+            self._keys = keys
+            self._entries = table
+            self._dirty = False
+            self._version = version
+            self._checked_at = time.monotonic()
+
+    def upsert(self, entry: SuggestEntry) -> None:
+        with self._lock:
+            self._remove_locked(entry.kind, entry.id)
+            self._entries[(entry.kind, entry.id)] = entry
+            for key in entry.keys:
+                insort(self._keys, (key, entry.kind, entry.id))
+
+    def remove(self, kind: int, id: int) -> None:
+        with self._lock:
+            self._remove_locked(kind, id)
+
+    def _remove_locked(self, kind: int, id: int) -> None:
+        entry = self._entries.pop((kind, id), None)
+        if entry is None:
+            return
+        for key in entry.keys:
+            item = (key, kind, id)
+            position = bisect_left(self._keys, item)
+            if position < len(self._keys) and self._keys[position] == item:
+                del self._keys[position]
+
+    def get(self, kind: int, id: int) -> Optional[SuggestEntry]:
+        return self._entries.get((kind, id))
+
+    def suggest(self, prefix: str, user=None, limit: int = 8) -> List[SuggestEntry]:
+        """
+        按前缀查找联想结果
+
+        Args:
+            prefix: 用户输入
+            user: 当前用户（用于过滤私有网站）
+            limit: 返回数量
+
+        Returns:
+            分类在前（按排序值），网站在后（按访问量、排序值）
+        """
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+
+        categories: List[SuggestEntry] = []
+        websites: List[SuggestEntry] = []
+        seen: Set[Tuple[int, int]] = set()
+        with self._lock:
+            keys = self._keys
+            position = bisect_left(keys, (prefix,))
+            end = min(len(keys), position + MAX_SCAN)
+            while position < end:
+                key, kind, id = keys[position]
+                if not key.startswith(prefix):
+                    break
+                position += 1
+                if (kind, id) in seen:
+                    continue
+                seen.add((kind, id))
+                entry = self._entries.get((kind, id))
+                if entry is None or not entry.is_visible_to(user):
+                    continue
+                (categories if kind == KIND_CATEGORY else websites).append(entry)
+
+        categories.sort(key=lambda e: (-e.sort_order, e.id))
+        websites.sort(key=lambda e: (-e.views, -e.sort_order, e.id))
+        # 分类最多占四分之一，网站不足时再用分类补齐
+        quota = max(1, limit // 4)
+        results = categories[:quota] + websites[:limit - min(quota, len(categories))]
+        return (results + categories[quota:])[:limit]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'keys': len(self._keys),
+                'dirty': self._dirty,
+                'version': self._version,
+            }
+
+
+_index = SuggestIndex()
+
+
+def get_suggest_index() -> SuggestIndex:
+    return _index
+
+
+def build_suggest_index() -> SuggestIndex:
+    """从数据库全量构建联想索引（需在应用上下文中调用）"""
+    from app import db
+    from app.models import Category, Website
+    from app.utils.data_version import CATALOG, get_data_version
+
+    # 先读版本号再读数据：构建期间若有写入，记下的是旧版本号，下次查询时会再次重建
+    version = get_data_version(CATALOG)
+    entries = [
+        category_entry({'id': row.id, 'name': row.name, 'order': row.order})
+        for row in db.session.query(Category.id, Category.name, Category.order).all()
+    ]
+    columns = (Website.id, Website.title, Website.url, Website.category_id, Website.views,
+               Website.sort_order, Website.is_private, Website.created_by_id, Website.visible_to)
+    entries.extend(website_entry(row._asdict()) for row in db.session.query(*columns).all())
+    _index.load(entries, version)
+    return _index
+
+
+def suggest(prefix: str, user=None, limit: int = 8) -> List[SuggestEntry]:
+    """
+    联想查询（需在应用上下文中调用）
+
+    本进程的写入在提交后增量更新，索引版本号随之前进；每隔 VERSION_CHECK_INTERVAL 秒
+    与数据库中的目录版本号核对一次，不一致（其他 worker 修改了网站或分类）时重建，
+    避免继续返回已删除或已改为私有的网站。其余请求只读内存。
+    """
+    if _index.dirty:
+        build_suggest_index()
+    elif _index.needs_version_check():
+        from app.utils.data_version import CATALOG, get_data_version
+        if _index.version != get_data_version(CATALOG):
+            build_suggest_index()
+    return _index.suggest(prefix, user, limit)
+
+
+def _snapshot_website(obj) -> Dict[str, Any]:
+    return {
+        'id': obj.id, 'title': obj.title, 'url': obj.url, 'category_id': obj.category_id,
+        'views': obj.views, 'sort_order': obj.sort_order, 'is_private': obj.is_private,
+        'created_by_id': obj.created_by_id, 'visible_to': obj.visible_to,
+    }
+
+
+def _snapshot_category(obj) -> Dict[str, Any]:
+    return {'id': obj.id, 'name': obj.name, 'order': obj.order}
+
+
+def _after_flush(session, flush_context):
+    from app.models import Category, Website
+
+    changes = session.info.setdefault(_SESSION_INFO_KEY, [])
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, Website):
+            changes.append(('upsert', KIND_WEBSITE, _snapshot_website(obj)))
+        elif isinstance(obj, Category):
+            changes.append(('upsert', KIND_CATEGORY, _snapshot_category(obj)))
+    for obj in session.deleted:
+        if isinstance(obj, Website):
+            changes.append(('delete', KIND_WEBSITE, {'id': obj.id}))
+        elif isinstance(obj, Category):
+            changes.append(('delete', KIND_CATEGORY, {'id': obj.id}))
+
+
+def _after_bulk_operation(context):
+    from app.models import Category, Website
+
+    mapper = getattr(context, 'mapper', None)
+    if mapper is not None and mapper.class_ in (Website, Category):
+        context.session.info.setdefault(_SESSION_INFO_KEY, []).append(('rebuild', None, None))
+
+
+def _after_commit(session):
+    from app.utils.data_version import CATALOG, get_bumped_versions
+
+    changes = session.info.pop(_SESSION_INFO_KEY, None) or []
+    try:
+        for action, kind, values in changes:
+            if action == 'rebuild':
+                _index.mark_dirty()
+            elif action == 'delete':
+                _index.remove(kind, values['id'])
+            elif kind == KIND_WEBSITE:
+                _index.upsert(website_entry(values))
+            else:
+                _index.upsert(category_entry(values))
+    except Exception as e:
+        _index.mark_dirty()
+        print(f"搜索联想索引更新失败: {str(e)}")
+        return
+    # 本事务的目录写入（包括不影响联想的标签、图标等）已反映在索引中，版本号随之前进，避免下次核对时重建
+    bumped = get_bumped_versions(session).get(CATALOG)
+    if bumped:
+        _index.advance_version(*bumped)
+
+
+def _after_rollback(session):
+    session.info.pop(_SESSION_INFO_KEY, None)
+
+
+def register_suggest_hooks() -> None:
+    """注册 SQLAlchemy 会话钩子，提交后增量更新联想索引（幂等）"""
+    if event.contains(Session, 'after_flush', _after_flush):
+        return
+    event.listen(Session, 'after_flush', _after_flush)
+    event.listen(Session, 'after_bulk_update', _after_bulk_operation)
+    event.listen(Session, 'after_bulk_delete', _after_bulk_operation)
+    event.listen(Session, 'after_commit', _after_commit)
+    event.listen(Session, 'after_rollback', _after_rollback)
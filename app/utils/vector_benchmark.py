@@ -0,0 +1,226 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Qdrant 集合参数基准测试 - 在合成向量上比较各配置的 recall@k 和检索延迟"""
+
+import time
+import uuid
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from app.utils.vector_service import (
+    QDRANT_COLLECTION_DEFAULTS, qdrant_collection_config, qdrant_collection_params, qdrant_search_params
+)
+
+
+# 内置的对比配置（未列出的参数使用默认值）
+BENCHMARK_PRESETS: Dict[str, Dict] = {
+    'default': {},
+    'ef128': {'hnsw_ef': 128},
+    'm32': {'hnsw_m': 32, 'hnsw_ef_construct': 200},
+    'int8': {'quantization': 'int8'},
+    'int8-norescore': {'quantization': 'int8', 'quantization_rescore': False},
+    'int8-disk': {'quantization': 'int8', 'vectors_on_disk': True, 'payload_on_disk': True},
+}
+
+
+class BenchmarkResult:
+    """单个配置的测试结果"""
+
+    def __init__(self, name: str, config: Dict, build_seconds: float, recall: float,
+                 latencies_ms: List[float], estimated_ram_mb: float):
+        self.name = name
+        self.config = config
+        self.build_seconds = build_seconds
+        self.recall = recall
+        self.latencies_ms = latencies_ms
+        self.estimated_ram_mb = estimated_ram_mb
+
+    @property
+    def p50_ms(self) -> float:
+        return float(np.percentile(self.latencies_ms, 50)) if self.latencies_ms else 0.0
+
+    @property
+    def p95_ms(self) -> float:
+        return float(np.percentile(self.latencies_ms, 95)) if self.latencies_ms else 0.0
+
+
+def resolve_configs(names: List[str], settings=None) -> Dict[str, Dict]:
+    """
+    把配置名转换为完整的集合参数（current 表示站点设置中的当前参数）
+
+    Args:
+        names: 配置名列表，为空时使用全部内置配置
+        settings: 站点设置
+
+    Returns:
+        配置名 -> 集合参数
+
+    Raises:
+        ValueError: 未知的配置名
+    """
+    configs = {}
+    for name in names or list(BENCHMARK_PRESETS):
+        if name == 'current':
+            configs[name] = qdrant_collection_config(settings)
+        elif name in BENCHMARK_PRESETS:
+            configs[name] = dict(QDRANT_COLLECTION_DEFAULTS, **BENCHMARK_PRESETS[name])
+        else:
+            raise ValueError(f"未知的配置: {name}（可选: current, {', '.join(BENCHMARK_PRESETS)}）")
+    return configs
+
+
+def synthetic_vectors(count: int, dimension: int, queries: int, seed: int = 42):
+    """
+    生成带聚类结构的单位向量和查询向量（查询取自数据点附近，接近真实搜索的分布）
+
+    Returns:
+        (数据向量, 查询向量)，均为 float32 且已归一化
+    """
+    rng = np.random.default_rng(seed)
+    clusters = max(1, count // 200)
+    centers = rng.standard_normal((clusters, dimension)).astype(np.float32)
+    data = centers[rng.integers(0, clusters, count)] + 0.6 * rng.standard_normal((count, dimension)).astype(np.float32)
+    data /= np.linalg.norm(data, axis=1, keepdims=True)
+    picked = data[rng.integers(0, count, queries)]
+    query_vectors = picked + 0.3 * rng.standard_normal((queries, dimension)).astype(np.float32) / np.sqrt(dimension)
+    query_vectors /= np.linalg.norm(query_vectors, axis=1, keepdims=True)
+    return data, query_vectors.astype(np.float32)
+
+
+def exact_top_k(data: np.ndarray, query_vectors: np.ndarray, k: int) -> List[set]:
+    """精确余弦相似度前 k 个（作为召回率的基准）"""
+    truth = []
+    for start in range(0, len(query_vectors), 64):
+        scores = query_vectors[start:start + 64] @ data.T
+        top = np.argpartition(-scores, min(k, data.shape[0] - 1), axis=1)[:, :k]
+        truth.extend(set(int(i) for i in row) for row in top)
+    return truth
+
+
+def estimate_ram_mb(count: int, dimension: int, config: Dict) -> float:
+    """按参数估算 Qdrant 常驻内存中的向量和 HNSW 图占用（MB，不含元数据）"""
+    size = 0 if config['vectors_on_disk'] else count * dimension * 4
+    if config['quantization'] == 'int8':
+        size += count * dimension
+    # HNSW 第0层每个节点 2m 个 4 字节邻居
+    size += count * config['hnsw_m'] * 2 * 4
+    return size / 1024 / 1024
+
+
+def _open_client(qdrant_url: str):
+    from qdrant_client import QdrantClient
+    if qdrant_url == ':memory:':
+        return QdrantClient(':memory:')
+    return QdrantClient(url=qdrant_url)
+
+
+def _wait_until_indexed(client, collection_name: str, timeout: float) -> None:
+    """等待 Qdrant 完成索引构建（集合状态变为 green）"""
+    from qdrant_client.models import CollectionStatus
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if client.get_collection(collection_name).status == CollectionStatus.GREEN:
+            return
+        time.sleep(0.2)
+
+
+def benchmark_config(client, name: str, config: Dict, data: np.ndarray, query_vectors: np.ndarray,
+                     truth: List[set], k: int, index_timeout: float = 600) -> BenchmarkResult:
+    """
+    用一组集合参数建临时集合、写入数据并逐条检索，测试结束后删除集合
+
+    Args:
+        client: QdrantClient
+        name: 配置名
+        config: 集合参数
+        data: 数据向量
+        query_vectors: 查询向量
+        truth: 每条查询的精确前 k 个ID
+        k: 每次检索返回的数量
+        index_timeout: 等待索引构建的最长时间（秒）
+
+    Returns:
+        BenchmarkResult
+    """
+    from qdrant_client.models import OptimizersConfigDiff, PointStruct
+
+    collection_name = f'bench_{uuid.uuid4().hex[:12]}'
+    params = qdrant_collection_params(data.shape[1], config)
+    # 数据量较小时 Qdrant 默认不建 HNSW 索引，降低阈值保证测到的是索引检索
+    params['optimizers_config'] = OptimizersConfigDiff(indexing_threshold=1)
+    search_params = qdrant_search_params(config)
+
+    client.create_collection(collection_name=collection_name, **params)
+    try:
+        started = time.perf_counter()
+        for start in range(0, len(data), 256):
+            chunk = data[start:start + 256]
+            client.upsert(
+                collection_name=collection_name,
+                points=[PointStruct(id=start + i, vector=vector.tolist()) for i, vector in enumerate(chunk)],
+                wait=True
+            )
+        _wait_until_indexed(client, collection_name, index_timeout)
+        build_seconds = time.perf_counter() - started
+
+        query_lists = [vector.tolist() for vector in query_vectors]
+        for vector in query_lists[:5]:
+            client.search(collection_name=collection_name, query_vector=vector, limit=k, search_params=search_params)
+
+        latencies, hits = [], 0
+        for vector, expected in zip(query_lists, truth):
+            begin = time.perf_counter()
+            result = client.search(collection_name=collection_name, query_vector=vector, limit=k,
+                                   search_params=search_params)
+            latencies.append((time.perf_counter() - begin) * 1000)
+            hits += len(expected & {point.id for point in result})
+    finally:
+        try:
+            client.delete_collection(collection_name)
+        except Exception:
+            pass
+
+    recall = hits / (len(truth) * k) if truth else 0.0
+    return BenchmarkResult(name, config, build_seconds, recall, latencies,
+                           estimate_ram_mb(len(data), data.shape[1], config))
+
+
+def run_vector_benchmark(configs: Dict[str, Dict], qdrant_url: str = ':memory:', count: int = 20000,
+                         dimension: int = 768, queries: int = 200, k: int = 10,
+                         seed: int = 42, progress: Optional[Callable[[str], None]] = None) -> List[BenchmarkResult]:
+    """
+    依次测试各配置
+
+    :memory: 使用 qdrant_client 的进程内本地模式作为 Qdrant 替身，不需要启动服务，
+    但本地模式不建 HNSW 索引也不量化（始终精确检索），只能验证参数能被接受；
+    要比较召回率和延迟的真实差异，需指向一个 Qdrant 服务。
+
+    Args:
+        configs: 配置名 -> 集合参数
+        qdrant_url: Qdrant 服务地址或 :memory:
+        count: 合成向量数量
+        dimension: 向量维度
+        queries: 查询次数
+        k: 每次检索返回的数量（recall@k）
+        seed: 随机种子
+        progress: 进度回调，参数为提示文字
+
+    Returns:
+        BenchmarkResult 列表（与 configs 顺序一致）
+    """
+    data, query_vectors = synthetic_vectors(count, dimension, queries, seed)
+    truth = exact_top_k(data, query_vectors, k)
+    client = _open_client(qdrant_url)
+    results = []
+    try:
+        for name, config in configs.items():
+            if progress:
+                progress(f'测试配置 {name} ...')
+            results.append(benchmark_config(client, name, config, data, query_vectors, truth, k))
+    finally:
+        try:
+            client.close()
+        except Exception:
+            pass
+    return results
@@ -0,0 +1,558 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+批量向量索引器 - 分批生成 embedding、批量写入向量库，多个工作线程重叠网络 I/O
+
+    * 每批网站一次 embedding 请求（已持久化的文本不再请求 API）和一次批量 upsert
+    * 自适应令牌桶限制 API 请求速率：遇到 429/503 时减半并按 Retry-After 暂停，成功后逐步恢复
+    * 定期写入检查点（已连续完成的最大网站ID + 失败的网站ID），中断后再次运行从检查点继续
+    * 每个网站的索引内容哈希记入 WebsiteVector，增量索引只处理新增或内容（含权限字段）有变化的网站
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from flask import current_app
+
+from app import db
+from app.models import Category, Website, WebsiteVector
+from app.utils.embedding_store import get_embedding_store
+from app.utils.visibility import parse_visible_to
+from app.utils.vector_service import EmbeddingRateLimitError, build_index_payload, build_index_text
+
+# (网站ID, embedding 输入文本, 元数据)
+IndexItem = Tuple[int, str, Dict[str, Any]]
+
+
+class TokenBucket:
+    """
+    自适应令牌桶（加性增、乘性减）
+
+    正常情况下按 max_rate 发放令牌；调用 penalize() 后速率减半（不低于 min_rate）并暂停一段时间，
+    之后每次 reward() 按最大速率的 5% 回升。
+    """
+
+    def __init__(self, rate: float, burst: Optional[float] = None, min_rate: float = 0.2):
+        """
+        初始化令牌桶
+
+        Args:
+            rate: 每秒最大请求数
+            burst: 桶容量（允许的突发请求数，默认等于速率）
+            min_rate: 限流时的最低速率
+        """
+        self.max_rate = max(float(rate), min_rate)
+        self.min_rate = min_rate
+        self.rate = self.max_rate
+        self.capacity = max(1.0, float(burst) if burst else self.max_rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+        self.throttled = 0
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, should_stop: Optional[Callable[[], bool]] = None) -> bool:
+        """
+        取一个令牌（必要时等待）
+
+        Args:
+            should_stop: 等待期间检查的停止条件
+
+        Returns:
+            是否取得令牌（停止时返回 False）
+        """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now < self._paused_until:
+                    delay = self._paused_until - now
+                elif self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                else:
+                    delay = (1 - self._tokens) / self.rate
+            if should_stop is not None and should_stop():
+                return False
+            time.sleep(min(delay, 0.5))
+
+    def penalize(self, retry_after: Optional[float] = None) -> None:
+        """遇到限流：速率减半，清空令牌并暂停（优先使用服务端给出的 Retry-After）"""
+        with self._lock:
+            now = time.monotonic()
+            self.rate = max(self.min_rate, self.rate / 2)
+            self._tokens = 0.0
+            self._updated = now
+            self._paused_until = max(self._paused_until, now + (retry_after if retry_after else 1.0 / self.rate))
+            self.throttled += 1
+
+    def reward(self) -> None:
+        """请求成功：速率按最大速率的 5% 回升"""
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.max_rate * 0.05)
+
+
+def iter_index_items(start_after: int = 0, website_ids: Optional[Iterable[int]] = None,
+                     chunk_size: int = 500) -> Iterator[IndexItem]:
+    """
+    按网站ID升序读取待索引的网站（按主键分页，分类名称随同一查询取出）
+
+    Args:
+        start_after: 只读取ID大于该值的网站
+        website_ids: 只读取这些网站（None 表示全部）
+        chunk_size: 每次查询的行数
+
+    Yields:
+        (网站ID, embedding 输入文本, 元数据)
+    """
+    def load(condition, limit: Optional[int] = None) -> list:
+        query = db.session.query(
+            Website.id, Website.title, Website.description, Website.url, Website.category_id, Category.name,
+            Website.is_private, Website.created_by_id, Website.visible_to
+        ).outerjoin(Category, Website.category_id == Category.id).filter(condition).order_by(Website.id)
+        return (query.limit(limit) if limit else query).all()
+
+    def rows_to_items(rows) -> Iterator[IndexItem]:
+        for (website_id, title, description, url, category_id, category_name,
+             is_private, created_by_id, visible_to) in rows:
+            yield (
+                website_id,
+                build_index_text(title, description, category_name),
+                build_index_payload(title, description, category_name, url, category_id=category_id,
+                                    is_private=bool(is_private), created_by_id=created_by_id,
+                                    visible_to=parse_visible_to(visible_to)),
+            )
+
+    if website_ids is not None:
+        wanted = sorted(website_id for website_id in set(website_ids) if website_id > start_after)
+        for start in range(0, len(wanted), chunk_size):
+            yield from rows_to_items(load(Website.id.in_(wanted[start:start + chunk_size])))
+        return
+
+    last_id = start_after
+    while True:
+        rows = load(Website.id > last_id, chunk_size)
+        if not rows:
+            return
+        yield from rows_to_items(rows)
+        last_id = rows[-1][0]
+
+
+def content_hash(text: str, payload: Optional[Dict[str, Any]] = None) -> str:
+    """
+    索引内容的 SHA-256（十六进制）：embedding 输入文本 + 元数据
+
+    元数据（URL、权限字段）变化时同样需要重新写入向量库；文本未变时向量直接从 Embedding 存储读取，不调用 API。
+    """
+    digest = hashlib.sha256((text or '').encode('utf-8'))
+    if payload:
+        digest.update(b'\0')
+        digest.update(json.dumps(payload, sort_keys=True, ensure_ascii=False).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def load_index_state(website_ids: Optional[Iterable[int]] = None,
+                     chunk_size: int = 500) -> Dict[int, Tuple[Optional[str], Optional[str], Optional[str]]]:
+    """
+    读取网站的索引状态
+
+    Args:
+        website_ids: 只读取这些网站（None 表示全部）
+        chunk_size: 每次查询的ID数
+
+    Returns:
+        {网站ID: (内容哈希, embedding 模型, 状态)}
+    """
+    columns = (WebsiteVector.website_id, WebsiteVector.content_hash,
+               WebsiteVector.embedding_model, WebsiteVector.vector_status)
+    if website_ids is None:
+        rows = db.session.query(*columns).all()
+    else:
+        wanted = sorted(set(website_ids))
+        rows = []
+        for start in range(0, len(wanted), chunk_size):
+            rows.extend(db.session.query(*columns).filter(
+                WebsiteVector.website_id.in_(wanted[start:start + chunk_size])
+            ))
+    return {website_id: (digest, model, status) for website_id, digest, model, status in rows}
+
+
+def record_index_state(items: List[IndexItem], status: str, model: str, dimension: Optional[int]) -> None:
+    """
+    记录一批网站的索引结果（内容哈希、模型、维度、状态）
+
+    Args:
+        items: 该批网站
+        status: completed 或 failed
+        model: embedding 模型名称
+        dimension: 向量维度
+    """
+    hashes = {website_id: content_hash(text, payload) for website_id, text, payload in items}
+    try:
+        existing = {
+            row.website_id: row
+            for row in WebsiteVector.query.filter(WebsiteVector.website_id.in_(list(hashes)))
+        }
+        for website_id, digest in hashes.items():
+            row = existing.get(website_id)
+            if row is None:
+                row = WebsiteVector(website_id=website_id)
+                db.session.add(row)
+            row.content_hash = digest
+            row.embedding_model = model
+            row.dimension = dimension
+            row.vector_status = status
+        db.session.commit()
+    except Exception as e:
+        # 网站可能已在索引期间被删除；状态记录失败只会让这些网站在下次增量索引时重新处理
+        db.session.rollback()
+        current_app.logger.warning(f"记录向量索引状态失败: {str(e)}")
+
+
+def plan_incremental_index(vector_service, website_ids: Optional[Iterable[int]] = None) -> Tuple[List[int], int]:
+    """
+    找出需要（重新）索引的网站：没有索引记录、上次失败、内容哈希或模型有变化，或向量存储中已没有对应向量
+
+    Args:
+        vector_service: VectorSearchService
+        website_ids: 只检查这些网站（None 表示全部）
+
+    Returns:
+        (需要索引的网站ID（升序）, 无需处理的网站数)
+    """
+    model = vector_service.embedding_client.model_name
+    state = load_index_state(website_ids)
+    changed: List[int] = []
+    unchanged: List[int] = []
+    for website_id, text, payload in iter_index_items(website_ids=website_ids):
+        if state.get(website_id) == (content_hash(text, payload), model, 'completed'):
+            unchanged.append(website_id)
+        else:
+            changed.append(website_id)
+
+    # 向量存储可能被清空或因维度变化重建，记录为已完成但实际缺失的网站同样需要重新索引
+    if unchanged:
+        present = vector_service.vector_store.existing_ids(unchanged)
+        missing = [website_id for website_id in unchanged if website_id not in present]
+        if missing:
+            changed = sorted(changed + missing)
+        return changed, len(unchanged) - len(missing)
+    return changed, 0
+
+
+def sync_website_vectors(website_ids: Iterable[int], vector_service=None) -> Optional[Dict[str, Any]]:
+    """
+    同步指定网站的向量（只处理内容有变化的网站，用于编辑网站、重命名分类后的后台更新）
+
+    Args:
+        website_ids: 网站ID
+        vector_service: 向量服务（None 表示按当前设置获取）
+
+    Returns:
+        统计信息，向量搜索未配置时返回 None
+    """
+    if vector_service is None:
+        from app.utils.settings_cache import get_site_settings
+        from app.utils.vector_service import get_vector_service
+        vector_service = get_vector_service(get_site_settings())
+        if vector_service is None:
+            return None
+
+    website_ids, unchanged = plan_incremental_index(vector_service, website_ids)
+    if not website_ids:
+        return {'processed': unchanged, 'success': 0, 'failed': 0, 'skipped': unchanged}
+
+    config = current_app.config
+    indexer = BulkVectorIndexer(
+        vector_service,
+        batch_size=config.get('VECTOR_INDEX_BATCH_SIZE') or 32,
+        workers=1,
+        rate=config.get('VECTOR_INDEX_RATE') or 5.0,
+        checkpoint_path=None,
+    )
+    stats = indexer.run(iter_index_items(website_ids=website_ids), resume=False)
+    stats['skipped'] += unchanged
+    stats['processed'] += unchanged
+    return stats
+
+
+class IndexCheckpoint:
+    """索引检查点（JSON 文件，按向量配置签名和运行模式区分，不保存 API 密钥原文）"""
+
+    def __init__(self, path: Optional[str], signature: Tuple, mode: str):
+        self.path = path
+        self.key = hashlib.sha1(repr((signature, mode)).encode('utf-8')).hexdigest()
+
+    def load(self) -> Tuple[int, Set[int]]:
+        """读取检查点，返回 (已连续完成的最大网站ID, 失败的网站ID)；不存在或不匹配时返回 (0, 空集合)"""
+        if not self.path:
+            return 0, set()
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return 0, set()
+        if data.get('key') != self.key:
+            return 0, set()
+        return int(data.get('last_id') or 0), set(data.get('failed_ids') or [])
+
+    def save(self, last_id: int, failed_ids: Set[int]) -> None:
+        if not self.path:
+            return
+        tmp_path = self.path + '.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'key': self.key, 'last_id': last_id, 'failed_ids': sorted(failed_ids),
+                           'updated_at': time.time()}, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            current_app.logger.warning(f"写入索引检查点失败: {str(e)}")
+
+    def clear(self) -> None:
+        if self.path and os.path.exists(self.path):
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+
+
+class BulkVectorIndexer:
+    """流水线式批量索引器"""
+
+    # 检查点的最小写入间隔（秒）
+    CHECKPOINT_INTERVAL = 2.0
+
+    def __init__(self, vector_service, batch_size: int = 32, workers: int = 3, rate: float = 5.0,
+                 checkpoint_path: Optional[str] = None, max_attempts: int = 5):
+        """
+        初始化索引器
+
+        Args:
+            vector_service: VectorSearchService（提供 embedding 客户端和向量存储）
+            batch_size: 每次 embedding 请求包含的网站数
+            workers: 并发工作线程数
+            rate: 每秒最多发出的 embedding 请求数
+            checkpoint_path: 检查点文件路径（None 表示不记录检查点）
+            max_attempts: 每批最多尝试次数（限流重试也计入）
+        """
+        self.service = vector_service
+        self.batch_size = max(1, int(batch_size))
+        self.workers = max(1, int(workers))
+        self.bucket = TokenBucket(rate, burst=self.workers)
+        self.checkpoint_path = checkpoint_path
+        self.max_attempts = max(1, int(max_attempts))
+        self._dimension_lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, vector_service, config) -> 'BulkVectorIndexer':
+        """按应用配置创建（VECTOR_INDEX_BATCH_SIZE / VECTOR_INDEX_WORKERS / VECTOR_INDEX_RATE / VECTOR_INDEX_CHECKPOINT_PATH）"""
+        checkpoint_path = config.get('VECTOR_INDEX_CHECKPOINT_PATH')
+        if checkpoint_path is None:
+            from app.utils.cache import _default_sqlite_cache_path
+            checkpoint_path = _default_sqlite_cache_path(config, 'vector_index_checkpoint.json')
+        return cls(
+            vector_service,
+            batch_size=config.get('VECTOR_INDEX_BATCH_SIZE') or 32,
+            workers=config.get('VECTOR_INDEX_WORKERS') or 3,
+            rate=config.get('VECTOR_INDEX_RATE') or 5.0,
+            checkpoint_path=checkpoint_path or None,
+        )
+
+    # ---- 单批处理（工作线程中执行） ----
+
+    def _embed(self, texts: List[str], should_stop: Callable[[], bool]) -> Optional[List[List[float]]]:
+        """生成一批向量：已持久化的直接读取，其余文本在取得令牌后一次请求 API"""
+        client = self.service.embedding_client
+        store = get_embedding_store()
+        known = store.get_many(client.model_name, texts) if store is not None else {}
+        missing = [text for text in dict.fromkeys(texts) if text not in known]
+
+        attempt = 0
+        while missing:
+            attempt += 1
+            if not self.bucket.acquire(should_stop):
+                return None
+            try:
+                fetched = client.batch_generate_embeddings(missing, max_retries=1)
+            except EmbeddingRateLimitError as e:
+                self.bucket.penalize(e.retry_after)
+                if attempt >= self.max_attempts:
+                    raise
+                current_app.logger.warning(f"Embedding API 限流，降低速率至 {self.bucket.rate:.2f} 次/秒后重试")
+                continue
+            except Exception:
+                if attempt >= min(2, self.max_attempts):
+                    raise
+                time.sleep(1)
+                continue
+            self.bucket.reward()
+            known.update(zip(missing, fetched))
+            missing = []
+        return [known[text] for text in texts]
+
+    def _process_batch(self, app, batch: List[IndexItem], should_stop: Callable[[], bool]) -> Optional[bool]:
+        """处理一批网站，返回是否成功（收到停止信号时返回 None）"""
+        with app.app_context():
+            vectors = self._embed([text for _, text, _ in batch], should_stop)
+            if vectors is None:
+                return None
+            store = self.service.vector_store
+            dimension = len(vectors[0])
+            if dimension != store.vector_dimension:
+                # 首批结果揭示了真实维度，集合只需按新维度重建一次
+                with self._dimension_lock:
+                    if dimension != store.vector_dimension:
+                        current_app.logger.info(f"检测到向量维度变化: {store.vector_dimension} -> {dimension}")
+                        store.update_dimension(dimension)
+            store.store_vectors(
+                [website_id for website_id, _, _ in batch],
+                vectors,
+                [payload for _, _, payload in batch],
+            )
+            return True
+
+    # ---- 主流程 ----
+
+    def run(self, items: Iterable[IndexItem], skip_ids: Optional[Set[int]] = None,
+            should_stop: Optional[Callable[[], bool]] = None,
+            on_progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+            resume: bool = True, mode: str = 'default') -> Dict[str, Any]:
+        """
+        索引一组网站（每批完成后把结果记入 WebsiteVector）
+
+        Args:
+            items: 待索引网站（按网站ID升序，iter_index_items 的输出）
+            skip_ids: 跳过的网站ID
+            should_stop: 停止条件（返回 True 时不再提交新批次，已提交的批次处理完后返回）
+            on_progress: 每完成一批调用一次，参数为统计信息
+            resume: 是否从检查点继续（检查点按向量配置和 mode 区分）
+            mode: 运行模式标识（不同模式的检查点互不影响）
+
+        Returns:
+            统计信息
+        """
+        app = current_app._get_current_object()
+        should_stop = should_stop or (lambda: False)
+        skip_ids = skip_ids or set()
+        checkpoint = IndexCheckpoint(self.checkpoint_path, _service_signature(self.service), mode)
+        start_after, retry_ids = checkpoint.load() if resume else (0, set())
+        if start_after or retry_ids:
+            current_app.logger.info(f"从检查点继续索引：网站ID > {start_after}，另重试 {len(retry_ids)} 个失败网站")
+
+        stats = {
+            'processed': 0, 'success': 0, 'failed': 0, 'skipped': 0, 'resumed_after': start_after,
+            'batches': 0, 'throttled': 0, 'rate': self.bucket.rate, 'started_at': time.time(), 'stopped': False,
+        }
+        throttled_before = self.bucket.throttled
+        failed_ids: Set[int] = set()
+        # 检查点中记录的失败网站，本次尚未重新处理的部分
+        outstanding_retry_ids = set(retry_ids)
+        # 批次序号 -> 该批最大网站ID；已完成批次序号集合，用于推进连续完成的检查点
+        batch_last_ids: Dict[int, int] = {}
+        done_batches: Set[int] = set()
+        next_checkpoint_batch = 0
+        watermark = start_after
+        last_saved = time.monotonic()
+
+        def batches() -> Iterator[List[IndexItem]]:
+            batch: List[IndexItem] = []
+            for item in items:
+                website_id = item[0]
+                if website_id <= start_after and website_id not in retry_ids:
+                    continue
+                if website_id in skip_ids:
+                    stats['skipped'] += 1
+                    stats['processed'] += 1
+                    continue
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    yield batch
+                    batch = []
+            if batch:
+                yield batch
+
+        def finish(future, index: int, batch: List[IndexItem]) -> None:
+            nonlocal next_checkpoint_batch, watermark, last_saved
+            try:
+                ok = future.result()
+            except Exception as e:
+                current_app.logger.error(f"批量索引失败（{len(batch)} 个网站，ID {batch[0][0]}-{batch[-1][0]}）: {str(e)}")
+                ok = False
+            if ok is None:
+                # 停止前未处理的批次不计入完成，检查点停在它之前
+                stats['stopped'] = True
+                return
+            ids = [website_id for website_id, _, _ in batch]
+            outstanding_retry_ids.difference_update(ids)
+            if ok:
+                stats['success'] += len(batch)
+                failed_ids.difference_update(ids)
+            else:
+                stats['failed'] += len(batch)
+                failed_ids.update(ids)
+            stats['processed'] += len(batch)
+            stats['batches'] += 1
+            record_index_state(batch, 'completed' if ok else 'failed',
+                               self.service.embedding_client.model_name, self.service.vector_store.vector_dimension)
+
+            done_batches.add(index)
+            while next_checkpoint_batch in done_batches:
+                done_batches.discard(next_checkpoint_batch)
+                watermark = max(watermark, batch_last_ids.pop(next_checkpoint_batch))
+                next_checkpoint_batch += 1
+            if time.monotonic() - last_saved >= self.CHECKPOINT_INTERVAL:
+                checkpoint.save(watermark, failed_ids | outstanding_retry_ids)
+                last_saved = time.monotonic()
+
+            stats['throttled'] = self.bucket.throttled - throttled_before
+            stats['rate'] = round(self.bucket.rate, 3)
+            if on_progress is not None:
+                on_progress(dict(stats))
+
+        max_in_flight = self.workers * 2
+        pending: Dict[Any, Tuple[int, List[IndexItem]]] = {}
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='vector-indexer') as executor:
+            for index, batch in enumerate(batches()):
+                if should_stop():
+                    stats['stopped'] = True
+                    break
+                batch_last_ids[index] = batch[-1][0]
+                future = executor.submit(self._process_batch, app, batch, should_stop)
+                pending[future] = (index, batch)
+                if len(pending) >= max_in_flight:
+                    completed, _ = wait(list(pending), return_when=FIRST_COMPLETED)
+                    for future in completed:
+                        finish(future, *pending.pop(future))
+            completed, _ = wait(list(pending))
+            for future in completed:
+                finish(future, *pending.pop(future))
+
+        if stats['stopped'] or should_stop():
+            stats['stopped'] = True
+            checkpoint.save(watermark, failed_ids | outstanding_retry_ids)
+        elif failed_ids:
+            # 全部批次已尝试，下次运行只需重试失败的网站
+            checkpoint.save(watermark, failed_ids)
+        else:
+            checkpoint.clear()
+
+        stats['throttled'] = self.bucket.throttled - throttled_before
+        stats['rate'] = round(self.bucket.rate, 3)
+        stats['elapsed'] = round(time.time() - stats['started_at'], 2)
+        return stats
+
+
+def _service_signature(vector_service) -> Tuple:
+    """向量服务的标识（模型和存储位置），用于区分检查点"""
+    client, store = vector_service.embedding_client, vector_service.vector_store
+    location = getattr(store, 'path', None) or getattr(store, 'qdrant_url', None)
+    return (client.api_base_url, client.model_name, type(store).__name__, location)
@@ -0,0 +1,244 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+后台向量索引队列 - 每个进程一个工作线程，按网站ID去重合并保存操作
+
+    * 同一网站在处理前被多次保存只索引一次
+    * 连续保存（批量编辑、导入）时等待队列安静 VECTOR_QUEUE_DEBOUNCE 秒后再处理，
+      但最早入队的网站等待不超过 VECTOR_QUEUE_MAX_DELAY 秒
+    * 每轮取出的网站交给 sync_website_vectors 分批生成 embedding（只处理内容哈希有变化的网站）
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+from flask import current_app
+
+
+class VectorIndexQueue:
+    """按网站ID去重的后台索引队列"""
+
+    def __init__(self, debounce: float = 2.0, max_delay: float = 30.0, max_items: int = 500):
+        """
+        初始化队列
+
+        Args:
+            debounce: 最后一次入队后等待的安静时间（秒）
+            max_delay: 最早入队的网站最长等待时间（秒）
+            max_items: 每轮最多处理的网站数（达到该数量时不再等待）
+        """
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.max_items = max(1, int(max_items))
+        self._app = None
+        self._reset()
+
+    def _reset(self) -> None:
+        """初始化队列状态（fork 出的子进程不继承父进程的工作线程，重新初始化）"""
+        self._pid = os.getpid()
+        self._cond = threading.Condition()
+        # 网站ID -> 入队时间（time.monotonic），保持入队顺序
+        self._pending: 'OrderedDict[int, float]' = OrderedDict()
+        self._last_enqueued = 0.0
+        self._worker: Optional[threading.Thread] = None
+        self._in_flight = 0
+        self._enqueued = 0
+        self._coalesced = 0
+        self._processed = 0
+        self._indexed = 0
+        self._failed = 0
+        self._errors = 0
+        self._batches = 0
+        self._last_lag = 0.0
+        self._max_lag = 0.0
+        self._last_run_at: Optional[float] = None
+
+    def configure(self, debounce: Optional[float] = None, max_delay: Optional[float] = None,
+                  max_items: Optional[int] = None) -> None:
+        """调整去抖参数（对已入队的网站立即生效）"""
+        with self._cond:
+            if debounce is not None:
+                self.debounce = max(0.0, float(debounce))
+            if max_delay is not None:
+                self.max_delay = max(self.debounce, float(max_delay))
+            if max_items is not None:
+                self.max_items = max(1, int(max_items))
+            self._cond.notify()
+
+    def enqueue(self, website_ids: Iterable[int], app=None) -> int:
+        """
+        加入待索引网站（已在队列中的网站只保留最早的入队时间）
+
+        Args:
+            website_ids: 网站ID
+            app: Flask 应用（默认取当前应用）
+
+        Returns:
+            新加入队列的网站数
+        """
+        if os.getpid() != self._pid:
+            self._reset()
+        self._app = app or current_app._get_current_object()
+
+        now = time.monotonic()
+        added = 0
+        with self._cond:
+            for website_id in website_ids:
+                self._enqueued += 1
+                if website_id in self._pending:
+                    self._coalesced += 1
+                    continue
+                self._pending[website_id] = now
+                added += 1
+            self._last_enqueued = now
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name='vector-index-queue', daemon=True)
+                self._worker.start()
+            self._cond.notify()
+        return added
+
+    def _wait_for_batch(self) -> List[Tuple[int, float]]:
+        """等到队列安静或最早的网站等待超时，取出一轮待处理的 (网站ID, 入队时间)（调用方持有锁）"""
+        while True:
+            if not self._pending:
+                self._cond.wait()
+                continue
+            now = time.monotonic()
+            oldest = next(iter(self._pending.values()))
+            ready_at = min(self._last_enqueued + self.debounce, oldest + self.max_delay)
+            if len(self._pending) >= self.max_items or now >= ready_at:
+                break
+            self._cond.wait(ready_at - now)
+
+        batch = []
+        while self._pending and len(batch) < self.max_items:
+            batch.append(self._pending.popitem(last=False))
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                batch = self._wait_for_batch()
+                self._in_flight = len(batch)
+            website_ids = [website_id for website_id, _ in batch]
+            stats = None
+            try:
+                stats = self._process(website_ids)
+            except Exception as e:
+                with self._cond:
+                    self._errors += 1
+                # 未完成的网站在 WebsiteVector 中不是 completed 状态，下次增量索引时会重新处理
+                try:
+                    with self._app.app_context():
+                        self._app.logger.error(f"后台向量索引失败（{len(website_ids)} 个网站）: {str(e)}")
+                except Exception:
+                    print(f"后台向量索引失败（{len(website_ids)} 个网站）: {str(e)}")
+
+            finished = time.monotonic()
+            lag = finished - min(enqueued_at for _, enqueued_at in batch)
+            with self._cond:
+                self._in_flight = 0
+                self._batches += 1
+                self._processed += len(batch)
+                if stats:
+                    self._indexed += stats['success']
+                    self._failed += stats['failed']
+                self._last_lag = lag
+                self._max_lag = max(self._max_lag, lag)
+                self._last_run_at = time.time()
+
+    def _process(self, website_ids: List[int]) -> Optional[Dict[str, Any]]:
+        with self._app.app_context():
+            from app.utils.settings_cache import get_site_settings
+            from app.utils.vector_indexer import sync_website_vectors
+            from app.utils.vector_service import get_vector_service, is_vector_search_configured
+
+            settings = get_site_settings()
+            if not (settings and settings.vector_search_enabled and is_vector_search_configured(settings)):
+                return None
+            vector_service = get_vector_service(settings)
+            if vector_service is None:
+                return None
+            stats = sync_website_vectors(website_ids, vector_service)
+            if stats and stats['success']:
+                current_app.logger.info(
+                    f"后台向量索引完成：成功 {stats['success']}，失败 {stats['failed']}，未变化 {stats['skipped']}"
+                )
+            return stats
+
+    def stats(self) -> Dict[str, Any]:
+        """队列统计（深度、最早网站的等待时间、最近一轮从入队到完成的延迟）"""
+        with self._cond:
+            now = time.monotonic()
+            oldest = next(iter(self._pending.values()), None)
+            return {
+                'depth': len(self._pending),
+                'in_flight': self._in_flight,
+                'oldest_wait': round(now - oldest, 3) if oldest is not None else 0.0,
+                'last_lag': round(self._last_lag, 3),
+                'max_lag': round(self._max_lag, 3),
+                'enqueued': self._enqueued,
+                'coalesced': self._coalesced,
+                'processed': self._processed,
+                'indexed': self._indexed,
+                'failed': self._failed,
+                'errors': self._errors,
+                'batches': self._batches,
+                'last_run_at': self._last_run_at,
+                'worker_alive': bool(self._worker and self._worker.is_alive()),
+                'debounce': self.debounce,
+                'max_delay': self.max_delay,
+            }
+
+
+# 全局队列实例（参数可由 configure_vector_queue 按应用配置调整）
+_queue = VectorIndexQueue()
+
+
+def configure_vector_queue(config) -> None:
+    """
+    按应用配置调整后台索引队列
+
+    Args:
+        config: Flask 配置（VECTOR_QUEUE_DEBOUNCE / VECTOR_QUEUE_MAX_DELAY / VECTOR_QUEUE_MAX_ITEMS）
+    """
+    _queue.configure(
+        debounce=config.get('VECTOR_QUEUE_DEBOUNCE'),
+        max_delay=config.get('VECTOR_QUEUE_MAX_DELAY'),
+        max_items=config.get('VECTOR_QUEUE_MAX_ITEMS'),
+    )
+
+
+def enqueue_vector_indexing(website_ids: Union[int, Iterable[int]]) -> int:
+    """
+    把网站加入后台向量索引队列（向量搜索未启用时忽略，不阻塞调用方）
+
+    Args:
+        website_ids: 网站ID或ID列表
+
+    Returns:
+        新加入队列的网站数
+    """
+    try:
+        app = current_app._get_current_object()
+    except RuntimeError:
+        return 0
+
+    from app.utils.settings_cache import get_site_settings
+    from app.utils.vector_service import is_vector_search_configured
+
+    website_ids = [website_ids] if isinstance(website_ids, int) else list(website_ids)
+    if not website_ids:
+        return 0
+    settings = get_site_settings()
+    if not (settings and settings.vector_search_enabled and is_vector_search_configured(settings)):
+        return 0
+    return _queue.enqueue(website_ids, app=app)
+
+
+def get_vector_queue_stats() -> Dict[str, Any]:
+    """获取后台索引队列统计"""
+    return _queue.stats()
@@ -3,12 +3,33 @@
 """向量搜索服务工具类"""
 
 import json
+import os
+import threading
 import requests
+from functools import lru_cache
 from typing import List, Dict, Optional, Tuple
 from flask import current_app
-from qdrant_client import QdrantClient
-from qdrant_client.models import Distance, VectorParams, PointStruct, Filter, FieldCondition, MatchValue
-from qdrant_client.http import models
+
+from app.utils.embedding_store import get_embedding_store
+from app.utils.http_client import http_post
+
+
+class EmbeddingRateLimitError(Exception):
+    """Embedding API 限流或暂时不可用（429/503），调用方应降低请求速率后重试"""
+
+    def __init__(self, message: str, status_code: int, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+def _parse_retry_after(response) -> Optional[float]:
+    """读取 Retry-After 响应头（只支持秒数形式）"""
+    try:
+        value = response.headers.get('Retry-After')
+        return max(0.0, float(value)) if value else None
+    except (TypeError, ValueError):
+        return None
 
 
 class EmbeddingClient:
@@ -72,6 +93,19 @@ class EmbeddingClient:
                     return cached_vector
             except Exception as e:
                 current_app.logger.warning(f"缓存检查失败: {str(e)}")
+            
+            # 内存缓存未命中时查持久化存储（重启或重建索引后仍然有效）
+            store = get_embedding_store()
+            if store is not None:
+                stored_vector = store.get(self.model_name, text)
+                if stored_vector:
+                    self._update_dimension(stored_vector)
+                    try:
+                        from app.utils.cache import cache_vector
+                        cache_vector(text, self.model_name, stored_vector)
+                    except Exception as e:
+                        current_app.logger.warning(f"向量缓存失败: {str(e)}")
+                    return stored_vector
         
         url = f"{self.api_base_url}/v1/embeddings"
         headers = {
@@ -86,7 +120,7 @@ class EmbeddingClient:
         last_error = None
         for attempt in range(max_retries):
             try:
-                response = requests.post(url, json=data, headers=headers, timeout=30)
+                response = http_post(url, json=data, headers=headers, timeout=30)
                 
                 # 处理 503 等服务器错误
                 if response.status_code == 503:
@@ -105,10 +139,7 @@ class EmbeddingClient:
                 result = response.json()
                 embedding = result['data'][0]['embedding']
                 # 自动检测并更新维度
-                actual_dimension = len(embedding)
-                if self.dimension != actual_dimension:
-                    current_app.logger.info(f"检测到向量维度: {actual_dimension} (模型: {self.model_name})")
-                    self.dimension = actual_dimension
+                self._update_dimension(embedding)
                 
                 # 缓存向量
                 if use_cache:
@@ -117,6 +148,9 @@ class EmbeddingClient:
                         cache_vector(text, self.model_name, embedding)
                     except Exception as e:
                         current_app.logger.warning(f"向量缓存失败: {str(e)}")
+                    store = get_embedding_store()
+                    if store is not None:
+                        store.put(self.model_name, text, embedding)
                 
                 return embedding
                 
@@ -151,20 +185,46 @@ class EmbeddingClient:
         # 所有重试都失败
         raise Exception(last_error or "Embedding API 调用失败")
     
-    def batch_generate_embeddings(self, texts: List[str], max_retries: int = 3) -> List[List[float]]:
+    def _update_dimension(self, embedding: List[float]) -> None:
+        """按实际返回的向量更新维度"""
+        actual_dimension = len(embedding)
+        if self.dimension != actual_dimension:
+            current_app.logger.info(f"检测到向量维度: {actual_dimension} (模型: {self.model_name})")
+            self.dimension = actual_dimension
+    
+    def batch_generate_embeddings(self, texts: List[str], max_retries: int = 3,
+                                  use_cache: bool = True) -> List[List[float]]:
         """
-        批量生成向量（带重试机制）
+        批量生成向量（带重试机制，已持久化的文本不再请求 API）
         
         Args:
             texts: 文本列表
             max_retries: 最大重试次数
+            use_cache: 是否使用持久化 Embedding 存储
             
         Returns:
-            向量列表
+            向量列表（与输入顺序一致）
         """
         if not texts:
             return []
         
+        store = get_embedding_store() if use_cache else None
+        if store is None:
+            return self._request_batch_embeddings(texts, max_retries)
+        
+        known = store.get_many(self.model_name, texts)
+        missing = [text for text in dict.fromkeys(texts) if text not in known]
+        if missing:
+            fetched = self._request_batch_embeddings(missing, max_retries)
+            fetched_items = list(zip(missing, fetched))
+            store.put_many(self.model_name, fetched_items)
+            known.update(fetched_items)
+        elif known:
+            self._update_dimension(next(iter(known.values())))
+        return [known[text] for text in texts]
+    
+    def _request_batch_embeddings(self, texts: List[str], max_retries: int = 3) -> List[List[float]]:
+        """调用 Embedding API 批量生成向量（带重试机制）"""
         url = f"{self.api_base_url}/v1/embeddings"
         headers = {
             "Authorization": f"Bearer {self.api_key}",
@@ -176,9 +236,10 @@ class EmbeddingClient:
         }
         
         last_error = None
+        throttled = None
         for attempt in range(max_retries):
             try:
-                response = requests.post(url, json=data, headers=headers, timeout=60)
+                response = http_post(url, json=data, headers=headers, timeout=60)
                 
                 # 处理 503 等服务器错误
                 if response.status_code == 503:
@@ -190,8 +251,9 @@ class EmbeddingClient:
                         import time
                         time.sleep(wait_time)
                         continue
-                    else:
-                        raise Exception(f"批量 Embedding API 服务不可用 (503)，已重试 {max_retries} 次")
+                    last_error = f"批量 Embedding API 服务不可用 (503)，已重试 {max_retries} 次"
+                    throttled = response
+                    break
                 
                 response.raise_for_status()
                 result = response.json()
@@ -199,10 +261,7 @@ class EmbeddingClient:
                 embeddings = [item['embedding'] for item in sorted(result['data'], key=lambda x: x['index'])]
                 # 自动检测并更新维度（使用第一个向量的维度）
                 if embeddings and len(embeddings) > 0:
-                    actual_dimension = len(embeddings[0])
-                    if self.dimension != actual_dimension:
-                        current_app.logger.info(f"检测到向量维度: {actual_dimension} (模型: {self.model_name})")
-                        self.dimension = actual_dimension
+                    self._update_dimension(embeddings[0])
                 return embeddings
             except requests.exceptions.Timeout:
                 if attempt < max_retries - 1:
@@ -221,6 +280,8 @@ class EmbeddingClient:
                         import time
                         time.sleep(wait_time)
                         continue
+                    if e.response.status_code in (429, 503):
+                        throttled = e.response
                 last_error = f"批量 Embedding API 调用失败: HTTP {e.response.status_code} - {e.response.text[:200]}"
             except requests.exceptions.RequestException as e:
                 last_error = f"批量 Embedding API 调用失败: {str(e)}"
@@ -232,26 +293,190 @@ class EmbeddingClient:
                 last_error = f"批量 Embedding 处理错误: {str(e)}"
                 break
         
+        if throttled is not None:
+            raise EmbeddingRateLimitError(last_error, throttled.status_code, _parse_retry_after(throttled))
         raise Exception(last_error or "批量 Embedding API 调用失败")
 
 
+def build_index_text(title: str, description: str, category_name: str = "") -> str:
+    """网站的 embedding 输入文本（标题 + 描述 + 分类）"""
+    return f"{title or ''} {description or ''} {category_name or ''}".strip()
+
+
+def build_index_payload(title: str, description: str, category_name: str = "", url: str = "",
+                        category_id: Optional[int] = None, is_private: Optional[bool] = None,
+                        created_by_id: Optional[int] = None, visible_to: Optional[List[int]] = None) -> Dict:
+    """
+    网站向量的元数据
+
+    is_private / created_by_id / visible_to 是建立了索引的权限字段，检索时在向量库内按用户可见性过滤；
+    is_private 为 None 时不写入权限字段（检索时不排除，由数据库权限查询决定）。
+    """
+    payload = {
+        "title": title or "",
+        "description": description or "",
+        "category": category_name or "",
+        "url": url or ""
+    }
+    if category_id is not None:
+        payload["category_id"] = category_id
+    if is_private is not None:
+        payload["is_private"] = bool(is_private)
+        payload["created_by_id"] = created_by_id
+        payload["visible_to"] = list(visible_to or [])
+    return payload
+
+
+# Qdrant 集合参数默认值（与 Qdrant 自身默认一致：向量常驻内存、不量化）
+QDRANT_COLLECTION_DEFAULTS = {
+    'hnsw_m': 16,
+    'hnsw_ef_construct': 100,
+    'hnsw_ef': None,
+    'quantization': 'none',
+    'quantization_rescore': True,
+    'vectors_on_disk': False,
+    'payload_on_disk': False,
+}
+
+# 量化且重打分时多取的候选倍数（先用 int8 向量取 limit × 倍数个候选，再用原始向量精排）
+QUANTIZATION_OVERSAMPLING = 2.0
+
+
+def qdrant_collection_config(settings=None) -> Dict:
+    """
+    从站点设置读取 Qdrant 集合参数（缺失或超出范围的值使用默认值）
+
+    Args:
+        settings: 站点设置（None 时返回默认参数）
+
+    Returns:
+        集合参数字典，键同 QDRANT_COLLECTION_DEFAULTS
+    """
+    config = dict(QDRANT_COLLECTION_DEFAULTS)
+    if settings is None:
+        return config
+
+    def _int(value, low, high):
+        try:
+            value = int(value)
+        except (TypeError, ValueError):
+            return None
+        return value if low <= value <= high else None
+
+    config['hnsw_m'] = _int(getattr(settings, 'qdrant_hnsw_m', None), 4, 128) or config['hnsw_m']
+    config['hnsw_ef_construct'] = (
+        _int(getattr(settings, 'qdrant_hnsw_ef_construct', None), 4, 2000) or config['hnsw_ef_construct']
+    )
+    config['hnsw_ef'] = _int(getattr(settings, 'qdrant_hnsw_ef', None), 1, 4096)
+    if getattr(settings, 'qdrant_quantization', None) == 'int8':
+        config['quantization'] = 'int8'
+    rescore = getattr(settings, 'qdrant_quantization_rescore', None)
+    config['quantization_rescore'] = True if rescore is None else bool(rescore)
+    config['vectors_on_disk'] = bool(getattr(settings, 'qdrant_vectors_on_disk', False))
+    config['payload_on_disk'] = bool(getattr(settings, 'qdrant_payload_on_disk', False))
+    return config
+
+
+def qdrant_collection_params(vector_dimension: int, config: Optional[Dict] = None) -> Dict:
+    """
+    把集合参数转换为 QdrantClient.create_collection 的关键字参数
+
+    int8 量化后的向量始终留在内存中，原始向量可放到磁盘上，只在重打分时读取。
+
+    Args:
+        vector_dimension: 向量维度
+        config: qdrant_collection_config 的结果（None 表示默认参数）
+
+    Returns:
+        create_collection 的关键字参数（不含集合名）
+    """
+    from qdrant_client.models import (
+        Distance, HnswConfigDiff, ScalarQuantization, ScalarQuantizationConfig, ScalarType, VectorParams
+    )
+    config = config or QDRANT_COLLECTION_DEFAULTS
+    params = {
+        'vectors_config': VectorParams(
+            size=vector_dimension,
+            distance=Distance.COSINE,
+            on_disk=config['vectors_on_disk'] or None
+        ),
+        'hnsw_config': HnswConfigDiff(m=config['hnsw_m'], ef_construct=config['hnsw_ef_construct']),
+        'on_disk_payload': config['payload_on_disk'],
+    }
+    if config['quantization'] == 'int8':
+        params['quantization_config'] = ScalarQuantization(
+            scalar=ScalarQuantizationConfig(type=ScalarType.INT8, quantile=0.99, always_ram=True)
+        )
+    return params
+
+
+def qdrant_search_params(config: Optional[Dict] = None):
+    """
+    检索时的 HNSW / 量化参数
+
+    Args:
+        config: qdrant_collection_config 的结果
+
+    Returns:
+        SearchParams，全部使用 Qdrant 默认值时返回 None
+    """
+    config = config or QDRANT_COLLECTION_DEFAULTS
+    quantized = config['quantization'] != 'none'
+    if config['hnsw_ef'] is None and not quantized:
+        return None
+    from qdrant_client.models import QuantizationSearchParams, SearchParams
+    quantization = None
+    if quantized:
+        rescore = config['quantization_rescore']
+        quantization = QuantizationSearchParams(
+            rescore=rescore,
+            oversampling=QUANTIZATION_OVERSAMPLING if rescore else None
+        )
+    return SearchParams(hnsw_ef=config['hnsw_ef'], quantization=quantization)
+
+
+@lru_cache(maxsize=1)
+def _running_in_docker() -> bool:
+    """检测是否在 Docker 环境中（进程生命周期内不会变化，只检测一次）"""
+    try:
+        # 方法1: 检查 /.dockerenv 文件
+        if os.path.exists('/.dockerenv'):
+            return True
+        # 方法2: 检查 cgroup
+        if os.path.exists('/proc/self/cgroup'):
+            with open('/proc/self/cgroup', 'r') as f:
+                return 'docker' in f.read()
+    except Exception:
+        pass  # 如果检测失败，默认不转换
+    return False
+
+
 class QdrantVectorStore:
     """Qdrant 向量存储客户端"""
     
     COLLECTION_NAME = "websites"
+    # 权限过滤使用的元数据字段及其索引类型
+    PAYLOAD_INDEXES = (('is_private', 'bool'), ('created_by_id', 'integer'), ('visible_to', 'integer'))
     
-    def __init__(self, qdrant_url: str = "http://localhost:6333", vector_dimension: int = 1024):
+    def __init__(self, qdrant_url: str = "http://localhost:6333", vector_dimension: int = 1024,
+                 collection_config: Optional[Dict] = None):
         """
         初始化 Qdrant 客户端
         
         Args:
             qdrant_url: Qdrant 服务地址
             vector_dimension: 向量维度（会在首次使用时自动检测）
+            collection_config: 集合参数（qdrant_collection_config 的结果），HNSW、量化、磁盘存储在创建集合时生效
         """
         # 在 Docker 环境中，如果 URL 是 localhost，自动转换为服务名
         qdrant_url = self._normalize_qdrant_url(qdrant_url)
+        self.qdrant_url = qdrant_url
+        # qdrant_client（连带 pydantic/grpc/numpy）导入较慢，只在真正使用向量存储时加载
+        from qdrant_client import QdrantClient
         self.client = QdrantClient(url=qdrant_url)
         self.vector_dimension = vector_dimension
+        self.collection_config = collection_config or dict(QDRANT_COLLECTION_DEFAULTS)
+        self._search_params = qdrant_search_params(self.collection_config)
         self._ensure_collection()
     
     def _normalize_qdrant_url(self, url: str) -> str:
@@ -267,23 +492,8 @@ class QdrantVectorStore:
         if not url:
             return url
         
-        # 检测是否在 Docker 环境中
-        is_docker = False
-        try:
-            import os
-            # 方法1: 检查 /.dockerenv 文件
-            if os.path.exists('/.dockerenv'):
-                is_docker = True
-            # 方法2: 检查 cgroup
-            elif os.path.exists('/proc/self/cgroup'):
-                with open('/proc/self/cgroup', 'r') as f:
-                    if 'docker' in f.read():
-                        is_docker = True
-        except Exception:
-            pass  # 如果检测失败，默认不转换
-        
         # 如果在 Docker 环境中且 URL 包含 localhost，转换为服务名
-        if is_docker and 'localhost' in url:
+        if _running_in_docker() and 'localhost' in url:
             url = url.replace('localhost', 'qdrant')
             current_app.logger.info(f"检测到 Docker 环境，已将 Qdrant URL 从 localhost 转换为服务名: {url}")
         
@@ -317,6 +527,12 @@ class QdrantVectorStore:
                         self._create_collection()
                     else:
                         current_app.logger.info(f"集合已存在，维度匹配: {self.vector_dimension}")
+                        self._ensure_payload_indexes(set((collection_info.payload_schema or {}).keys()))
+                        drift = self._config_drift(collection_info)
+                        if drift:
+                            current_app.logger.info(
+                                f"现有集合参数与设置不一致（{'，'.join(drift)}），清空向量并重新生成索引后生效"
+                            )
                 except Exception as e:
                     # Qdrant版本兼容性问题，如果集合存在但无法读取配置，假设集合可用，不重新创建
                     error_str = str(e)
@@ -341,15 +557,92 @@ class QdrantVectorStore:
             raise
     
     def _create_collection(self):
-        """创建集合"""
+        """创建集合（按 collection_config 设置 HNSW、量化和磁盘存储）"""
+        config = self.collection_config
         self.client.create_collection(
             collection_name=self.COLLECTION_NAME,
-            vectors_config=VectorParams(
-                size=self.vector_dimension,
-                distance=Distance.COSINE
-            )
+            **qdrant_collection_params(self.vector_dimension, config)
         )
-        current_app.logger.info(f"创建 Qdrant 集合: {self.COLLECTION_NAME} (维度: {self.vector_dimension})")
+        current_app.logger.info(
+            f"创建 Qdrant 集合: {self.COLLECTION_NAME} (维度: {self.vector_dimension}, "
+            f"m={config['hnsw_m']}, ef_construct={config['hnsw_ef_construct']}, 量化={config['quantization']}, "
+            f"向量存磁盘={config['vectors_on_disk']}, 元数据存磁盘={config['payload_on_disk']})"
+        )
+        self._ensure_payload_indexes()
+    
+    def _config_drift(self, collection_info) -> List[str]:
+        """
+        已有集合与当前集合参数不一致的项（这些参数只在创建集合时生效）
+        
+        Args:
+            collection_info: get_collection 的结果
+            
+        Returns:
+            不一致项的说明列表
+        """
+        config = self.collection_config
+        drift = []
+        try:
+            hnsw = collection_info.config.hnsw_config
+            vectors = collection_info.config.params.vectors
+            if hnsw.m != config['hnsw_m'] or hnsw.ef_construct != config['hnsw_ef_construct']:
+                drift.append(f"HNSW m/ef_construct={hnsw.m}/{hnsw.ef_construct}")
+            quantized = collection_info.config.quantization_config is not None
+            if quantized != (config['quantization'] != 'none'):
+                drift.append(f"量化={'int8' if quantized else 'none'}")
+            if bool(vectors.on_disk) != config['vectors_on_disk']:
+                drift.append(f"向量存磁盘={bool(vectors.on_disk)}")
+            if bool(collection_info.config.params.on_disk_payload) != config['payload_on_disk']:
+                drift.append(f"元数据存磁盘={bool(collection_info.config.params.on_disk_payload)}")
+        except AttributeError:
+            pass
+        return drift
+    
+    def _ensure_payload_indexes(self, existing: Optional[set] = None):
+        """
+        为权限过滤字段建立元数据索引（已存在的跳过）
+        
+        Args:
+            existing: 集合中已建立索引的字段
+        """
+        from qdrant_client.models import PayloadSchemaType
+        for field_name, schema in self.PAYLOAD_INDEXES:
+            if existing and field_name in existing:
+                continue
+            try:
+                self.client.create_payload_index(
+                    collection_name=self.COLLECTION_NAME,
+                    field_name=field_name,
+                    field_schema=PayloadSchemaType(schema)
+                )
+            except Exception as e:
+                # 没有索引时过滤仍然可用，只是需要逐条检查元数据
+                current_app.logger.warning(f"创建元数据索引失败 ({field_name}): {str(e)}")
+    
+    @staticmethod
+    def _visibility_filter(visibility: Optional[Tuple]):
+        """
+        按可见性分类构造 Qdrant 过滤条件
+        
+        Args:
+            visibility: visibility_key 的结果（None 或管理员表示不过滤）
+            
+        Returns:
+            Filter 或 None
+        """
+        if visibility is None or visibility[0] == 'admin':
+            return None
+        from qdrant_client.models import FieldCondition, Filter, IsEmptyCondition, MatchValue, PayloadField
+        # 公开网站；以及尚未写入权限字段的旧向量（交给数据库权限查询判断）
+        should = [
+            FieldCondition(key='is_private', match=MatchValue(value=False)),
+            IsEmptyCondition(is_empty=PayloadField(key='is_private')),
+        ]
+        if visibility[0] == 'user':
+            user_id = visibility[1]
+            should.append(FieldCondition(key='created_by_id', match=MatchValue(value=user_id)))
+            should.append(FieldCondition(key='visible_to', match=MatchValue(value=user_id)))
+        return Filter(should=should)
     
     def update_dimension(self, new_dimension: int):
         """
@@ -372,6 +665,7 @@ class QdrantVectorStore:
             vector: 向量
             payload: 元数据（title, description, category等）
         """
+        from qdrant_client.models import PointStruct
         try:
             point = PointStruct(
                 id=website_id,
@@ -386,34 +680,54 @@ class QdrantVectorStore:
             current_app.logger.error(f"存储向量失败 (website_id={website_id}): {str(e)}")
             raise
     
+    def store_vectors(self, website_ids: List[int], vectors: List[List[float]], payloads: List[Dict]):
+        """
+        批量存储网站向量（一次 upsert）
+        
+        Args:
+            website_ids: 网站ID列表
+            vectors: 向量列表
+            payloads: 元数据列表
+        """
+        if not website_ids:
+            return
+        from qdrant_client.models import PointStruct
+        try:
+            self.client.upsert(
+                collection_name=self.COLLECTION_NAME,
+                points=[
+                    PointStruct(id=website_id, vector=vector, payload=payload)
+                    for website_id, vector, payload in zip(website_ids, vectors, payloads)
+                ]
+            )
+        except Exception as e:
+            current_app.logger.error(f"批量存储向量失败 ({len(website_ids)} 个): {str(e)}")
+            raise
+    
     def search_similar(self, query_vector: List[float], limit: int = 20, 
-                       user_id: Optional[int] = None, threshold: float = 0.3) -> List[Dict]:
+                       visibility: Optional[Tuple] = None, threshold: float = 0.3) -> List[Dict]:
         """
-        搜索相似向量
+        搜索相似向量（按用户可见性在 Qdrant 内过滤，前 k 个结果不会被不可见的网站占用）
         
         Args:
             query_vector: 查询向量
             limit: 返回数量
-            user_id: 用户ID（用于权限过滤）
+            visibility: 可见性分类（visibility_key 的结果，None 表示不过滤）
             threshold: 相似度阈值
             
         Returns:
             搜索结果列表，每个结果包含 website_id, score, payload
         """
         try:
-            # 构建过滤条件（如果需要权限过滤）
-            query_filter = None
-            if user_id is not None:
-                # 这里可以根据需要添加权限过滤
-                # 例如：只搜索公开的网站或用户有权限的网站
-                pass
+            query_filter = self._visibility_filter(visibility)
             
             search_result = self.client.search(
                 collection_name=self.COLLECTION_NAME,
                 query_vector=query_vector,
                 limit=limit,
                 score_threshold=threshold,
-                query_filter=query_filter
+                query_filter=query_filter,
+                search_params=self._search_params
             )
             
             results = []
@@ -429,6 +743,39 @@ class QdrantVectorStore:
             current_app.logger.error(f"向量搜索失败: {str(e)}")
             raise
     
+    def existing_ids(self, website_ids: List[int]) -> set:
+        """
+        返回给定网站中已有向量的ID集合（按批调用 retrieve）
+        
+        Args:
+            website_ids: 网站ID列表
+            
+        Returns:
+            已存在向量的网站ID集合
+        """
+        existing = set()
+        batch_size = 100
+        website_ids = list(website_ids)
+        for i in range(0, len(website_ids), batch_size):
+            try:
+                # 只取ID，不取向量和元数据
+                points = self.client.retrieve(
+                    collection_name=self.COLLECTION_NAME,
+                    ids=website_ids[i:i + batch_size],
+                    with_payload=False,
+                    with_vectors=False
+                )
+                existing.update(point.id for point in points)
+            except Exception as e:
+                # 如果查询失败，继续处理
+                current_app.logger.warning(f"查询已存在向量失败: {str(e)}")
+        return existing
+    
+    def clear(self):
+        """清空所有向量（删除集合后按当前维度重新创建）"""
+        self.client.delete_collection(collection_name=self.COLLECTION_NAME)
+        self._ensure_collection()
+    
     def delete_vector(self, website_id: int):
         """
         删除向量
@@ -448,6 +795,32 @@ class QdrantVectorStore:
             current_app.logger.warning(f"删除向量警告: {str(e)}")
 
 
+def _open_maintenance_store(settings):
+    """
+    打开用于删除/清空的向量存储：优先复用已就绪的向量服务，避免按默认维度检查集合
+
+    Returns:
+        向量存储，未配置向量存储时返回 None
+    """
+    service = get_vector_service(settings)
+    if service is not None:
+        return service.vector_store
+    backend = get_vector_backend()
+    if backend == 'local':
+        path = get_local_vector_path()
+        if not os.path.exists(path):
+            return None
+        from app.utils.local_vector_store import LocalVectorStore
+        return LocalVectorStore(path, vector_dimension=None)
+    if not settings.qdrant_url:
+        return None
+    return QdrantVectorStore(
+        qdrant_url=settings.qdrant_url,
+        vector_dimension=1024,  # 维度会在删除时自动检测，这里用默认值
+        collection_config=qdrant_collection_config(settings)
+    )
+
+
 def delete_website_vector(website_id: int):
     """
     删除网站的向量数据（辅助函数）
@@ -456,21 +829,17 @@ def delete_website_vector(website_id: int):
         website_id: 网站ID
     """
     try:
-        from app.models import SiteSettings
+        from app.utils.settings_cache import get_site_settings
         
         # 获取配置
-        settings = SiteSettings.get_settings()
+        settings = get_site_settings()
+        vector_store = _open_maintenance_store(settings) if settings else None
         
-        # 检查是否配置了 Qdrant
-        if not settings or not settings.qdrant_url:
-            current_app.logger.debug(f"Qdrant 未配置，跳过向量删除 (website_id={website_id})")
+        # 检查是否配置了向量存储
+        if vector_store is None:
+            current_app.logger.debug(f"向量存储未配置，跳过向量删除 (website_id={website_id})")
             return
         
-        # 初始化向量存储并删除
-        vector_store = QdrantVectorStore(
-            qdrant_url=settings.qdrant_url,
-            vector_dimension=1024  # 维度会在删除时自动检测，这里用默认值
-        )
         vector_store.delete_vector(website_id)
     except Exception as e:
         # 向量删除失败不应该影响网站删除，只记录日志
@@ -483,28 +852,21 @@ def clear_all_vectors():
     用于清空所有网站时同步清空向量
     """
     try:
-        from app.models import SiteSettings
+        from app.utils.settings_cache import get_site_settings
         
         # 获取配置
-        settings = SiteSettings.get_settings()
+        settings = get_site_settings()
+        vector_store = _open_maintenance_store(settings) if settings else None
         
-        # 检查是否配置了 Qdrant
-        if not settings or not settings.qdrant_url:
-            current_app.logger.debug("Qdrant 未配置，跳过向量清空")
+        # 检查是否配置了向量存储
+        if vector_store is None:
+            current_app.logger.debug("向量存储未配置，跳过向量清空")
             return
         
-        # 初始化向量存储
-        vector_store = QdrantVectorStore(
-            qdrant_url=settings.qdrant_url,
-            vector_dimension=1024  # 维度会在删除时自动检测，这里用默认值
-        )
-        
-        # 删除整个集合（会重新创建空集合）
+        # 清空所有向量（保留空集合）
         try:
-            vector_store.client.delete_collection(collection_name=QdrantVectorStore.COLLECTION_NAME)
+            vector_store.clear()
             current_app.logger.info("成功清空所有向量数据")
-            # 重新创建集合
-            vector_store._ensure_collection()
         except Exception as e:
             current_app.logger.warning(f"清空向量数据时出错: {str(e)}")
     except Exception as e:
@@ -515,19 +877,20 @@ def clear_all_vectors():
 class VectorSearchService:
     """向量搜索服务（整合 Embedding 和 Qdrant）"""
     
-    def __init__(self, embedding_client: EmbeddingClient, vector_store: QdrantVectorStore):
+    def __init__(self, embedding_client: EmbeddingClient, vector_store):
         """
         初始化向量搜索服务
         
         Args:
             embedding_client: Embedding 客户端
-            vector_store: 向量存储客户端
+            vector_store: 向量存储（QdrantVectorStore 或 LocalVectorStore）
         """
         self.embedding_client = embedding_client
         self.vector_store = vector_store
-        # 同步向量维度
-        self.vector_store.vector_dimension = self.embedding_client.dimension
-        self.vector_store._ensure_collection()
+        # 同步向量维度（向量存储初始化时已按相同维度检查过集合，维度一致时无需再检查）
+        if self.vector_store.vector_dimension != self.embedding_client.dimension:
+            self.vector_store.vector_dimension = self.embedding_client.dimension
+            self.vector_store._ensure_collection()
     
     def index_website(self, website_id: int, title: str, description: str, 
                      category_name: str = "", url: str = "") -> bool:
@@ -546,7 +909,7 @@ class VectorSearchService:
         """
         try:
             # 构建搜索文本（标题 + 描述 + 分类）
-            search_text = f"{title} {description} {category_name}".strip()
+            search_text = build_index_text(title, description, category_name)
             
             if not search_text:
                 current_app.logger.warning(f"网站 {website_id} 没有可索引的文本内容")
@@ -563,14 +926,9 @@ class VectorSearchService:
                 self.vector_store.update_dimension(self.embedding_client.dimension)
             
             # 构建元数据
-            payload = {
-                "title": title,
-                "description": description or "",
-                "category": category_name or "",
-                "url": url or ""
-            }
+            payload = build_index_payload(title, description, category_name, url)
             
-            # 存储到 Qdrant
+            # 存储到向量库
             self.vector_store.store_vector(website_id, vector, payload)
             
             return True
@@ -578,7 +936,7 @@ class VectorSearchService:
             current_app.logger.error(f"索引网站失败 (website_id={website_id}): {str(e)}")
             return False
     
-    def search(self, query: str, limit: int = 20, user_id: Optional[int] = None, 
+    def search(self, query: str, limit: int = 20, visibility: Optional[Tuple] = None, 
                threshold: float = 0.3, use_cache: bool = True) -> List[Dict]:
         """
         搜索相似网站（支持向量缓存）
@@ -586,7 +944,7 @@ class VectorSearchService:
         Args:
             query: 搜索查询
             limit: 返回数量
-            user_id: 用户ID
+            visibility: 可见性分类（visibility_key 的结果），在向量库内过滤不可见的私有网站
             threshold: 相似度阈值
             use_cache: 是否使用向量缓存
             
@@ -597,11 +955,11 @@ class VectorSearchService:
             # 将查询文本转换为向量（使用缓存）
             query_vector = self.embedding_client.generate_embedding(query, use_cache=use_cache)
             
-            # 在 Qdrant 中搜索
+            # 在向量库中搜索
             results = self.vector_store.search_similar(
                 query_vector=query_vector,
                 limit=limit,
-                user_id=user_id,
+                visibility=visibility,
                 threshold=threshold
             )
             
@@ -610,3 +968,106 @@ class VectorSearchService:
             current_app.logger.error(f"向量搜索失败: {str(e)}")
             raise
 
+
+# 进程级向量服务注册表：配置签名 -> 已就绪的 VectorSearchService
+# 每种配置只创建一次客户端并检查一次集合，配置变更（含切换存储后端）后按新签名重建
+_services: Dict[Tuple, VectorSearchService] = {}
+_services_lock = threading.Lock()
+_MAX_SERVICES = 4
+
+
+def get_vector_backend() -> str:
+    """当前配置的向量存储后端：qdrant（默认）或 local（进程内 NumPy 精确检索）"""
+    backend = (current_app.config.get('VECTOR_BACKEND') or 'qdrant').strip().lower()
+    if backend not in ('qdrant', 'local'):
+        current_app.logger.warning(f"未知的向量存储后端 {backend}，使用 Qdrant")
+        return 'qdrant'
+    return backend
+
+
+def get_local_vector_path() -> str:
+    """本地向量存储目录，默认放在主数据库旁边的 vectors 目录"""
+    from app.utils.cache import _default_sqlite_cache_path
+    return current_app.config.get('VECTOR_LOCAL_PATH') or _default_sqlite_cache_path(current_app.config, 'vectors')
+
+
+def vector_settings_signature(settings) -> Optional[Tuple]:
+    """
+    向量服务相关配置的签名
+
+    Args:
+        settings: 站点设置
+
+    Returns:
+        (存储后端, Embedding API 地址, 密钥, 模型, Qdrant 地址或本地存储目录, Qdrant 集合参数)，
+        配置不完整时返回 None
+    """
+    if not settings:
+        return None
+    embedding_api_url, embedding_api_key = settings.get_embedding_api_config()
+    model_name = settings.embedding_model
+    backend = get_vector_backend()
+    location = get_local_vector_path() if backend == 'local' else settings.qdrant_url
+    if not all([embedding_api_url, embedding_api_key, model_name, location]):
+        return None
+    collection_config = None if backend == 'local' else tuple(sorted(qdrant_collection_config(settings).items()))
+    return (backend, embedding_api_url.rstrip('/'), embedding_api_key, model_name, location, collection_config)
+
+
+def is_vector_search_configured(settings) -> bool:
+    """向量检索所需的 Embedding API 和向量存储是否都已配置（不检查 vector_search_enabled 开关）"""
+    return vector_settings_signature(settings) is not None
+
+
+def get_vector_service(settings=None) -> Optional[VectorSearchService]:
+    """
+    获取当前配置对应的向量服务（进程内复用，首次使用时创建）
+
+    Args:
+        settings: 站点设置（默认读取当前站点设置）
+
+    Returns:
+        VectorSearchService，向量配置不完整时返回 None；连接向量存储失败时抛出异常
+    """
+    if settings is None:
+        from app.utils.settings_cache import get_site_settings
+        settings = get_site_settings()
+    signature = vector_settings_signature(settings)
+    if signature is None:
+        return None
+
+    service = _services.get(signature)
+    if service is not None:
+        return service
+
+    with _services_lock:
+        service = _services.get(signature)
+        if service is not None:
+            return service
+        backend, embedding_api_url, embedding_api_key, model_name, location, collection_config = signature
+        embedding_client = EmbeddingClient(
+            api_base_url=embedding_api_url,
+            api_key=embedding_api_key,
+            model_name=model_name
+        )
+        if backend == 'local':
+            from app.utils.local_vector_store import LocalVectorStore
+            vector_store = LocalVectorStore(location, vector_dimension=embedding_client.dimension)
+        else:
+            vector_store = QdrantVectorStore(
+                qdrant_url=location,
+                vector_dimension=embedding_client.dimension,
+                collection_config=dict(collection_config)
+            )
+        service = VectorSearchService(embedding_client, vector_store)
+        # 旧配置的服务不会再被使用，超出上限时先丢弃最早创建的
+        while len(_services) >= _MAX_SERVICES:
+            _services.pop(next(iter(_services)))
+        _services[signature] = service
+    return service
+
+
+def reset_vector_services() -> None:
+    """丢弃所有已创建的向量服务（例如 Qdrant 重启或集合被外部删除后，下次使用时重新检查集合）"""
+    with _services_lock:
+        _services.clear()
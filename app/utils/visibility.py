@@ -0,0 +1,159 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""网站可见性 - 统一的权限过滤条件，以及 website_visibility 关联表与 visible_to 字段的同步"""
+
+import hashlib
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import event, select, text
+from sqlalchemy.orm import Session
+
+from app.models import Website, WebsiteVisibility
+
+
+def parse_visible_to(value: Optional[str]) -> List[int]:
+    """解析逗号分隔的可见用户ID（忽略空白和非法值，去重并保持顺序）"""
+    ids: List[int] = []
+    for item in (value or '').split(','):
+        item = item.strip()
+        if item.isdigit() and int(item) not in ids:
+            ids.append(int(item))
+    return ids
+
+
+def visibility_key(user) -> Tuple:
+    """用户所属的可见性分类（匿名、管理员或具体普通用户）"""
+    if user is None or not user.is_authenticated:
+        return ('anonymous',)
+    if user.is_admin:
+        return ('admin',)
+    return ('user', user.id)
+
+
+# 普通用户 -> (目录版本号, 可见性范围)；目录变更（含 visible_to 修改）后自动失效
+_scopes: Dict[int, Tuple[int, Tuple]] = {}
+_scopes_lock = threading.Lock()
+_MAX_SCOPES = 4096
+
+
+def _private_scope(user_id: int) -> Tuple:
+    """计算普通用户可见的私有网站集合摘要"""
+    rows = Website.query.with_entities(Website.id).filter(
+        Website.is_private == True,
+        (Website.created_by_id == user_id) |
+        Website.id.in_(select(WebsiteVisibility.website_id).where(WebsiteVisibility.user_id == user_id))
+    ).order_by(Website.id).all()
+    if not rows:
+        return ('public',)
+    digest = hashlib.sha1(','.join(str(row[0]) for row in rows).encode('ascii')).hexdigest()[:16]
+    return ('private', digest)
+
+
+def visibility_scope(user) -> Tuple:
+    """
+    用户实际可见的数据范围，用作按权限区分的缓存键
+
+    与 visibility_key 不同，普通用户不按 ID 区分，而是按其可见的私有网站集合区分：
+    看不到任何私有网站的用户共享 ('public',)，可见私有网站集合相同的用户共享同一摘要。
+
+    Args:
+        user: 当前用户（可为匿名用户）
+
+    Returns:
+        ('anonymous',)、('admin',)、('public',) 或 ('private', 摘要)
+    """
+    key = visibility_key(user)
+    if key[0] != 'user':
+        return key
+
+    from app.utils.data_version import CATALOG, get_data_version
+
+    version = get_data_version(CATALOG)
+    entry = _scopes.get(user.id)
+    if entry and entry[0] == version:
+        return entry[1]
+
+    scope = _private_scope(user.id)
+    with _scopes_lock:
+        if len(_scopes) >= _MAX_SCOPES:
+            for stale_id in [k for k, v in _scopes.items() if v[0] != version]:
+                del _scopes[stale_id]
+        if len(_scopes) >= _MAX_SCOPES:
+            _scopes.pop(next(iter(_scopes)))
+        _scopes[user.id] = (version, scope)
+    return scope
+
+
+def visibility_filter(user):
+    """
+    构造网站可见性过滤条件
+
+    Args:
+        user: 当前用户（可为匿名用户）
+
+    Returns:
+        SQLAlchemy 条件表达式，管理员不需要过滤时返回 None
+    """
+    if user is None or not user.is_authenticated:
+        return Website.is_private == False
+    if user.is_admin:
+        return None
+    shared_ids = select(WebsiteVisibility.website_id).where(WebsiteVisibility.user_id == user.id)
+    return (
+        (Website.is_private == False) |
+        (Website.created_by_id == user.id) |
+        (Website.id.in_(shared_ids))
+    )
+
+
+def apply_visibility(query, user):
+    """按用户身份过滤网站查询"""
+    condition = visibility_filter(user)
+    if condition is None:
+        return query
+    return query.filter(condition)
+
+
+def sync_website_visibility(connection, website_id: int, user_ids: Iterable[int]) -> None:
+    """用给定的用户ID重写某个网站的可见用户关联（忽略不存在的用户）"""
+    connection.execute(
+        text("DELETE FROM website_visibility WHERE website_id = :website_id"),
+        {'website_id': website_id}
+    )
+    for user_id in user_ids:
+        connection.execute(
+            text("INSERT OR IGNORE INTO website_visibility (website_id, user_id) "
+                 "SELECT :website_id, id FROM user WHERE id = :user_id"),
+            {'website_id': website_id, 'user_id': user_id}
+        )
+
+
+def _after_flush(session, flush_context):
+    changed = [
+        obj for obj in list(session.new) + list(session.dirty)
+        if isinstance(obj, Website) and (
+            obj in session.new or session.is_modified(obj, include_collections=False)
+        )
+    ]
+    if not changed:
+        return
+
+    from sqlalchemy import inspect as sa_inspect
+
+    connection = session.connection()
+    for website in changed:
+        user_ids = parse_visible_to(website.visible_to)
+        if website in session.new:
+            if not user_ids:
+                continue
+        elif not sa_inspect(website).attrs.visible_to.history.has_changes():
+            continue
+        sync_website_visibility(connection, website.id, user_ids)
+
+
+def register_visibility_hooks() -> None:
+    """注册 SQLAlchemy 会话钩子，保存网站时同步 website_visibility 关联表（幂等）"""
+    if event.contains(Session, 'after_flush', _after_flush):
+        return
+    event.listen(Session, 'after_flush', _after_flush)
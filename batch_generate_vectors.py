@@ -10,8 +10,9 @@
 功能：
     - 遍历数据库中所有网站
     - 为每个网站生成向量并存储到 Qdrant
+    - 分批生成向量、批量写入，多线程并发，遇到限流自动降速
     - 显示进度和统计信息
-    - 支持断点续传（跳过已存在的向量）
+    - 增量索引（按内容哈希只处理新增或有变化的网站），中断后再次运行即可继续
 """
 
 import sys
@@ -21,66 +22,22 @@ import os
 sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
 
 from app import create_app, db
-from app.models import Website, Category, SiteSettings
-from app.utils.vector_service import EmbeddingClient, QdrantVectorStore, VectorSearchService
-from qdrant_client import QdrantClient
+from app.models import Website, SiteSettings
+from app.utils.vector_indexer import BulkVectorIndexer, iter_index_items, plan_incremental_index
+from app.utils.vector_service import get_vector_service, is_vector_search_configured
 
 
-def check_existing_vectors(qdrant_url: str, website_ids: list) -> set:
-    """
-    检查 Qdrant 中已存在的向量（用于跳过已生成的网站）
-    
-    Args:
-        qdrant_url: Qdrant 服务地址
-        website_ids: 网站ID列表
-        
-    Returns:
-        已存在向量的网站ID集合
-    """
-    try:
-        client = QdrantClient(url=qdrant_url)
-        collections = client.get_collections().collections
-        collection_names = [c.name for c in collections]
-        
-        if 'websites' not in collection_names:
-            return set()
-        
-        # 批量查询已存在的向量
-        # 注意：Qdrant中point的id就是website_id
-        existing_ids = set()
-        batch_size = 100
-        
-        for i in range(0, len(website_ids), batch_size):
-            batch_ids = website_ids[i:i+batch_size]
-            try:
-                # 使用 retrieve 方法批量获取这些ID的向量
-                # 如果ID存在，说明向量已生成
-                result = client.retrieve(
-                    collection_name='websites',
-                    ids=batch_ids
-                )
-                # 从返回结果中提取ID（成功返回的说明已存在）
-                for point in result:
-                    existing_ids.add(point.id)
-            except Exception as e:
-                # 如果查询失败，继续处理（可能是ID不存在或其他问题）
-                # 这种情况下认为向量不存在，继续生成
-                pass
-        
-        return existing_ids
-    except Exception as e:
-        print(f"  警告：检查已存在向量时出错: {str(e)}")
-        print(f"  将跳过检查，继续生成所有向量")
-        return set()
-
-
-def generate_all_vectors(skip_existing: bool = True, batch_size: int = 10):
+def generate_all_vectors(skip_existing: bool = True, batch_size: int = None, workers: int = None,
+                         rate: float = None, resume: bool = True):
     """
     为所有网站生成向量
     
     Args:
-        skip_existing: 是否跳过已存在的向量
-        batch_size: 每批处理的网站数量（用于进度显示）
+        skip_existing: 是否只处理新增或内容有变化的网站
+        batch_size: 每次 embedding 请求包含的网站数（默认取 VECTOR_INDEX_BATCH_SIZE）
+        workers: 并发线程数（默认取 VECTOR_INDEX_WORKERS）
+        rate: 每秒最多 embedding 请求数（默认取 VECTOR_INDEX_RATE，遇到限流自动降速）
+        resume: 是否从上次中断的检查点继续（仅完整模式使用检查点）
     """
     app = create_app()
     
@@ -92,14 +49,15 @@ def generate_all_vectors(skip_existing: bool = True, batch_size: int = 10):
             print("❌ 无法获取站点设置")
             return
         
-        if not all([settings.ai_api_base_url, settings.ai_api_key, settings.embedding_model]):
+        embedding_api_url, embedding_api_key = settings.get_embedding_api_config()
+        if not all([embedding_api_url, embedding_api_key, settings.embedding_model]):
             print("❌ AI搜索配置不完整，请先配置：")
             print("   - API基础URL")
             print("   - API密钥")
             print("   - Embedding模型")
             return
         
-        if not settings.qdrant_url:
+        if not is_vector_search_configured(settings):
             print("❌ Qdrant URL 未配置")
             return
         
@@ -111,33 +69,33 @@ def generate_all_vectors(skip_existing: bool = True, batch_size: int = 10):
                 return
         
         print(f"\n📋 配置信息：")
-        print(f"   API地址: {settings.ai_api_base_url}")
+        print(f"   API地址: {embedding_api_url}")
         print(f"   Embedding模型: {settings.embedding_model}")
-        print(f"   Qdrant地址: {settings.qdrant_url}")
         print()
         
         # 初始化向量服务
         try:
-            embedding_client = EmbeddingClient(
-                api_base_url=settings.ai_api_base_url,
-                api_key=settings.ai_api_key,
-                model_name=settings.embedding_model or 'text-embedding-3-small'
-            )
-            vector_store = QdrantVectorStore(
-                qdrant_url=settings.qdrant_url,
-                vector_dimension=embedding_client.dimension
-            )
-            vector_service = VectorSearchService(embedding_client, vector_store)
+            vector_service = get_vector_service(settings)
+            indexer = BulkVectorIndexer.from_config(vector_service, app.config)
+            if batch_size:
+                indexer.batch_size = max(1, batch_size)
+            if workers:
+                indexer.workers = max(1, workers)
+            if rate:
+                indexer.bucket.max_rate = indexer.bucket.rate = max(indexer.bucket.min_rate, rate)
             
-            print(f"✅ 向量服务初始化成功（维度: {embedding_client.dimension}）")
+            store = vector_service.vector_store
+            location = getattr(store, 'path', None) or getattr(store, 'qdrant_url', None)
+            print(f"✅ 向量服务初始化成功（存储: {location}，维度: {vector_service.embedding_client.dimension}）")
+            print(f"   每批 {indexer.batch_size} 个网站，{indexer.workers} 个线程，最多 {indexer.bucket.max_rate} 次请求/秒")
             print()
         except Exception as e:
             print(f"❌ 向量服务初始化失败: {str(e)}")
             return
         
-        # 获取所有网站
-        websites = Website.query.all()
-        total_count = len(websites)
+        # 获取所有网站ID
+        website_ids = [row[0] for row in db.session.query(Website.id).order_by(Website.id)]
+        total_count = len(website_ids)
         
         if total_count == 0:
             print("❌ 没有找到网站")
@@ -145,72 +103,41 @@ def generate_all_vectors(skip_existing: bool = True, batch_size: int = 10):
         
         print(f"📊 找到 {total_count} 个网站")
         
-        # 检查已存在的向量
-        existing_ids = set()
+        # 增量模式只处理新增、内容有变化或向量缺失的网站
+        pending_ids, unchanged = website_ids, 0
         if skip_existing:
-            print("🔍 检查已存在的向量...")
-            website_ids = [w.id for w in websites]
-            existing_ids = check_existing_vectors(settings.qdrant_url, website_ids)
-            if existing_ids:
-                print(f"   ✅ 发现 {len(existing_ids)} 个网站已有向量，将跳过")
-            else:
-                print(f"   ℹ️  未发现已存在的向量，将全部生成")
+            print("🔍 检查内容有变化的网站...")
+            pending_ids, unchanged = plan_incremental_index(vector_service)
+            if unchanged:
+                print(f"   ✅ {unchanged} 个网站内容未变化，将跳过")
+            print(f"   ℹ️  {len(pending_ids)} 个网站需要生成向量")
             print()
         
-        # 统计信息
-        success_count = 0
-        fail_count = 0
-        skip_count = 0
-        
         print(f"🚀 开始生成向量...")
         print("=" * 60)
         
-        # 遍历所有网站
-        for idx, website in enumerate(websites, 1):
-            # 检查是否已存在
-            if skip_existing and website.id in existing_ids:
-                skip_count += 1
-                if idx % batch_size == 0 or idx == total_count:
-                    print(f"[{idx}/{total_count}] ⏭️  {website.title} - 已存在，跳过")
-                continue
-            
-            try:
-                # 获取分类名称
-                category_name = ""
-                if website.category_id:
-                    category = Category.query.get(website.category_id)
-                    if category:
-                        category_name = category.name
-                
-                # 生成向量
-                success = vector_service.index_website(
-                    website_id=website.id,
-                    title=website.title or "",
-                    description=website.description or "",
-                    category_name=category_name,
-                    url=website.url or ""
-                )
-                
-                if success:
-                    success_count += 1
-                    # 显示进度（每batch_size个或最后一个显示）
-                    if idx % batch_size == 0 or idx == total_count:
-                        print(f"[{idx}/{total_count}] ✅ {website.title} - 向量生成成功")
-                else:
-                    fail_count += 1
-                    print(f"[{idx}/{total_count}] ❌ {website.title} - 向量生成失败")
-                    
-            except Exception as e:
-                fail_count += 1
-                print(f"[{idx}/{total_count}] ❌ {website.title} - 错误: {str(e)}")
+        def on_progress(stats):
+            print(f"[{stats['processed']}] ✅ 成功 {stats['success']}  ❌ 失败 {stats['failed']}  "
+                  f"⏭️  跳过 {stats['skipped'] + unchanged}  （{stats['rate']} 次/秒，限流 {stats['throttled']} 次）")
+        
+        # 增量模式每次按索引状态重新计算待处理网站，不需要检查点
+        stats = indexer.run(
+            iter_index_items(website_ids=pending_ids) if skip_existing else iter_index_items(),
+            on_progress=on_progress,
+            resume=resume and not skip_existing,
+            mode='changed' if skip_existing else 'all',
+        )
         
         print()
         print("=" * 60)
         print(f"📊 向量生成完成！")
-        print(f"   ✅ 成功: {success_count}")
-        print(f"   ⏭️  跳过: {skip_count}")
-        print(f"   ❌ 失败: {fail_count}")
+        if stats['resumed_after']:
+            print(f"   ↪️  从检查点继续（网站ID > {stats['resumed_after']}）")
+        print(f"   ✅ 成功: {stats['success']}")
+        print(f"   ⏭️  跳过: {stats['skipped'] + unchanged}")
+        print(f"   ❌ 失败: {stats['failed']}（再次运行将只重试失败的网站）" if stats['failed'] else f"   ❌ 失败: 0")
         print(f"   📈 总计: {total_count}")
+        print(f"   ⏱️  耗时: {stats['elapsed']} 秒")
         print("=" * 60)
 
 
@@ -220,22 +147,30 @@ if __name__ == '__main__':
         
         parser = argparse.ArgumentParser(description='批量生成网站向量索引')
         parser.add_argument('--no-skip', action='store_true', 
-                          help='不跳过已存在的向量（重新生成所有向量）')
-        parser.add_argument('--batch-size', type=int, default=10,
-                          help='进度显示批次大小（默认：10）')
+                          help='不跳过内容未变化的网站（重新写入所有向量）')
+        parser.add_argument('--batch-size', type=int, default=None,
+                          help='每次 embedding 请求包含的网站数（默认：VECTOR_INDEX_BATCH_SIZE）')
+        parser.add_argument('--workers', type=int, default=None,
+                          help='并发线程数（默认：VECTOR_INDEX_WORKERS）')
+        parser.add_argument('--rate', type=float, default=None,
+                          help='每秒最多 embedding 请求数（默认：VECTOR_INDEX_RATE）')
+        parser.add_argument('--no-resume', action='store_true',
+                          help='忽略上次中断的检查点，从头开始')
         
         args = parser.parse_args()
         
         generate_all_vectors(
             skip_existing=not args.no_skip,
-            batch_size=args.batch_size
+            batch_size=args.batch_size,
+            workers=args.workers,
+            rate=args.rate,
+            resume=not args.no_resume
         )
     except KeyboardInterrupt:
-        print("\n\n⚠️  用户中断操作")
+        print("\n\n⚠️  用户中断操作（再次运行将从检查点继续）")
         sys.exit(1)
     except Exception as e:
         print(f"\n❌ 发生错误: {str(e)}")
         import traceback
         traceback.print_exc()
         sys.exit(1)
-
@@ -1,4 +1,5 @@
 import os
+import tempfile
 from dotenv import load_dotenv
 from datetime import datetime, timedelta
 
@@ -28,4 +29,52 @@ class Config:
     
     # CSRF令牌配置
     WTF_CSRF_TIME_LIMIT = 24 * 60 * 60  # CSRF令牌有效期24小时（秒）
-    WTF_CSRF_SSL_STRICT = False  # 不强制要求HTTPS 
\ No newline at end of file
+    WTF_CSRF_SSL_STRICT = False  # 不强制要求HTTPS
+
+    # 整页缓存（匿名访客的首页和分类页），默认关闭
+    PAGE_CACHE_ENABLED = os.environ.get('PAGE_CACHE_ENABLED', 'false').lower() in ('1', 'true', 'yes', 'on')
+    PAGE_CACHE_MAX_ENTRIES = int(os.environ.get('PAGE_CACHE_MAX_ENTRIES') or 512) 
+
+    # 搜索结果 / 查询向量缓存后端：memory（每个 worker 独立）或 sqlite（同一主机的 worker 共享，重启后保留）
+    CACHE_BACKEND = os.environ.get('CACHE_BACKEND') or 'memory'
+    # sqlite 后端的缓存文件，默认放在主数据库旁边的 cache.db
+    CACHE_SQLITE_PATH = os.environ.get('CACHE_SQLITE_PATH')
+
+    # 搜索结果 / 查询向量缓存容量（条目数，以及按序列化大小估算的内存上限）
+    SEARCH_CACHE_MAX_ENTRIES = int(os.environ.get('SEARCH_CACHE_MAX_ENTRIES') or 20000)
+    SEARCH_CACHE_MAX_MB = float(os.environ.get('SEARCH_CACHE_MAX_MB') or 32)
+    VECTOR_CACHE_MAX_ENTRIES = int(os.environ.get('VECTOR_CACHE_MAX_ENTRIES') or 20000)
+    VECTOR_CACHE_MAX_MB = float(os.environ.get('VECTOR_CACHE_MAX_MB') or 128)
+
+    # 持久化 Embedding 存储（float32 打包，按模型和文本哈希保存），默认放在主数据库旁边的 embeddings.db，第一次写入向量时创建
+    EMBEDDING_STORE_ENABLED = os.environ.get('EMBEDDING_STORE_ENABLED', 'true').lower() in ('1', 'true', 'yes', 'on')
+    EMBEDDING_STORE_PATH = os.environ.get('EMBEDDING_STORE_PATH')
+    EMBEDDING_STORE_MAX_MB = float(os.environ.get('EMBEDDING_STORE_MAX_MB') or 1024)
+
+    # 向量存储后端：qdrant（独立的 Qdrant 服务）或 local（进程内 NumPy 精确检索，适合二十万以下的网站规模）
+    VECTOR_BACKEND = os.environ.get('VECTOR_BACKEND') or 'qdrant'
+    # local 后端的存储目录，默认放在主数据库旁边的 vectors 目录
+    VECTOR_LOCAL_PATH = os.environ.get('VECTOR_LOCAL_PATH')
+
+    # 批量向量索引：每次 embedding 请求的网站数、并发线程数、每秒最多请求数（遇到 429/503 自动降速）
+    VECTOR_INDEX_BATCH_SIZE = int(os.environ.get('VECTOR_INDEX_BATCH_SIZE') or 32)
+    VECTOR_INDEX_WORKERS = int(os.environ.get('VECTOR_INDEX_WORKERS') or 3)
+    VECTOR_INDEX_RATE = float(os.environ.get('VECTOR_INDEX_RATE') or 5)
+    # 断点续传检查点文件，默认放在主数据库旁边
+    VECTOR_INDEX_CHECKPOINT_PATH = os.environ.get('VECTOR_INDEX_CHECKPOINT_PATH')
+    # 保存网站后的后台索引队列：最后一次保存后等待的秒数、最早保存的网站最长等待秒数、每轮最多处理的网站数
+    VECTOR_QUEUE_DEBOUNCE = float(os.environ.get('VECTOR_QUEUE_DEBOUNCE') or 2)
+    VECTOR_QUEUE_MAX_DELAY = float(os.environ.get('VECTOR_QUEUE_MAX_DELAY') or 30)
+    VECTOR_QUEUE_MAX_ITEMS = int(os.environ.get('VECTOR_QUEUE_MAX_ITEMS') or 500)
+
+    # 出站 HTTP 连接池（AI、Embedding、图标抓取、死链检测按主机复用 keep-alive 连接）
+    HTTP_POOL_MAXSIZE = int(os.environ.get('HTTP_POOL_MAXSIZE') or 10)
+    HTTP_POOL_MAX_HOSTS = int(os.environ.get('HTTP_POOL_MAX_HOSTS') or 64)
+    # 建立连接的超时（秒），不超过各调用方的请求超时；调用方未指定超时时使用 HTTP_DEFAULT_TIMEOUT
+    HTTP_CONNECT_TIMEOUT = float(os.environ.get('HTTP_CONNECT_TIMEOUT') or 10)
+    HTTP_DEFAULT_TIMEOUT = float(os.environ.get('HTTP_DEFAULT_TIMEOUT') or 30)
+
+    # Jinja 模板字节码缓存目录，worker 重启后无需重新编译模板；设为空字符串关闭
+    JINJA_BYTECODE_CACHE_DIR = os.environ.get(
+        'JINJA_BYTECODE_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'book_nav_jinja_cache')
+    )